@@ -0,0 +1,300 @@
+"""
+PitBox Relay Agent - Async Server Client
+socketio.AsyncClient version of PitBoxClient: every backend target on one event loop
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import socketio
+
+import config
+from perf_stats import perf
+from pitbox_client import PitBoxClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueuedPacket:
+    """One packet waiting in a target's queue"""
+    event: str              # Event as built (spool, keyframe bookkeeping)
+    data: Dict[str, Any]
+    wire_event: str         # As sent to this target (compressed if negotiated)
+    wire_data: Dict[str, Any]
+    conflatable: bool       # Telemetry: may be dropped once stale
+    queued_at: float
+
+
+class AsyncTarget:
+    """
+    One backend connection: a socketio.AsyncClient plus a bounded outbound
+    queue, served by a single coroutine instead of a worker thread.
+
+    Telemetry packets older than MAX_AGE are dropped as stale; anything else
+    is only dropped when the queue overflows, the target is reconnecting or
+    the send fails. Every dropped packet is passed to on_drop.
+    """
+
+    MAX_QUEUE_SIZE = 500
+    MAX_BACKOFF = 30.0
+    MAX_AGE = 2.0  # Seconds; older queued telemetry is dropped as stale
+
+    def __init__(
+        self,
+        url: str,
+        index: int,
+        on_drop: Optional[Callable[['AsyncTarget', QueuedPacket], None]] = None
+    ):
+        self.url = url
+        self.index = index
+        self.on_drop = on_drop
+        self.sio = socketio.AsyncClient(
+            reconnection=True,
+            reconnection_attempts=0,  # Keep trying; the relay outlives server restarts
+            reconnection_delay=1,
+            reconnection_delay_max=30,
+            logger=False,
+            engineio_logger=False
+        )
+        self.connected = False
+        self.compressor = None  # Negotiated per target
+
+        self._queue: Deque[QueuedPacket] = deque()
+        self._wakeup = asyncio.Event()
+
+        # Counters
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def enqueue(self, packet: QueuedPacket):
+        """Queue a packet (event loop thread only); drops the oldest when full"""
+        if len(self._queue) >= self.MAX_QUEUE_SIZE:
+            self.drop(self._queue.popleft())
+        self._queue.append(packet)
+        self._wakeup.set()
+
+    def drop(self, packet: QueuedPacket):
+        self.dropped += 1
+        if self.on_drop:
+            self.on_drop(self, packet)
+
+    async def run(self):
+        """Connect (with backoff) and send queued packets until cancelled"""
+        backoff = 1.0
+        while not self.sio.connected:
+            try:
+                await self.sio.connect(
+                    self.url,
+                    transports=['websocket'],
+                    wait=True,
+                    wait_timeout=config.RELAY_TARGET_TIMEOUT_MS / 1000
+                )
+            except Exception as e:
+                logger.error(f"❌ [{self.index}] Failed to connect: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            packet = self._queue.popleft()
+            if packet.conflatable and time.monotonic() - packet.queued_at > self.MAX_AGE:
+                self.drop(packet)
+                continue
+            if not self.sio.connected:
+                # Reconnecting: the client spools what it can
+                self.drop(packet)
+                continue
+
+            try:
+                with perf.measure('emit'):
+                    await self.sio.emit(packet.wire_event, packet.wire_data)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"[{self.index}] Failed to emit {packet.event}: {e}")
+                self.drop(packet)
+
+    async def disconnect(self):
+        if self.sio.connected:
+            try:
+                await self.sio.disconnect()
+            except Exception:
+                pass
+        self.connected = False
+
+
+class AsyncPitBoxClient(PitBoxClient):
+    """
+    PitBoxClient on asyncio: same protocol and packet building, but emit()
+    only queues packets; one coroutine per backend target sends them.
+
+    Targets come from RELAY_BACKENDS (RELAY_BACKEND_MODE 'single' sends to the
+    primary only, 'parallel' fans out to all), falling back to a single URL.
+    send_* methods can be called from any thread (e.g. the video encoder).
+
+    Packets a target drops are not lost silently: SPOOL_EVENTS dropped by the
+    primary target go to the spool, and a dropped strategy or controls delta
+    packet makes the next one a keyframe.
+    """
+
+    # Telemetry streams: only the newest data matters, stale packets are dropped
+    CONFLATABLE_EVENTS = {
+        'telemetry', 'telemetry_binary', 'telemetry:baseline', 'telemetry:controls',
+        'telemetry:controls:delta', 'telemetry:v2', 'telemetry:batch', 'telemetry:v2:batch',
+        'telemetry:controls:delta:batch', 'video_frame',
+    }
+
+    def __init__(self, url: str = None):
+        if config.RELAY_TRANSPORT != 'socketio':
+            logger.warning(f"⚠️ RELAY_TRANSPORT={config.RELAY_TRANSPORT} isn't supported in async mode, using Socket.IO")
+        urls = [u.strip() for u in config.RELAY_BACKENDS.split(',') if u.strip()]
+        if not urls:
+            urls = [url or config.CLOUD_URL]
+        self.targets = [AsyncTarget(u, i, on_drop=self._on_dropped) for i, u in enumerate(urls)]
+        self.parallel = config.RELAY_BACKEND_MODE == 'parallel'
+        self.primary_index = min(max(config.RELAY_PRIMARY_INDEX, 0), len(self.targets) - 1)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._tasks: List[asyncio.Task] = []
+
+        super().__init__(urls[self.primary_index])
+
+    def _create_sio(self):
+        return self.targets[self.primary_index].sio
+
+    def _setup_handlers(self):
+        """Connection handlers per target; message handlers on every target"""
+        for target in self.targets:
+            self._setup_target_handlers(target)
+            self._setup_message_handlers(target.sio)
+
+    def _setup_target_handlers(self, target: AsyncTarget):
+        sio = target.sio
+
+        @sio.event
+        async def connect():
+            target.connected = True
+            target.compressor = None  # Uncompressed until the server accepts a codec
+            self.connected = True
+            self.strategy.request_keyframe()  # Server may have missed deltas
+            self.controls_delta.request_keyframe()
+            logger.info(f"✅ [{target.index}] Connected to PitBox Server at {target.url}")
+            if self.compression_codecs:
+                await sio.emit('relay:capabilities', self.capabilities())
+            # Register as relay for this session
+            if self.session_id:
+                await sio.emit('relay:register', {'sessionId': self.session_id})
+                if self.sends_schema():
+                    await sio.emit('telemetry:schema', self.telemetry_schema())
+
+        @sio.event
+        async def disconnect():
+            target.connected = False
+            target.compressor = None
+            self.connected = any(t.connected for t in self._active_targets())
+            if not self.connected:
+                self.batcher.clear()
+                self.controls_delta.request_keyframe()  # Cleared samples were already committed
+            logger.warning(f"⚠️ [{target.index}] Disconnected from PitBox Server")
+
+        @sio.event
+        async def connect_error(error):
+            logger.error(f"❌ [{target.index}] Connection error: {error}")
+
+        @sio.on('relay:capabilities')
+        async def on_capabilities(data):
+            target.compressor = self._negotiate_compression(data or {})
+
+    def _active_targets(self) -> List[AsyncTarget]:
+        if config.RELAY_KILL_SWITCH:
+            return []
+        return self.targets if self.parallel else [self.targets[self.primary_index]]
+
+    # =========================================================================
+    # Lifecycle (coroutines - run on the agent's event loop)
+    # =========================================================================
+
+    async def start(self):
+        """Start one connect/send task per active target"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if config.RELAY_KILL_SWITCH:
+            logger.warning("🛑 KILL SWITCH ACTIVE - No backends will be connected")
+            return
+
+        for target in self._active_targets():
+            logger.info(f"🔌 Connecting to PitBox Server at {target.url}...")
+            self._tasks.append(asyncio.create_task(target.run(), name=f'relay-target-{target.index}'))
+
+    async def stop(self):
+        """Cancel the send tasks and disconnect every target"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.gather(*(t.disconnect() for t in self.targets))
+        self.connected = False
+        if self.recorder:
+            self.recorder.flush()
+        if self.spool:
+            self.spool.close()
+        logger.info("🔌 Disconnected from PitBox Server")
+
+    def connect(self) -> bool:
+        raise RuntimeError("AsyncPitBoxClient connects via 'await start()'")
+
+    def disconnect(self):
+        raise RuntimeError("AsyncPitBoxClient disconnects via 'await stop()'")
+
+    # =========================================================================
+    # Sending
+    # =========================================================================
+
+    def is_connected(self) -> bool:
+        return any(t.connected for t in self._active_targets())
+
+    def _send(self, event: str, data: Dict[str, Any]) -> bool:
+        """Queue an event for every active target (never blocks)"""
+        if self.recorder:
+            self.recorder.record(event, data)
+        if threading.get_ident() == self._loop_thread:
+            self._enqueue(event, data)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, event, data)
+        logger.debug(f"📤 Queued {event}")
+        return True
+
+    def _enqueue(self, event: str, data: Dict[str, Any]):
+        conflatable = event in self.CONFLATABLE_EVENTS
+        for target in self._active_targets():
+            if not target.connected:
+                target.drop(QueuedPacket(event, data, event, data, conflatable, time.monotonic()))
+                continue
+            wire_event, wire_data = self._compress(target.compressor, event, data)
+            target.enqueue(QueuedPacket(event, data, wire_event, wire_data, conflatable, time.monotonic()))
+
+    def _on_dropped(self, target: AsyncTarget, packet: QueuedPacket):
+        """A target gave up a packet: keep the delta streams consistent, spool events"""
+        if packet.event == 'strategy_update':
+            self.strategy.request_keyframe()
+        elif packet.event.startswith('telemetry:controls:delta'):
+            self.controls_delta.request_keyframe()
+        if target is self.targets[self.primary_index] and self.spools(packet.event):
+            self.spool.append(packet.event, packet.data)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            t.url: {'sent': t.sent, 'failed': t.failed, 'dropped': t.dropped, 'pending': len(t._queue)}
+            for t in self.targets
+        }
@@ -11,8 +11,6 @@ Supports:
 import logging
 import queue
 import random
-import socketio
-import socketio.exceptions
 import threading
 import time
 from dataclasses import dataclass, field
@@ -20,6 +18,7 @@ from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
 import config
+from transport import create_transport
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +62,7 @@ class ParitySnapshot:
 
 class BackendTarget:
     """
-    Single backend target with its own Socket.IO client and queue
+    Single backend target with its own connection (RELAY_TRANSPORT) and queue
     """
     
     MAX_QUEUE_SIZE = 500
@@ -93,14 +92,13 @@ class BackendTarget:
         # Queue (bounded)
         self.queue: queue.Queue = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
         
-        # Socket.IO client
-        self.sio = socketio.Client(
+        # Socket.IO client, or raw WebSocket transport
+        self.sio = create_transport(
+            config.RELAY_TRANSPORT,
             reconnection=True,
             reconnection_attempts=5,
             reconnection_delay=1,
-            reconnection_delay_max=10,
-            logger=False,
-            engineio_logger=False
+            reconnection_delay_max=10
         )
         self._setup_handlers()
         
@@ -0,0 +1,254 @@
+"""
+PitBox Relay Agent - Binary Codec
+Versioned fixed-layout binary encoding for the v2 baseline and controls streams,
+and the whole-grid telemetry_binary layout
+"""
+import logging
+import math
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Codec version (header byte 0). Bump on any header change.
+CODEC_VERSION = 2
+
+# Header: version, stream id, schema hash, seq, timestamp (ms since epoch)
+HEADER = struct.Struct('<BBIIQ')
+
+
+class CodecError(ValueError):
+    """Packet can't be encoded or decoded with this schema"""
+
+
+@dataclass(frozen=True)
+class StreamLayout:
+    """
+    Fixed struct layout for one stream's payload.
+
+    fields: (name, struct format char) in wire order. Float fields listed in
+    optional may be None (sent as NaN).
+    """
+    stream_id: int
+    name: str
+    fields: Tuple[Tuple[str, str], ...]
+    optional: Tuple[str, ...] = ()
+    payload_struct: struct.Struct = field(init=False, repr=False, compare=False)
+    schema_hash: int = field(init=False, compare=False)
+
+    def __post_init__(self):
+        fmt = '<' + ''.join(code for _, code in self.fields)
+        object.__setattr__(self, 'payload_struct', struct.Struct(fmt))
+        # Hash of everything a decoder depends on: any layout change changes it
+        desc = f"v{CODEC_VERSION}:{self.stream_id}:{self.name}:{fmt}:" + ','.join(
+            name for name, _ in self.fields
+        ) + ':' + ','.join(self.optional)
+        object.__setattr__(self, 'schema_hash', zlib.crc32(desc.encode()))
+
+    @property
+    def size(self) -> int:
+        """Encoded packet size (header + payload) in bytes"""
+        return HEADER.size + self.payload_struct.size
+
+
+BASELINE = StreamLayout(1, 'baseline', (
+    ('speed', 'f'),
+    ('rpm', 'f'),
+    ('lapDistPct', 'f'),
+    ('fuelLevel', 'f'),
+    ('fuelPct', 'f'),
+    ('gapAhead', 'f'),
+    ('gapBehind', 'f'),
+    ('sessionFlags', 'I'),
+    ('lap', 'h'),
+    ('gear', 'b'),
+    ('position', 'B'),
+), optional=('gapAhead', 'gapBehind'))
+
+CONTROLS = StreamLayout(2, 'controls', (
+    ('throttle', 'f'),
+    ('brake', 'f'),
+    ('clutch', 'f'),
+    ('steering', 'f'),
+    ('rpm', 'f'),
+    ('speed', 'f'),
+    ('gear', 'b'),
+))
+
+STREAMS: Dict[str, StreamLayout] = {layout.name: layout for layout in (BASELINE, CONTROLS)}
+STREAMS_BY_ID: Dict[int, StreamLayout] = {layout.stream_id: layout for layout in STREAMS.values()}
+
+
+@dataclass
+class DecodedPacket:
+    version: int
+    stream: str
+    schema_hash: int
+    seq: int
+    ts: int  # ms since epoch
+    payload: Dict[str, Any]
+
+
+def schema() -> Dict[str, Any]:
+    """Schema description sent to the server ('telemetry:schema') so it can decode packets"""
+    return {
+        'version': CODEC_VERSION,
+        'header': {'format': HEADER.format, 'fields': ['version', 'streamId', 'schemaHash', 'seq', 'ts']},
+        'streams': {
+            layout.name: {
+                'id': layout.stream_id,
+                'hash': layout.schema_hash,
+                'format': layout.payload_struct.format,
+                'fields': [name for name, _ in layout.fields],
+                'optional': list(layout.optional),
+                'size': layout.size,
+            }
+            for layout in STREAMS.values()
+        },
+    }
+
+
+def encode_packet(stream: str, seq: int, ts_ms: float, payload: Dict[str, Any]) -> bytes:
+    """
+    Encode one stream packet. Missing fields are sent as 0 (optional ones as NaN).
+
+    Raises:
+        CodecError: Unknown stream or a value out of range for its field
+    """
+    layout = STREAMS.get(stream)
+    if layout is None:
+        raise CodecError(f"Unknown stream: {stream}")
+
+    values = []
+    for name, code in layout.fields:
+        value = payload.get(name)
+        if value is None:
+            value = math.nan if name in layout.optional else 0
+        elif code != 'f':
+            value = int(value)
+        values.append(value)
+
+    try:
+        return HEADER.pack(
+            CODEC_VERSION, layout.stream_id, layout.schema_hash,
+            seq & 0xFFFFFFFF, int(ts_ms)
+        ) + layout.payload_struct.pack(*values)
+    except struct.error as e:
+        raise CodecError(f"Can't encode {stream} packet: {e}") from e
+
+
+def decode_packet(data: bytes) -> DecodedPacket:
+    """
+    Decode one stream packet.
+
+    Raises:
+        CodecError: Wrong version, unknown stream, schema mismatch or bad length
+    """
+    if len(data) < HEADER.size:
+        raise CodecError(f"Packet too short: {len(data)} bytes")
+    version, stream_id, schema_hash, seq, ts = HEADER.unpack_from(data)
+    if version != CODEC_VERSION:
+        raise CodecError(f"Unsupported codec version: {version}")
+    layout = STREAMS_BY_ID.get(stream_id)
+    if layout is None:
+        raise CodecError(f"Unknown stream id: {stream_id}")
+    if schema_hash != layout.schema_hash:
+        raise CodecError(f"Schema mismatch for {layout.name}: {schema_hash:#010x}")
+    if len(data) != layout.size:
+        raise CodecError(f"Bad {layout.name} packet length: {len(data)} (expected {layout.size})")
+
+    values = layout.payload_struct.unpack_from(data, HEADER.size)
+    payload = {}
+    for (name, _), value in zip(layout.fields, values):
+        if name in layout.optional and math.isnan(value):
+            value = None
+        payload[name] = value
+    return DecodedPacket(version, layout.name, schema_hash, seq, ts, payload)
+
+
+def decode_packets(data: bytes) -> List[DecodedPacket]:
+    """
+    Decode concatenated stream packets (a 'telemetry:v2:batch' payload).
+
+    Raises:
+        CodecError: Any packet that decode_packet() would reject
+    """
+    packets = []
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < HEADER.size:
+            raise CodecError(f"Truncated packet at offset {offset}")
+        layout = STREAMS_BY_ID.get(data[offset + 1])
+        if layout is None:
+            raise CodecError(f"Unknown stream id: {data[offset + 1]}")
+        packets.append(decode_packet(data[offset:offset + layout.size]))
+        offset += layout.size
+    return packets
+
+
+# =========================================================================
+# Whole-grid telemetry (telemetry_binary)
+# =========================================================================
+
+# Header: timestamp (ms, double), car count
+GRID_HEADER = struct.Struct('<dB')
+
+# One record per car - same bytes as struct '<HffHBx'
+GRID_CAR_DTYPE = np.dtype([
+    ('carId', '<u2'),
+    ('lapDistPct', '<f4'),
+    ('speed', '<f4'),
+    ('lap', '<u2'),
+    ('position', 'u1'),
+    ('flags', 'u1'),  # Reserved (0)
+])
+
+# Car count is a u8
+MAX_GRID_CARS = 0xFF
+
+
+def pack_grid(
+    ts_ms: float,
+    car_ids: np.ndarray,
+    lap_dist_pct: np.ndarray,
+    speed: np.ndarray,
+    lap: np.ndarray,
+    position: np.ndarray
+) -> bytes:
+    """
+    Pack per-car columns (all the same length, one entry per car) into the
+    telemetry_binary layout in one vectorised pass: header + <HffHBx per car.
+    Laps and positions are clipped to their field ranges.
+    """
+    count = len(car_ids)
+    if count > MAX_GRID_CARS:
+        raise CodecError(f"Too many cars for telemetry_binary: {count}")
+
+    records = np.zeros(count, dtype=GRID_CAR_DTYPE)
+    records['carId'] = car_ids
+    records['lapDistPct'] = lap_dist_pct
+    records['speed'] = speed
+    records['lap'] = np.clip(lap, 0, 0xFFFF)
+    records['position'] = np.clip(position, 0, 0xFF)
+    return GRID_HEADER.pack(ts_ms, count) + records.tobytes()
+
+
+def unpack_grid(data: bytes) -> Tuple[float, np.ndarray]:
+    """
+    Decode a telemetry_binary payload.
+
+    Returns:
+        (timestamp ms, structured array of GRID_CAR_DTYPE records)
+    """
+    if len(data) < GRID_HEADER.size:
+        raise CodecError(f"Packet too short: {len(data)} bytes")
+    ts, count = GRID_HEADER.unpack_from(data)
+    expected = GRID_HEADER.size + count * GRID_CAR_DTYPE.itemsize
+    if len(data) != expected:
+        raise CodecError(f"Bad telemetry_binary length: {len(data)} (expected {expected})")
+    return ts, np.frombuffer(data, dtype=GRID_CAR_DTYPE, count=count, offset=GRID_HEADER.size)
@@ -0,0 +1,320 @@
+"""
+PitBox Relay Agent - Packet Compression
+Per-message zstd (or zlib fallback) compression with a dictionary trained on
+recorded relay traffic, plus the offline recorder, trainer and benchmark
+"""
+import argparse
+import json
+import logging
+import struct
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import zstandard as zstd
+except ImportError:
+    # zlib (stdlib) is always available as the fallback codec
+    zstd = None
+
+logger = logging.getLogger(__name__)
+
+
+ZSTD = 'zstd'
+ZLIB = 'zlib'
+
+# Envelope for compressed JSON messages: {'event', 'compression', 'dictId', 'data'}
+COMPRESSED_EVENT = 'compressed'
+
+# Recording: <event name length u16, body length u32> + event name + body
+RECORD_HEADER = struct.Struct('<HI')
+
+# zlib only looks back 32 KB, so only the tail of a dictionary is useful to it
+ZLIB_MAX_DICT = 32 * 1024
+
+
+def available_codecs() -> List[str]:
+    """Codecs this install can use, best first"""
+    return [ZSTD, ZLIB] if zstd is not None else [ZLIB]
+
+
+def dictionary_id(dictionary: Optional[bytes]) -> Optional[int]:
+    """Id the server uses to pick the matching dictionary (CRC32 of its bytes)"""
+    return zlib.crc32(dictionary) if dictionary else None
+
+
+def load_dictionary(path: str) -> Optional[bytes]:
+    """Read a dictionary file ('' = none)"""
+    if not path:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        logger.warning(f"⚠️ Compression dictionary not loaded ({path}): {e}")
+        return None
+
+
+def serialize(data: Any) -> bytes:
+    """Message body as compressed/recorded: raw bytes or compact JSON"""
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    return json.dumps(data, separators=(',', ':'), default=str).encode()
+
+
+class PacketCompressor:
+    """
+    Compresses one message at a time (no shared stream state, so any packet
+    can be decoded on its own or after a reconnect). The dictionary primes
+    every message with the field names and values that repeat across frames.
+    """
+
+    def __init__(self, codec: str, dictionary: Optional[bytes] = None, level: int = 3):
+        if codec not in available_codecs():
+            raise ValueError(f"Compression codec not available: {codec}")
+        self.codec = codec
+        self.dictionary = dictionary or None
+        self.dict_id = dictionary_id(self.dictionary)
+        self.level = level
+
+        if codec == ZSTD:
+            dict_data = zstd.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+            self._zstd = zstd.ZstdCompressor(level=level, dict_data=dict_data)
+        else:
+            self._zdict = self.dictionary[-ZLIB_MAX_DICT:] if self.dictionary else None
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == ZSTD:
+            return self._zstd.compress(data)
+        if self._zdict is None:
+            return zlib.compress(data, self.level)
+        compressor = zlib.compressobj(self.level, zdict=self._zdict)
+        return compressor.compress(data) + compressor.flush()
+
+
+class PacketDecompressor:
+    """Inverse of PacketCompressor (server side; used by the benchmark and tests)"""
+
+    def __init__(self, codec: str, dictionary: Optional[bytes] = None):
+        self.codec = codec
+        self.dictionary = dictionary or None
+        if codec == ZSTD:
+            dict_data = zstd.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+            self._zstd = zstd.ZstdDecompressor(dict_data=dict_data)
+        else:
+            self._zdict = self.dictionary[-ZLIB_MAX_DICT:] if self.dictionary else None
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.codec == ZSTD:
+            return self._zstd.decompress(data)
+        if self._zdict is None:
+            return zlib.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self._zdict)
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+def compress_message(
+    compressor: PacketCompressor,
+    event: str,
+    data: Dict[str, Any],
+    min_bytes: int
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compressed form of one outgoing message, or the message unchanged when
+    it's too small or doesn't shrink.
+
+    Messages with a bytes 'payload' (binary streams) keep their event and
+    get the payload compressed plus 'compression'/'dictId'. Anything else
+    is sent as a COMPRESSED_EVENT envelope holding the compressed JSON.
+    """
+    binary = isinstance(data.get('payload'), (bytes, bytearray))
+    body = serialize(data['payload'] if binary else data)
+    if len(body) < min_bytes:
+        return event, data
+
+    packed = compressor.compress(body)
+    if len(packed) >= len(body):
+        return event, data
+
+    if binary:
+        return event, {**data, 'payload': packed, 'compression': compressor.codec, 'dictId': compressor.dict_id}
+    return COMPRESSED_EVENT, {
+        'event': event,
+        'compression': compressor.codec,
+        'dictId': compressor.dict_id,
+        'data': packed,
+    }
+
+
+def negotiate(
+    offered: Sequence[str],
+    reply: Dict[str, Any],
+    dictionary: Optional[bytes],
+    level: int
+) -> Optional[PacketCompressor]:
+    """
+    Compressor for the server's 'relay:capabilities' reply:
+    {'compression': codec or None, 'dictId': id of our dictionary if it has it}.
+    """
+    codec = reply.get('compression')
+    if not codec:
+        return None
+    if codec not in offered:
+        logger.warning(f"⚠️ Server picked a compression codec we didn't offer: {codec}")
+        return None
+    if dictionary is not None and reply.get('dictId') != dictionary_id(dictionary):
+        dictionary = None  # Server doesn't have our dictionary
+    return PacketCompressor(codec, dictionary, level)
+
+
+# =========================================================================
+# Offline: recording, dictionary training, benchmark
+# =========================================================================
+
+class TrafficRecorder:
+    """Appends every outgoing message (event + serialized body) to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'ab')
+
+    def record(self, event: str, data: Any):
+        if isinstance(data, dict) and isinstance(data.get('payload'), (bytes, bytearray)):
+            data = data['payload']
+        name = event.encode()
+        body = serialize(data)
+        self._file.write(RECORD_HEADER.pack(len(name), len(body)) + name + body)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_recording(path: str) -> Iterator[Tuple[str, bytes]]:
+    """(event, body) for every message in a TrafficRecorder file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        name_len, body_len = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        event = data[offset:offset + name_len].decode()
+        offset += name_len
+        yield event, data[offset:offset + body_len]
+        offset += body_len
+
+
+def train_dictionary(samples: List[bytes], size: int = 32 * 1024) -> bytes:
+    """
+    Dictionary from recorded message bodies. With zstd installed this is a
+    trained zstd dictionary; otherwise raw content (the newest samples),
+    which both codecs can use.
+    """
+    if zstd is not None:
+        return zstd.train_dictionary(size, samples).as_bytes()
+
+    # Newest samples that fit, in recorded order (zlib favours the dictionary tail)
+    content = bytearray()
+    for sample in reversed(samples):
+        if len(content) + len(sample) > size:
+            continue
+        content[:0] = sample
+    return bytes(content)
+
+
+def benchmark(
+    messages: List[Tuple[str, bytes]],
+    dictionary: Optional[bytes] = None,
+    level: int = 3
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Ratio and CPU time per message type for every available codec, with and
+    without the dictionary. Every message is round-tripped.
+
+    Returns:
+        {label: {event: {'count', 'bytes', 'compressed', 'ratio', 'compressUs', 'decompressUs'}}}
+    """
+    configs = []
+    for codec in available_codecs():
+        configs.append((codec, codec, None))
+        if dictionary:
+            configs.append((f'{codec}+dict', codec, dictionary))
+
+    results = {}
+    for label, codec, dict_data in configs:
+        compressor = PacketCompressor(codec, dict_data, level)
+        decompressor = PacketDecompressor(codec, dict_data)
+        totals = defaultdict(lambda: {'count': 0, 'bytes': 0, 'compressed': 0, 'compress': 0.0, 'decompress': 0.0})
+        for event, body in messages:
+            t0 = time.perf_counter()
+            packed = compressor.compress(body)
+            t1 = time.perf_counter()
+            restored = decompressor.decompress(packed)
+            t2 = time.perf_counter()
+            if restored != body:
+                raise RuntimeError(f"{label}: {event} did not round-trip")
+            stats = totals[event]
+            stats['count'] += 1
+            stats['bytes'] += len(body)
+            stats['compressed'] += len(packed)
+            stats['compress'] += t1 - t0
+            stats['decompress'] += t2 - t1
+
+        results[label] = {
+            event: {
+                'count': s['count'],
+                'bytes': s['bytes'],
+                'compressed': s['compressed'],
+                'ratio': s['bytes'] / s['compressed'] if s['compressed'] else 0.0,
+                'compressUs': s['compress'] / s['count'] * 1e6,
+                'decompressUs': s['decompress'] / s['count'] * 1e6,
+            }
+            for event, s in sorted(totals.items())
+        }
+    return results
+
+
+def _print_benchmark(results: Dict[str, Dict[str, Dict[str, float]]]):
+    for label, events in results.items():
+        print(f"\n{label}")
+        print(f"  {'event':<24} {'msgs':>6} {'avg B':>7} {'-> B':>7} {'ratio':>6} {'comp us':>8} {'dec us':>8}")
+        for event, s in events.items():
+            print(
+                f"  {event:<24} {s['count']:>6} {s['bytes'] / s['count']:>7.0f} "
+                f"{s['compressed'] / s['count']:>7.0f} {s['ratio']:>6.2f} "
+                f"{s['compressUs']:>8.1f} {s['decompressUs']:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PitBox relay compression tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    train = sub.add_parser('train', help='Train a dictionary from a traffic recording')
+    train.add_argument('recording', help='File written with COMPRESSION_RECORD')
+    train.add_argument('-o', '--output', default='relay.dict')
+    train.add_argument('--size', type=int, default=32 * 1024, help='Dictionary size (bytes)')
+
+    bench = sub.add_parser('bench', help='Compression ratio and CPU per message type')
+    bench.add_argument('recording', help='File written with COMPRESSION_RECORD')
+    bench.add_argument('--dict', default='', help='Dictionary file')
+    bench.add_argument('--level', type=int, default=3)
+
+    args = parser.parse_args()
+    messages = list(read_recording(args.recording))
+    print(f"{len(messages)} messages, codecs: {', '.join(available_codecs())}")
+
+    if args.command == 'train':
+        dictionary = train_dictionary([body for _, body in messages], args.size)
+        with open(args.output, 'wb') as f:
+            f.write(dictionary)
+        print(f"Wrote {args.output} ({len(dictionary)} bytes, id {dictionary_id(dictionary)})")
+    else:
+        _print_benchmark(benchmark(messages, load_dictionary(args.dict), args.level))
+
+
+if __name__ == '__main__':
+    main()
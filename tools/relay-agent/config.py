@@ -37,6 +37,66 @@ JOYSTICK_BUTTON = 0
 POLL_RATE_HZ = int(os.getenv('POLL_RATE_HZ', '10'))  # Telemetry updates per second
 POLL_INTERVAL = 1.0 / POLL_RATE_HZ
 
+# High-rate capture: snapshot every 60 Hz sim tick on a background thread
+# (feeds MoTeC logging at full rate without speeding up the network loop)
+CAPTURE_ENABLED = os.getenv('CAPTURE_ENABLED', 'false').lower() == 'true'
+CAPTURE_SECONDS = float(os.getenv('CAPTURE_SECONDS', '120'))  # Ring buffer history
+
+# Run encoding and network sends on their own threads (bounded queues) so a
+# socket stall never delays sampling
+PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'true').lower() == 'true'
+
+# Per-stage latency histograms (exposed at /debug/perf)
+PERF_ENABLED = os.getenv('PERF_ENABLED', 'true').lower() == 'true'
+PERF_TICK_BUDGET_MS = float(os.getenv('PERF_TICK_BUDGET_MS', '5'))  # Per processed frame
+PERF_STAGE_BUDGETS_MS = os.getenv('PERF_STAGE_BUDGETS_MS', '')  # e.g. "read=0.5,emit=1"
+
+# Send the v2 baseline/controls streams with the binary codec ('telemetry:v2')
+# instead of JSON dicts (server must support binary_codec schema v2)
+BINARY_STREAMS = os.getenv('BINARY_STREAMS', 'false').lower() == 'true'
+
+# Controls stream rate, and quantised delta encoding for it
+# ('telemetry:controls:delta': a few bytes per sample instead of a JSON dict)
+CONTROLS_RATE_HZ = float(os.getenv('CONTROLS_RATE_HZ', '15'))
+CONTROLS_DELTA = os.getenv('CONTROLS_DELTA', 'false').lower() == 'true'
+CONTROLS_QUANT_STEPS = os.getenv('CONTROLS_QUANT_STEPS', '')  # e.g. "throttle=0.001,steering=0.0005"
+CONTROLS_KEYFRAME_EVERY = int(os.getenv('CONTROLS_KEYFRAME_EVERY', '60'))  # Packets
+
+# Opt-in disk spool for messages sent while disconnected (events, incidents...),
+# replayed on reconnect tagged 'replayed': true. Delta-encoded streams
+# (strategy_update) don't belong here: their deltas would replay after newer state
+SPOOL_ENABLED = os.getenv('SPOOL_ENABLED', 'false').lower() == 'true'
+SPOOL_DIR = os.getenv('SPOOL_DIR', str(Path(__file__).parent / 'spool'))
+SPOOL_MAX_MB = float(os.getenv('SPOOL_MAX_MB', '64'))  # Oldest segments are evicted beyond this
+SPOOL_SEGMENT_KB = int(os.getenv('SPOOL_SEGMENT_KB', '1024'))
+SPOOL_FSYNC = os.getenv('SPOOL_FSYNC', 'segment')  # always | segment | never
+SPOOL_DRAIN_RATE = float(os.getenv('SPOOL_DRAIN_RATE', '50'))  # Replayed messages per second
+SPOOL_EVENTS = os.getenv('SPOOL_EVENTS', 'event,incident,race_event,driver_update')
+
+# Micro-batch v2 stream samples: per-stream latency window in ms, e.g.
+# "controls=100,baseline=250" (empty = every sample is its own packet)
+BATCH_WINDOWS_MS = os.getenv('BATCH_WINDOWS_MS', '')
+
+# Per-message compression, offered to the server on connect (it picks one):
+# codecs in order of preference, e.g. "zstd,zlib" (empty = off; zstd needs
+# the zstandard package). COMPRESSION_DICT is a dictionary trained with
+# `python compression.py train` on a COMPRESSION_RECORD recording.
+COMPRESSION = os.getenv('COMPRESSION', '')
+COMPRESSION_DICT = os.getenv('COMPRESSION_DICT', '')
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '3'))
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '64'))  # Smaller messages go as-is
+COMPRESSION_RECORD = os.getenv('COMPRESSION_RECORD', '')  # Record outgoing traffic to this file
+
+# Protocol model validation of outgoing messages: full (every message),
+# sampled (every VALIDATION_SAMPLE_EVERY-th of each type), first (first of
+# each type) or off
+VALIDATION_MODE = os.getenv('VALIDATION_MODE', 'full')
+VALIDATION_SAMPLE_EVERY = int(os.getenv('VALIDATION_SAMPLE_EVERY', '100'))
+VALIDATION_LOG_INTERVAL = float(os.getenv('VALIDATION_LOG_INTERVAL', '10'))  # Seconds between logs per type
+
+# Strategy stream: full keyframe this often, changed cars/fields only in between
+STRATEGY_KEYFRAME_SECONDS = float(os.getenv('STRATEGY_KEYFRAME_SECONDS', '10'))
+
 # Incident Detection Thresholds
 INCIDENT_THRESHOLD = int(os.getenv('INCIDENT_THRESHOLD', '1'))  # Min incident count change to report
 POSITION_JUMP_THRESHOLD = float(os.getenv('POSITION_JUMP_THRESHOLD', '0.05'))  # 5% track position jump
@@ -90,9 +150,17 @@ RELAY_TARGETS_ENABLED = os.getenv('RELAY_TARGETS_ENABLED', '')
 # Parity sample rate: fraction of frames that request ack (0.0 - 1.0)
 RELAY_PARITY_SAMPLE_RATE = float(os.getenv('RELAY_PARITY_SAMPLE_RATE', '0.05'))
 
+# Wire transport to every backend: 'socketio' (default) or 'websocket' (raw
+# WebSocket with a binary envelope, see transport.py; server must support it)
+RELAY_TRANSPORT = os.getenv('RELAY_TRANSPORT', 'socketio')
+RELAY_WS_PATH = os.getenv('RELAY_WS_PATH', '/relay/ws')  # Endpoint path for 'websocket'
+
 # Debug server port (local only)
 RELAY_DEBUG_PORT = int(os.getenv('RELAY_DEBUG_PORT', '8765'))
 
+# Start the debug server with the relay agent
+RELAY_DEBUG_SERVER = os.getenv('RELAY_DEBUG_SERVER', '0') == '1'
+
 # Flag State Mapping (iRacing SessionFlags to PitBox)
 FLAG_STATES = {
     'green': 'green',
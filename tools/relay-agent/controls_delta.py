@@ -0,0 +1,235 @@
+"""
+PitBox Relay Agent - Controls Delta Codec
+Quantised, delta + zigzag-varint encoding for the controls stream
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from binary_codec import CodecError
+
+logger = logging.getLogger(__name__)
+
+
+# Channels in wire order, with their default quantisation step
+CHANNELS: Tuple[Tuple[str, float], ...] = (
+    ('throttle', 0.001),   # 0..1
+    ('brake', 0.001),      # 0..1
+    ('clutch', 0.001),     # 0..1
+    ('steering', 0.001),   # radians
+    ('rpm', 1.0),
+    ('speed', 0.01),       # m/s
+    ('gear', 1.0),
+)
+
+# Packet flags (byte 0)
+FLAG_KEYFRAME = 0x01
+
+
+def parse_steps(spec: str) -> Dict[str, float]:
+    """Quantisation steps: CHANNELS defaults overridden by "channel=step,channel=step" """
+    steps = dict(CHANNELS)
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        name, step = item.split('=', 1)
+        name = name.strip()
+        try:
+            value = float(step)
+        except ValueError:
+            value = 0.0
+        if name not in steps or value <= 0:
+            logger.warning(f"Ignoring invalid controls step: {item!r}")
+            continue
+        steps[name] = value
+    return steps
+
+
+# =========================================================================
+# Varints
+# =========================================================================
+
+def zigzag(n: int) -> int:
+    """Signed -> unsigned, small magnitudes stay small (0, -1, 1, -2 -> 0, 1, 2, 3)"""
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def unzigzag(n: int) -> int:
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+def write_varint(out: bytearray, n: int):
+    """Unsigned LEB128"""
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """(value, next offset)"""
+    result = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise CodecError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+# =========================================================================
+# Encoder / decoder
+# =========================================================================
+
+class ControlsDeltaEncoder:
+    """
+    Encodes controls samples as:
+
+    - keyframe: flags, seq (varint), ts ms (varint), every channel's
+      quantised value (zigzag varint)
+    - delta:    flags, seq & 0xFF, ts ms since the previous packet (zigzag
+      varint), every channel's change in quantised steps (zigzag varint)
+
+    Deltas are taken against the previous *quantised* values, so there is no
+    drift: the receiver reconstructs exactly value = q * step. An unchanged
+    channel costs one byte, so a delta is ~10 bytes.
+
+    A keyframe is sent every keyframe_every packets, on request (reconnect,
+    server 'controls:keyframe') and after a gap (failed send or skipped seq).
+    As with StrategyDeltaEncoder, commit() records whether the last encoded
+    packet was handed to the transport.
+    """
+
+    def __init__(
+        self,
+        steps: Optional[Dict[str, float]] = None,
+        keyframe_every: int = config.CONTROLS_KEYFRAME_EVERY
+    ):
+        self.steps = steps or parse_steps(config.CONTROLS_QUANT_STEPS)
+        self.keyframe_every = max(1, keyframe_every)
+        self._names = [name for name, _ in CHANNELS]
+        self._prev: Optional[List[int]] = None   # Last sent quantised values
+        self._prev_seq = 0
+        self._prev_ts = 0
+        self._since_keyframe = 0
+        self._keyframe_requested = True
+        self._pending: Optional[Tuple[bool, int, int, List[int]]] = None
+
+    def request_keyframe(self):
+        self._keyframe_requested = True
+
+    def quantise(self, sample: Dict[str, Any]) -> List[int]:
+        return [int(round((sample.get(name) or 0) / self.steps[name])) for name in self._names]
+
+    def encode(self, seq: int, ts_ms: float, sample: Dict[str, Any]) -> bytes:
+        """Encode one sample (seq = controls stream sequence number)"""
+        values = self.quantise(sample)
+        ts = int(ts_ms)
+        keyframe = (
+            self._keyframe_requested
+            or self._prev is None
+            or seq != self._prev_seq + 1
+            or self._since_keyframe >= self.keyframe_every
+        )
+
+        out = bytearray()
+        if keyframe:
+            out.append(FLAG_KEYFRAME)
+            write_varint(out, seq)
+            write_varint(out, ts)
+            for value in values:
+                write_varint(out, zigzag(value))
+        else:
+            out.append(0)
+            out.append(seq & 0xFF)
+            write_varint(out, zigzag(ts - self._prev_ts))
+            for value, prev in zip(values, self._prev):
+                write_varint(out, zigzag(value - prev))
+
+        self._pending = (keyframe, seq, ts, values)
+        return bytes(out)
+
+    def commit(self, sent: bool):
+        """Record the outcome of sending the last encoded packet"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        if not sent:
+            self._keyframe_requested = True
+            return
+        keyframe, self._prev_seq, self._prev_ts, self._prev = pending
+        if keyframe:
+            self._keyframe_requested = False
+            self._since_keyframe = 0
+        self._since_keyframe += 1
+
+
+@dataclass
+class ControlsSample:
+    seq: int
+    ts: int  # ms since epoch
+    keyframe: bool
+    values: Dict[str, float]
+
+
+class ControlsDeltaDecoder:
+    """
+    Receiver side (reference for the server, used by tests): decodes one
+    packet or several concatenated ones (batches).
+    """
+
+    def __init__(self, steps: Optional[Dict[str, float]] = None):
+        self.steps = steps or dict(CHANNELS)
+        self._names = [name for name, _ in CHANNELS]
+        self._prev: Optional[List[int]] = None
+        self._prev_seq = 0
+        self._prev_ts = 0
+
+    def decode(self, data: bytes) -> List[ControlsSample]:
+        """
+        Raises:
+            CodecError: Truncated data, or a delta without its base (the
+                receiver should ask for a keyframe and drop deltas until then)
+        """
+        samples = []
+        offset = 0
+        while offset < len(data):
+            sample, offset = self._decode_one(data, offset)
+            samples.append(sample)
+        return samples
+
+    def _decode_one(self, data: bytes, offset: int) -> Tuple[ControlsSample, int]:
+        flags = data[offset]
+        offset += 1
+        keyframe = bool(flags & FLAG_KEYFRAME)
+        values = []
+        if keyframe:
+            seq, offset = read_varint(data, offset)
+            ts, offset = read_varint(data, offset)
+            for _ in self._names:
+                value, offset = read_varint(data, offset)
+                values.append(unzigzag(value))
+        else:
+            if offset >= len(data):
+                raise CodecError("Truncated controls delta")
+            seq_low = data[offset]
+            offset += 1
+            if self._prev is None or seq_low != (self._prev_seq + 1) & 0xFF:
+                self._prev = None
+                raise CodecError(f"Controls delta without base (seq & 0xFF = {seq_low})")
+            seq = self._prev_seq + 1
+            dt, offset = read_varint(data, offset)
+            ts = self._prev_ts + unzigzag(dt)
+            for prev in self._prev:
+                delta, offset = read_varint(data, offset)
+                values.append(prev + unzigzag(delta))
+
+        self._prev, self._prev_seq, self._prev_ts = values, seq, ts
+        return ControlsSample(seq, ts, keyframe, {
+            name: value * self.steps[name] for name, value in zip(self._names, values)
+        }), offset
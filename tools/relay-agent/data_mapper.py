@@ -3,8 +3,8 @@ ControlBox Relay Agent - Data Mapper
 Maps iRacing data structures to ControlBox relay protocol
 """
 import time
-from typing import List, Dict, Any, Optional
-from iracing_reader import SessionData, CarData
+from typing import List, Dict, Any, Optional, Union
+from iracing_reader import SessionData, CarData, DriverEntry
 import config
 
 
@@ -126,17 +126,20 @@ def map_incident(
 
 def map_driver_update(
     session_id: str,
-    car: CarData,
-    action: str = 'join'
+    car: Union[CarData, DriverEntry],
+    action: str = 'join',
+    previous: Optional[DriverEntry] = None
 ) -> Dict[str, Any]:
     """
     Map driver information to ControlBox DriverUpdateMessage
+    Actions: 'join', 'leave', 'swap' (previous = driver swapped out)
     """
-    return {
+    update = {
         'type': 'driver_update',
         'sessionId': session_id,
         'timestamp': int(time.time() * 1000),
         'action': action,
+        'carId': car.car_id,
         'driverId': car.driver_id,
         'driverName': car.driver_name,
         'carNumber': car.car_number,
@@ -145,12 +148,43 @@ def map_driver_update(
         'irating': car.irating,
         'safetyRating': car.safety_rating
     }
+    if previous is not None:
+        update['previousDriverId'] = previous.driver_id
+        update['previousDriverName'] = previous.driver_name
+    return update
+
+
+def map_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a detector event (pit:enter/exit, overlap:enter/exit, three_wide,
+    position:change, offtrack, flag:change) to a v2 event payload.
+    Event fields become camelCase; car_idx becomes carId plus driver info.
+    """
+    driver: Optional[DriverEntry] = event.get('driver')
+    payload = {
+        'carId': event['car_idx'],
+        'carNumber': driver.car_number if driver else None,
+        'driverName': driver.driver_name if driver else None,
+    }
+    for key, value in event.items():
+        if key in ('type', 'car_idx', 'driver'):
+            continue
+        if isinstance(value, float):
+            value = round(value, 3)
+        payload[_camel_case(key)] = value
+    return payload
 
 
 # ========================
 # Helper Functions
 # ========================
 
+def _camel_case(name: str) -> str:
+    """snake_case -> camelCase"""
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
 def _infer_discipline_category(session: SessionData) -> str:
     """
     Infer racing discipline from track/session info
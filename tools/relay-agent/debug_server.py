@@ -5,6 +5,7 @@ Provides:
 - GET /debug/targets - Target connection states and counters
 - GET /debug/parity - Parity metrics snapshot
 - GET /debug/health - Overall health and kill switch status
+- GET /debug/perf - Per-stage latency percentiles and budget overruns
 
 Binds to 127.0.0.1 only for security.
 """
@@ -28,6 +29,7 @@ class DebugHandler(BaseHTTPRequestHandler):
     get_target_stats: Optional[Callable] = None
     get_parity_snapshot: Optional[Callable] = None
     is_kill_switch_active: Optional[Callable] = None
+    get_perf_stats: Optional[Callable] = None
     
     def log_message(self, format, *args):
         """Suppress default HTTP logging"""
@@ -50,6 +52,8 @@ class DebugHandler(BaseHTTPRequestHandler):
                 self._handle_parity()
             elif self.path == '/debug/health':
                 self._handle_health()
+            elif self.path == '/debug/perf':
+                self._handle_perf()
             else:
                 self._send_json({'error': 'Not found'}, 404)
         except Exception as e:
@@ -146,11 +150,24 @@ class DebugHandler(BaseHTTPRequestHandler):
         })
 
 
+    def _handle_perf(self):
+        """GET /debug/perf - Per-stage latency histograms"""
+        if not self.get_perf_stats:
+            self._send_json({'error': 'Not initialized'}, 503)
+            return
+        
+        perf = self.get_perf_stats()
+        perf['timestamp'] = __import__('time').time() * 1000
+        self._send_json(perf)
+
+
 class DebugServer:
     """Debug HTTP server running on background thread"""
     
-    def __init__(self, get_target_stats: Callable, get_parity_snapshot: Callable, 
-                 is_kill_switch_active: Callable):
+    def __init__(self, get_target_stats: Optional[Callable] = None,
+                 get_parity_snapshot: Optional[Callable] = None,
+                 is_kill_switch_active: Optional[Callable] = None,
+                 get_perf_stats: Optional[Callable] = None):
         self.port = DEBUG_PORT
         self.server: Optional[HTTPServer] = None
         self.thread: Optional[threading.Thread] = None
@@ -159,6 +176,7 @@ class DebugServer:
         DebugHandler.get_target_stats = get_target_stats
         DebugHandler.get_parity_snapshot = get_parity_snapshot
         DebugHandler.is_kill_switch_active = is_kill_switch_active
+        DebugHandler.get_perf_stats = get_perf_stats
     
     def start(self):
         """Start the debug server"""
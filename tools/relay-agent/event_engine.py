@@ -0,0 +1,257 @@
+"""
+PitBox Relay Agent - Event Engine
+Spotter-grade v2 events (overlap, three-wide, position change, off-track, flag change)
+derived incrementally from each frame, with hysteresis
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from frame_snapshot import FrameSnapshot, MAX_CARS
+from incident_detector import TRACK_OFF_TRACK
+
+logger = logging.getLogger(__name__)
+
+
+# irsdk_CarLeftRight (player car spotter) -> side
+CAR_LEFT_RIGHT_SIDES = {
+    2: 'left',    # irsdk_LRCarLeft
+    3: 'right',   # irsdk_LRCarRight
+    4: 'both',    # irsdk_LRCarLeftRight
+    5: 'left',    # irsdk_LR2CarsLeft
+    6: 'right',   # irsdk_LR2CarsRight
+}
+# Three (or more) abreast
+CAR_LEFT_RIGHT_THREE_WIDE = (4, 5, 6)
+
+
+class EventEngine:
+    """
+    Derives v2 events from consecutive frames, all in sim time (SessionTime):
+
+    - overlap:enter / overlap:exit - player car spotter (CarLeftRight)
+    - three_wide                   - once per overlap, when three abreast
+    - position:change              - any car's CarIdxPosition, once it has held
+    - offtrack                     - any car leaving the racing surface
+    - flag:change                  - session flag state changes
+
+    Every state change has to hold for a minimum time before it is reported
+    (and longer to clear than to set), so spotter flicker, position swaps at
+    the line and kerb-hopping don't produce bursts of events.
+    """
+
+    # Overlap: set after this long overlapped, cleared after this long clear (seconds)
+    OVERLAP_ENTER_TIME = 0.1
+    OVERLAP_EXIT_TIME = 0.5
+    # A new position must hold this long before it's reported
+    POSITION_HOLD_TIME = 1.0
+    # Off the surface this long is an off-track; back on this long re-arms it
+    OFFTRACK_TIME = 0.25
+    REJOIN_TIME = 1.0
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all state (new connection or session)"""
+        self._prev_time: Optional[float] = None
+
+        # Player overlap
+        self._overlap_side: Optional[str] = None   # Confirmed side, None = clear
+        self._three_wide_sent = False
+        self._overlap_raw: Optional[str] = None
+        self._overlap_raw_since = 0.0
+        self._three_wide_since: Optional[float] = None
+
+        # Positions (confirmed, candidate, candidate since)
+        self._position = np.zeros(MAX_CARS, dtype=np.int32)
+        self._position_candidate = np.zeros(MAX_CARS, dtype=np.int32)
+        self._position_since = np.zeros(MAX_CARS)
+
+        # Off-track (confirmed, raw, raw since)
+        self._off = np.zeros(MAX_CARS, dtype=np.bool_)
+        self._off_raw = np.zeros(MAX_CARS, dtype=np.bool_)
+        self._off_since = np.zeros(MAX_CARS)
+
+        self._flag_state: Optional[str] = None
+
+    def update(
+        self,
+        frame: FrameSnapshot,
+        flag_state: str,
+        active: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process one frame.
+
+        Args:
+            frame: Current frame snapshot
+            flag_state: Session flag state ('green', 'yellow', ...)
+            active: Optional per-car mask of cars to report (e.g. excludes the pace car)
+
+        Returns:
+            Events: {'type', 'car_idx', 'session_time', ...event fields}
+        """
+        now = frame.scalar('SessionTime')
+        if self._prev_time is not None and now < self._prev_time:
+            # Session time went backwards (new session / replay seek)
+            self.reset()
+        first = self._prev_time is None
+        self._prev_time = now
+
+        events: List[Dict[str, Any]] = []
+        self._update_flag(flag_state, now, first, events)
+        self._update_overlap(frame, now, events)
+
+        positions = frame.car('CarIdxPosition')
+        surface = frame.car('CarIdxTrackSurface')
+        n = min(len(positions), MAX_CARS)
+        mask = np.ones(n, dtype=np.bool_) if active is None else active[:n]
+        self._update_positions(frame, positions[:n], mask, now, first, events)
+        self._update_offtrack(frame, surface[:n], mask, now, first, events)
+        return events
+
+    def _update_flag(self, flag_state: str, now: float, first: bool, events: List[Dict[str, Any]]):
+        previous, self._flag_state = self._flag_state, flag_state
+        if first or previous == flag_state:
+            return
+        events.append({
+            'type': 'flag:change',
+            'car_idx': None,
+            'session_time': float(now),
+            'previous': previous,
+            'flag': flag_state,
+        })
+
+    def _update_overlap(self, frame: FrameSnapshot, now: float, events: List[Dict[str, Any]]):
+        """Player car overlap from the spotter, with enter/exit hysteresis"""
+        left_right = int(frame.scalar('CarLeftRight'))
+        raw = CAR_LEFT_RIGHT_SIDES.get(left_right)
+        if raw != self._overlap_raw:
+            self._overlap_raw = raw
+            self._overlap_raw_since = now
+        held = now - self._overlap_raw_since
+
+        if left_right in CAR_LEFT_RIGHT_THREE_WIDE:
+            if self._three_wide_since is None:
+                self._three_wide_since = now
+        else:
+            self._three_wide_since = None
+
+        car_idx = frame.player_car_idx
+        base = {
+            'car_idx': car_idx,
+            'session_time': float(now),
+            'lap': int(frame.scalar('Lap')),
+            'track_position': float(frame.scalar('LapDistPct')),
+        }
+
+        if self._overlap_side is None:
+            if raw is not None and held >= self.OVERLAP_ENTER_TIME:
+                self._overlap_side = raw
+                events.append({'type': 'overlap:enter', 'side': raw, **base})
+        elif raw is None:
+            if held >= self.OVERLAP_EXIT_TIME:
+                events.append({'type': 'overlap:exit', 'side': self._overlap_side, **base})
+                self._overlap_side = None
+                self._three_wide_sent = False
+        else:
+            self._overlap_side = raw  # Still overlapped - follow the side
+
+        if (
+            self._overlap_side is not None
+            and not self._three_wide_sent
+            and self._three_wide_since is not None
+            and now - self._three_wide_since >= self.OVERLAP_ENTER_TIME
+        ):
+            self._three_wide_sent = True
+            events.append({'type': 'three_wide', 'side': self._overlap_side, **base})
+
+    def _update_positions(
+        self,
+        frame: FrameSnapshot,
+        positions: np.ndarray,
+        active: np.ndarray,
+        now: float,
+        first: bool,
+        events: List[Dict[str, Any]]
+    ):
+        """Position changes that held for POSITION_HOLD_TIME (vectorised over all cars)"""
+        n = len(positions)
+        confirmed = self._position[:n]
+        candidate = self._position_candidate[:n]
+        since = self._position_since[:n]
+
+        if first:
+            confirmed[:] = positions
+            candidate[:] = positions
+            since[:] = now
+            return
+
+        moved = positions != candidate
+        candidate[moved] = positions[moved]
+        since[moved] = now
+
+        settled = (candidate != confirmed) & (now - since >= self.POSITION_HOLD_TIME)
+        # Cars gaining or losing a classification (0 = none) change silently
+        report = settled & active & (candidate > 0) & (confirmed > 0)
+        if report.any():
+            laps = frame.car('CarIdxLap')
+            class_positions = frame.car('CarIdxClassPosition')
+            for car_idx in np.flatnonzero(report):
+                events.append({
+                    'type': 'position:change',
+                    'car_idx': int(car_idx),
+                    'session_time': float(now),
+                    'lap': int(laps[car_idx]),
+                    'previous_position': int(confirmed[car_idx]),
+                    'position': int(candidate[car_idx]),
+                    'class_position': int(class_positions[car_idx]),
+                })
+        confirmed[settled] = candidate[settled]
+
+    def _update_offtrack(
+        self,
+        frame: FrameSnapshot,
+        surface: np.ndarray,
+        active: np.ndarray,
+        now: float,
+        first: bool,
+        events: List[Dict[str, Any]]
+    ):
+        """Off-tracks: off the surface for OFFTRACK_TIME, re-armed after REJOIN_TIME back on"""
+        n = len(surface)
+        off = self._off[:n]
+        raw = self._off_raw[:n]
+        since = self._off_since[:n]
+
+        now_off = surface == TRACK_OFF_TRACK
+        if first:
+            off[:] = now_off  # Already off when we started - not an event
+            raw[:] = now_off
+            since[:] = now
+            return
+
+        flipped = now_off != raw
+        raw[:] = now_off
+        since[flipped] = now
+        held = now - since
+
+        went_off = now_off & ~off & (held >= self.OFFTRACK_TIME)
+        came_back = ~now_off & off & (held >= self.REJOIN_TIME)
+        off[went_off] = True
+        off[came_back] = False
+
+        report = went_off & active
+        if report.any():
+            laps = frame.car('CarIdxLap')
+            pct = frame.car('CarIdxLapDistPct')
+            for car_idx in np.flatnonzero(report):
+                events.append({
+                    'type': 'offtrack',
+                    'car_idx': int(car_idx),
+                    'session_time': float(now),
+                    'lap': int(laps[car_idx]),
+                    'track_position': float(pct[car_idx]),
+                })
@@ -0,0 +1,186 @@
+"""
+PitBox Relay Agent - Frame Snapshot
+Columnar copy of one iRacing telemetry frame, shared by every consumer in a tick
+"""
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+
+
+# Maximum number of cars iRacing exposes in CarIdx* arrays
+MAX_CARS = 64
+
+# Per-car arrays copied into every snapshot (name -> dtype)
+CAR_IDX_VARS: Dict[str, type] = {
+    'CarIdxPosition': np.int32,
+    'CarIdxClassPosition': np.int32,
+    'CarIdxLap': np.int32,
+    'CarIdxLapDistPct': np.float32,
+    'CarIdxOnPitRoad': np.bool_,
+    'CarIdxLastLapTime': np.float32,
+    'CarIdxBestLapTime': np.float32,
+    'CarIdxSessionFlags': np.uint32,
+    'CarIdxTrackSurface': np.int32,
+}
+
+# Session-wide and player-car scalars, stored in one float64 vector
+SCALAR_VARS = (
+    # Session
+    'SessionTick', 'SessionNum', 'SessionTime', 'SessionTimeRemain', 'SessionFlags',
+    # Player car - driving
+    'PlayerCarIdx', 'Speed', 'Gear', 'RPM',
+    'Throttle', 'Brake', 'Clutch', 'SteeringWheelAngle',
+    'Lap', 'LapDistPct', 'CarLeftRight',
+    # Player car - coordinates
+    'Lat', 'Lon', 'Alt', 'VelocityX', 'VelocityY', 'VelocityZ', 'Yaw',
+    # Player car - strategy (Phase 11)
+    'FuelLevel', 'FuelLevelPct', 'FuelUsePerHour',
+    'LFwearL', 'LFwearM', 'LFwearR',
+    'RFwearL', 'RFwearM', 'RFwearR',
+    'LRwearL', 'LRwearM', 'LRwearR',
+    'RRwearL', 'RRwearM', 'RRwearR',
+    # Player car - full SDK ingestion (Phase 16)
+    'LFtempCL', 'LFtempCM', 'LFtempCR',
+    'RFtempCL', 'RFtempCM', 'RFtempCR',
+    'LRtempCL', 'LRtempCM', 'LRtempCR',
+    'RRtempCL', 'RRtempCM', 'RRtempCR',
+    'LFbrakeLinePress', 'RFbrakeLinePress', 'LRbrakeLinePress', 'RRbrakeLinePress',
+    'OilTemp', 'OilPress', 'WaterTemp', 'Voltage',
+    'PlayerTireCompound', 'EngineWarnings',
+)
+
+SCALAR_INDEX: Dict[str, int] = {name: i for i, name in enumerate(SCALAR_VARS)}
+
+# irsdk var types (char, bool, int, bitfield, float, double) -> NumPy dtypes
+VAR_TYPE_DTYPES = (
+    np.dtype('S1'),
+    np.dtype(np.bool_),
+    np.dtype('<i4'),
+    np.dtype('<u4'),
+    np.dtype('<f4'),
+    np.dtype('<f8'),
+)
+
+# irsdk var types -> struct format characters
+VAR_TYPE_FORMATS = ('c', '?', 'i', 'I', 'f', 'd')
+
+
+class VarTable:
+    """
+    Telemetry variable layout, resolved once per connection.
+
+    Maps each SDK variable to (buffer offset, dtype, count) and precompiles
+    the reads a frame snapshot needs:
+    - One struct.unpack_from() for every session/player scalar
+    - One numpy.frombuffer() view per CarIdx* array
+    """
+    
+    def __init__(self, var_headers: Iterable[Tuple[str, int, int, int]]):
+        """
+        Args:
+            var_headers: (name, var_type, offset, count) for every SDK variable
+        """
+        var_headers = list(var_headers)
+        self.vars: Dict[str, Tuple[int, np.dtype, int]] = {
+            name: (offset, VAR_TYPE_DTYPES[var_type], count)
+            for name, var_type, offset, count in var_headers
+        }
+        
+        # Scalars: one struct with pad bytes between the fields we want
+        scalars = sorted(
+            (offset, SCALAR_INDEX[name], var_type)
+            for name, var_type, offset, count in var_headers
+            if name in SCALAR_INDEX and count == 1 and var_type != 0
+        )
+        fmt = '<'
+        cursor = 0
+        for offset, _, var_type in scalars:
+            if offset > cursor:
+                fmt += f'{offset - cursor}x'
+            fmt += VAR_TYPE_FORMATS[var_type]
+            cursor = offset + VAR_TYPE_DTYPES[var_type].itemsize
+        self._scalar_struct = struct.Struct(fmt)
+        self._scalar_index = np.array([index for _, index, _ in scalars], dtype=np.intp)
+        
+        # CarIdx* arrays: (name, offset, dtype, count, expected dtype)
+        self._car_arrays = []
+        for name, dtype in CAR_IDX_VARS.items():
+            if name in self.vars:
+                offset, var_dtype, count = self.vars[name]
+                self._car_arrays.append((name, offset, var_dtype, count, np.dtype(dtype)))
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.vars
+    
+    def read(self, memory, base: int, name: str) -> np.ndarray:
+        """Zero-copy view of any variable in a telemetry buffer"""
+        offset, dtype, count = self.vars[name]
+        return np.frombuffer(memory, dtype=dtype, count=count, offset=base + offset)
+    
+    def read_scalars(self, memory, base: int) -> np.ndarray:
+        """All SCALAR_VARS as a float64 vector (missing variables read as 0)"""
+        scalars = np.zeros(len(SCALAR_VARS))
+        if len(self._scalar_index):
+            scalars[self._scalar_index] = self._scalar_struct.unpack_from(memory, base)
+        return scalars
+    
+    def read_cars(self, memory, base: int) -> Dict[str, np.ndarray]:
+        """All CAR_IDX_VARS as arrays (missing variables read as zeros)"""
+        cars = {}
+        for name, offset, dtype, count, expected in self._car_arrays:
+            array = np.frombuffer(memory, dtype=dtype, count=count, offset=base + offset)
+            cars[name] = array if dtype == expected else array.astype(expected)
+        for name, dtype in CAR_IDX_VARS.items():
+            if name not in cars:
+                cars[name] = np.zeros(MAX_CARS, dtype=dtype)
+        return cars
+
+
+@dataclass
+class FrameSnapshot:
+    """
+    One frozen telemetry frame.
+
+    Filled once per tick by IRacingReader.freeze_frame() so every consumer
+    (cars, incidents, flags, strategy) sees the same consistent data.
+    """
+    timestamp: float
+    cars: Dict[str, np.ndarray]
+    scalars: np.ndarray = field(default_factory=lambda: np.zeros(len(SCALAR_VARS)))
+    # Values computed from this frame on first use (e.g. player car fields)
+    derived: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def empty(cls) -> 'FrameSnapshot':
+        """Snapshot with zeroed arrays (used when no frame is available)"""
+        return cls(
+            timestamp=time.time(),
+            cars={name: np.zeros(MAX_CARS, dtype=dtype) for name, dtype in CAR_IDX_VARS.items()}
+        )
+
+    def car(self, name: str) -> np.ndarray:
+        """Get a CarIdx* array by SDK variable name"""
+        return self.cars[name]
+
+    def scalar(self, name: str) -> float:
+        """Get a session/player scalar by SDK variable name"""
+        return float(self.scalars[SCALAR_INDEX[name]])
+
+    @property
+    def tick(self) -> int:
+        return int(self.scalars[SCALAR_INDEX['SessionTick']])
+
+    @property
+    def player_car_idx(self) -> int:
+        return int(self.scalars[SCALAR_INDEX['PlayerCarIdx']])
+
+    @property
+    def session_flags(self) -> int:
+        return int(self.scalars[SCALAR_INDEX['SessionFlags']])
+
+    @property
+    def num_cars(self) -> int:
+        return len(self.cars['CarIdxPosition'])
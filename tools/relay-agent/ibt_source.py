@@ -0,0 +1,325 @@
+"""
+PitBox Relay Agent - IBT File Source
+Memory-mapped iRacing .ibt telemetry file as a drop-in IRSDK backend
+
+Lets the relay run without a live sim (e.g. on Linux build boxes) for
+profiling, throughput benchmarks and offline batch processing:
+
+    reader = IRacingReader(source=IbtFileSource('session.ibt', speed=None))
+"""
+import logging
+import mmap
+import re
+import struct
+import time
+from collections import namedtuple
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+from frame_snapshot import VAR_TYPE_DTYPES
+
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
+logger = logging.getLogger(__name__)
+
+# irsdk_header: ver, status, tickRate, sessionInfoUpdate, sessionInfoLen,
+# sessionInfoOffset, numVars, varHeaderOffset, numBuf, bufLen
+HEADER = struct.Struct('<10i')
+# irsdk_varBuf[0]: tickCount, bufOffset (records start here in .ibt files)
+VAR_BUF = struct.Struct('<ii')
+VAR_BUF_OFFSET = 48
+# irsdk_diskSubHeader: sessionStartDate, sessionStartTime, sessionEndTime,
+# sessionLapCount, sessionRecordCount
+DISK_HEADER = struct.Struct('<qddii')
+DISK_HEADER_OFFSET = 112
+# irsdk_varHeader: type, offset, count, countAsTime, pad[3], name[32], desc[64], unit[32]
+VAR_HEADER = struct.Struct('<iii?3x32s64s32s')
+
+# Free-text DriverInfo fields iRacing writes unquoted (mirrors pyirsdk's fix-up)
+_FREE_TEXT_FIELDS = re.compile(
+    r'^(?P<key>\s*(?:UserName|TeamName|AbbrevName|Initials|DriverSetupName): )(?P<value>.*)$',
+    re.M
+)
+
+IbtVarHeader = namedtuple('IbtVarHeader', ['name', 'type', 'offset', 'count', 'unit'])
+
+
+class _IbtRecord:
+    """
+    Current record of an .ibt file, shaped like pyirsdk's VarBuffer.
+
+    The file mapping never changes under us, so the record is always
+    "frozen" and reads are zero-copy views of the mmap.
+    """
+    is_memory_frozen = True
+
+    def __init__(self, memory: mmap.mmap, buf_offset: int):
+        self._memory = memory
+        self.buf_offset = buf_offset
+
+    def get_memory(self):
+        return self._memory
+
+    def freeze(self):
+        pass
+
+    def unfreeze(self):
+        pass
+
+
+class IbtFileSource:
+    """
+    Plays back an .ibt file through the IRSDK interface used by IRacingReader.
+
+    Playback speed:
+    - speed=1.0: real time (records follow the file's tick rate)
+    - speed=N: N x real time
+    - speed=None: as fast as possible (one record per freeze_frame)
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, loop: bool = False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+        self._file = None
+        self._memory: Optional[mmap.mmap] = None
+        self._var_headers_list: Optional[List[IbtVarHeader]] = None
+        self._var_headers_by_name: Dict[str, IbtVarHeader] = {}
+        self._session_info: Optional[Dict[str, Any]] = None
+
+        self.tick_rate = 60
+        self.record_count = 0
+        self.session_info_update = 0
+        self._buf_len = 0
+        self._records_offset = 0
+
+        # Playback state
+        self.position = 0
+        self.finished = False
+        self._frozen_position: Optional[int] = None
+        self._start_position = 0
+        self._start_time = 0.0
+
+    # =========================================================================
+    # IRSDK-compatible interface
+    # =========================================================================
+
+    def startup(self, test_file=None, dump_to=None) -> bool:
+        """Open and map the file (arguments accepted for IRSDK compatibility)"""
+        if self._memory is not None:
+            return not self.finished
+
+        try:
+            self._file = open(self.path, 'rb')
+            self._memory = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to open IBT file {self.path}: {e}")
+            self.shutdown()
+            return False
+
+        (_, _, self.tick_rate, self.session_info_update, self._session_info_len,
+         self._session_info_offset, num_vars, var_header_offset, _, self._buf_len) = \
+            HEADER.unpack_from(self._memory, 0)
+        _, self._records_offset = VAR_BUF.unpack_from(self._memory, VAR_BUF_OFFSET)
+        _, _, _, _, self.record_count = DISK_HEADER.unpack_from(self._memory, DISK_HEADER_OFFSET)
+
+        # Trust the file size over the disk header if the recording was cut short
+        available = (len(self._memory) - self._records_offset) // max(self._buf_len, 1)
+        self.record_count = max(0, min(self.record_count, available))
+
+        self._var_headers_list = []
+        for i in range(num_vars):
+            var_type, offset, count, _, name, _, unit = VAR_HEADER.unpack_from(
+                self._memory, var_header_offset + i * VAR_HEADER.size
+            )
+            header = IbtVarHeader(
+                name=name.rstrip(b'\x00').decode('latin-1'),
+                type=var_type,
+                offset=offset,
+                count=count,
+                unit=unit.rstrip(b'\x00').decode('latin-1')
+            )
+            self._var_headers_list.append(header)
+        self._var_headers_by_name = {h.name: h for h in self._var_headers_list}
+
+        self.tick_rate = self.tick_rate or 60
+        self.finished = self.record_count == 0
+        self.seek(0)
+
+        logger.info(f"📼 Opened {self.path}: {self.record_count} records @ {self.tick_rate} Hz "
+                    f"({self._describe_speed()})")
+        return not self.finished
+
+    def shutdown(self):
+        """Unmap and close the file"""
+        if self._memory is not None:
+            try:
+                self._memory.close()
+            except BufferError:
+                # Snapshot views still reference the mapping; GC will release it
+                logger.debug("IBT mapping still referenced, leaving it to GC")
+            self._memory = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._var_headers_list = None
+        self._var_headers_by_name = {}
+        self._session_info = None
+        self._frozen_position = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._memory is not None and not self.finished
+
+    @property
+    def var_headers_names(self) -> Optional[List[str]]:
+        if self._var_headers_list is None:
+            return None
+        return [h.name for h in self._var_headers_list]
+
+    @property
+    def _var_headers(self) -> List[IbtVarHeader]:
+        return self._var_headers_list or []
+
+    @property
+    def _var_buffer_latest(self) -> _IbtRecord:
+        return _IbtRecord(self._memory, self._record_offset(self._current_position()))
+
+    def __getitem__(self, key: str):
+        header = self._var_headers_by_name.get(key)
+        if header is not None:
+            values = self._view(header, self._record_offset(self._current_position()))
+            return values[0].item() if header.count == 1 else values.tolist()
+        return self._get_session_info().get(key)
+
+    def freeze_var_buffer_latest(self):
+        """Advance playback and pin the current record"""
+        self._wait_valid_data_event()
+        self._advance()
+        self._frozen_position = self.position
+
+    def unfreeze_var_buffer_latest(self):
+        self._frozen_position = None
+
+    # =========================================================================
+    # Playback
+    # =========================================================================
+
+    def seek(self, position: int):
+        """Jump to a record and restart the playback clock from it"""
+        self.position = max(0, min(position, max(self.record_count - 1, 0)))
+        self._start_position = self.position
+        self._start_time = time.monotonic()
+
+    def _advance(self):
+        if self.finished:
+            return
+
+        if self.speed:
+            elapsed = time.monotonic() - self._start_time
+            target = self._start_position + int(elapsed * self.tick_rate * self.speed)
+        else:
+            target = self.position + 1
+
+        if target >= self.record_count:
+            if self.loop:
+                self.seek(0)
+                return
+            self.position = self.record_count - 1
+            self.finished = True
+            logger.info(f"📼 Reached end of {self.path}")
+            return
+
+        self.position = target
+
+    def _wait_valid_data_event(self) -> bool:
+        """
+        Stand-in for the SDK's data-valid event: in timed playback, sleep until
+        the next record is due (capped like the SDK's 32 ms wait).
+        """
+        if self.speed and not self.finished:
+            due = self._start_time + (self.position + 1 - self._start_position) / (self.tick_rate * self.speed)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(min(delay, 0.032))
+        return True
+
+    def _current_position(self) -> int:
+        return self._frozen_position if self._frozen_position is not None else self.position
+
+    def _describe_speed(self) -> str:
+        if not self.speed:
+            return 'as fast as possible'
+        return f'{self.speed:g}x real time'
+
+    # =========================================================================
+    # Batch access (offline processing)
+    # =========================================================================
+
+    def get_all(self, name: str) -> Optional[np.ndarray]:
+        """
+        Zero-copy (records x count) view of one variable across the whole file.
+        Scalars come back as a 1-D array of length record_count.
+        """
+        header = self._var_headers_by_name.get(name)
+        if header is None or self._memory is None:
+            return None
+        dtype = VAR_TYPE_DTYPES[header.type]
+        shape = (self.record_count, header.count) if header.count > 1 else (self.record_count,)
+        strides = (self._buf_len, dtype.itemsize) if header.count > 1 else (self._buf_len,)
+        return np.ndarray(
+            shape=shape,
+            dtype=dtype,
+            buffer=self._memory,
+            offset=self._records_offset + header.offset,
+            strides=strides
+        )
+
+    # =========================================================================
+    # Helpers
+    # =========================================================================
+
+    def _record_offset(self, position: int) -> int:
+        return self._records_offset + position * self._buf_len
+
+    def _view(self, header: IbtVarHeader, base: int) -> np.ndarray:
+        return np.frombuffer(
+            self._memory,
+            dtype=VAR_TYPE_DTYPES[header.type],
+            count=header.count,
+            offset=base + header.offset
+        )
+
+    def _get_session_info(self) -> Dict[str, Any]:
+        """Parse the session YAML once (it never changes inside an .ibt file)"""
+        if self._session_info is not None:
+            return self._session_info
+
+        self._session_info = {}
+        if self._memory is None or not self._session_info_len:
+            return self._session_info
+
+        raw = self._memory[self._session_info_offset:self._session_info_offset + self._session_info_len]
+        raw = raw.rstrip(b'\x00')
+        try:
+            text = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            text = raw.decode('cp1252', errors='replace')
+
+        # Quote free-text values so names like "Smith: Jr" don't break the parser
+        text = _FREE_TEXT_FIELDS.sub(
+            lambda m: m.group('key') + '"%s"' % re.sub(r'(["\\])', r'\\\1', m.group('value').strip().strip('"')),
+            text
+        )
+
+        try:
+            self._session_info = yaml.load(text, Loader=YamlSafeLoader) or {}
+        except yaml.YAMLError as e:
+            logger.error(f"Failed to parse IBT session info: {e}")
+        return self._session_info
@@ -0,0 +1,200 @@
+"""
+PitBox Relay Agent - Incident Detector
+Vectorised incident/off-track detection across every CarIdx* slot in one pass
+"""
+import logging
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+import config
+from frame_snapshot import FrameSnapshot, MAX_CARS
+
+logger = logging.getLogger(__name__)
+
+
+# irsdk_TrkLoc (CarIdxTrackSurface)
+TRACK_NOT_IN_WORLD = -1
+TRACK_OFF_TRACK = 0
+TRACK_IN_PIT_STALL = 1
+TRACK_APPROACHING_PITS = 2
+TRACK_ON_TRACK = 3
+
+# irsdk_Flags red flag (whole field stops - not an incident)
+FLAG_RED = 0x0010
+
+# Heuristic events, mapped onto iRacing incident points so map_incident's
+# severity estimate ranks them (1x = low, 2x = med, 4x = high)
+# (real incident count increases use the delta itself)
+REASON_WEIGHTS = {
+    'offtrack': 1,
+    'stopped': 2,
+    'position_jump': 4,
+}
+
+
+class IncidentDetector:
+    """
+    Compares this tick's per-car arrays with the previous tick's.
+
+    Flags, for all 64 car slots at once:
+    - Incident count increases (>= INCIDENT_THRESHOLD)
+    - Track-position jumps (>= POSITION_JUMP_THRESHOLD of a lap between ticks)
+    - Cars stopping on track
+    - Surface changes from on-track to off-track
+
+    Cars flagged at nearly the same track position in the same tick are
+    reported as one multi-car incident.
+    """
+
+    # Below this speed (m/s) a car on track counts as stopped
+    STOPPED_SPEED = 3.0
+    # A stopped car must get back above this speed (m/s) before it can trigger again
+    MOVING_SPEED = 10.0
+    # Flagged cars within this fraction of a lap are grouped into one incident
+    GROUP_DISTANCE = 0.005
+    # Used when the session's track length isn't known yet
+    DEFAULT_TRACK_LENGTH_M = 4000.0
+
+    def __init__(
+        self,
+        position_jump_threshold: float = config.POSITION_JUMP_THRESHOLD,
+        incident_threshold: int = config.INCIDENT_THRESHOLD
+    ):
+        self.position_jump_threshold = position_jump_threshold
+        self.incident_threshold = incident_threshold
+        self.reset()
+
+    def reset(self):
+        """Forget the previous tick (new connection or session)"""
+        self._prev_time: Optional[float] = None
+        self._prev_pct = np.zeros(MAX_CARS, dtype=np.float32)
+        self._prev_surface = np.full(MAX_CARS, TRACK_NOT_IN_WORLD, dtype=np.int32)
+        self._prev_pit = np.zeros(MAX_CARS, dtype=np.bool_)
+        self._prev_incidents = np.zeros(MAX_CARS, dtype=np.int32)
+        # Starts latched so cars sitting on the grid don't count as stopped
+        self._stopped = np.ones(MAX_CARS, dtype=np.bool_)
+
+    def update(
+        self,
+        frame: FrameSnapshot,
+        roster: Mapping[int, Any],
+        incident_counts: np.ndarray,
+        track_length_km: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect incidents since the previous call.
+
+        Args:
+            frame: Current frame snapshot
+            roster: car_idx -> DriverEntry (names for the incident message)
+            incident_counts: Per-car incident points (MAX_CARS array)
+            track_length_km: Track length from SessionData (for the stop check)
+
+        Returns:
+            incident_data dicts as expected by map_incident()
+        """
+        now = frame.scalar('SessionTime')
+        pct = frame.car('CarIdxLapDistPct')
+        surface = frame.car('CarIdxTrackSurface')
+        pit = frame.car('CarIdxOnPitRoad')
+        n = min(len(pct), MAX_CARS)
+        pct, surface, pit = pct[:n], surface[:n], pit[:n]
+        incidents = incident_counts[:n]
+
+        prev_time = self._prev_time
+        first = prev_time is None or now <= prev_time
+        dt = 0.0 if first else now - prev_time
+
+        prev_pct = self._prev_pct[:n]
+        prev_surface = self._prev_surface[:n]
+
+        # Only compare cars that were in the world, off pit road, on both ticks
+        in_world = (surface != TRACK_NOT_IN_WORLD) & (prev_surface != TRACK_NOT_IN_WORLD)
+        racing = in_world & ~pit & ~self._prev_pit[:n]
+
+        # Lap-wrapped distance travelled, as a fraction of a lap in [-0.5, 0.5)
+        moved = (pct - prev_pct + 0.5) % 1.0 - 0.5
+        track_length_m = (track_length_km * 1000.0) or self.DEFAULT_TRACK_LENGTH_M
+        speed = np.abs(moved) * track_length_m / dt if dt > 0 else np.zeros(n)
+
+        incident_delta = incidents - self._prev_incidents[:n]
+        reasons = {
+            'incident': incident_delta >= self.incident_threshold,
+            'offtrack': racing & (prev_surface == TRACK_ON_TRACK) & (surface == TRACK_OFF_TRACK),
+            'position_jump': racing & (np.abs(moved) >= self.position_jump_threshold),
+            'stopped': racing & (speed < self.STOPPED_SPEED) & ~self._stopped[:n],
+        }
+        if frame.session_flags & FLAG_RED:
+            reasons['stopped'][:] = False
+
+        # Stopped is latched until the car gets going again
+        self._stopped[:n] = np.where(
+            speed > self.MOVING_SPEED, False, self._stopped[:n] | reasons['stopped']
+        )
+
+        # Store this tick (in place - no per-tick allocation of state)
+        self._prev_time = now
+        self._prev_pct[:n] = pct
+        self._prev_surface[:n] = surface
+        self._prev_pit[:n] = pit
+        self._prev_incidents[:n] = incidents
+
+        if first:
+            return []
+
+        # Per-car weight in incident points (0 = nothing flagged)
+        weight = np.where(reasons['incident'], incident_delta, 0)
+        for reason, points in REASON_WEIGHTS.items():
+            weight = np.maximum(weight, np.where(reasons[reason], points, 0))
+        flagged = np.flatnonzero(weight > 0)
+        if not len(flagged):
+            return []
+
+        return self._build_incidents(flagged, weight, reasons, frame, roster)
+
+    def _build_incidents(
+        self,
+        car_idxs: np.ndarray,
+        weight: np.ndarray,
+        reasons: Dict[str, np.ndarray],
+        frame: FrameSnapshot,
+        roster: Mapping[int, Any]
+    ) -> List[Dict[str, Any]]:
+        """Group flagged cars by track position and build incident_data dicts"""
+        car_idxs = [int(i) for i in car_idxs if int(i) in roster]
+        if not car_idxs:
+            return []
+
+        pct = frame.car('CarIdxLapDistPct')
+        laps = frame.car('CarIdxLap')
+        car_idxs.sort(key=lambda i: pct[i])
+
+        groups: List[List[int]] = [[car_idxs[0]]]
+        for car_idx in car_idxs[1:]:
+            if pct[car_idx] - pct[groups[-1][-1]] <= self.GROUP_DISTANCE:
+                groups[-1].append(car_idx)
+            else:
+                groups.append([car_idx])
+
+        results = []
+        for group in groups:
+            group_reasons = sorted({
+                reason for reason, mask in reasons.items() for i in group if mask[i]
+            })
+            delta = int(max(weight[i] for i in group))
+            # Multi-car incidents are at least contact
+            if len(group) > 1:
+                delta = max(delta, 2)
+
+            results.append({
+                'cars': group,
+                'car_names': [roster[i].car_name for i in group],
+                'driver_names': [roster[i].driver_name for i in group],
+                'lap': int(max(laps[i] for i in group)),
+                'track_position': float(pct[group[0]]),
+                'severity': 'med',  # Default severity
+                'incident_delta': delta,
+                'reasons': group_reasons,
+            })
+        return results
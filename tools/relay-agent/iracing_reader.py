@@ -3,15 +3,27 @@ ControlBox Relay Agent - iRacing SDK Reader
 Wraps pyirsdk to provide clean access to iRacing data
 """
 import logging
-from typing import Optional, Dict, List, Any
-from dataclasses import dataclass
+import threading
+import time
+from typing import Optional, Dict, List, Any, Callable, Tuple
+from dataclasses import dataclass, fields, MISSING
+
+import numpy as np
+
+from frame_snapshot import FrameSnapshot, VarTable, MAX_CARS
+from event_engine import EventEngine
+from incident_detector import IncidentDetector
+from perf_stats import perf
+from pit_detector import PitDetector
+from speed_estimator import SpeedEstimator
+from timing_engine import TimingEngine
+from telemetry_ring import CAPTURE_CHANNELS, TelemetryRing
 
 try:
     import irsdk
 except ImportError:
-    print("ERROR: pyirsdk not installed. Run: pip install pyirsdk")
-    print("NOTE: This only works on Windows with iRacing installed.")
-    raise
+    # Only the live backend needs pyirsdk; file playback (IbtFileSource) works without it
+    irsdk = None
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +112,121 @@ class CarData:
 
 
 
+@dataclass
+class DriverEntry:
+    """Roster entry for one car (from session info DriverInfo)"""
+    car_id: int
+    driver_id: str
+    driver_name: str
+    car_number: str
+    car_name: str
+    team_name: str
+    irating: int
+    safety_rating: float
+    class_id: int
+    class_name: str
+
+
+@dataclass
+class RosterChange:
+    """Driver roster difference between two session info updates"""
+    action: str                              # 'join', 'leave' or 'swap'
+    driver: DriverEntry                      # Driver now in the car (or who left)
+    previous: Optional[DriverEntry] = None   # Driver swapped out (swap only)
+
+
+class CarView:
+    """
+    Lightweight per-tick view of one car, used instead of building a CarData.
+    
+    Has the same attributes as CarData, but values are read from the frame
+    snapshot's columnar arrays on access rather than copied for every car on
+    every tick. Player-only fields are materialised once per frame, on first use.
+    """
+    __slots__ = ('car_id', 'is_player', '_frame', '_driver', '_player_fields')
+    
+    def __init__(
+        self,
+        car_id: int,
+        frame: FrameSnapshot,
+        driver: DriverEntry,
+        player_fields: Optional[Callable[[FrameSnapshot], Dict[str, Any]]] = None
+    ):
+        self.car_id = car_id
+        self.is_player = player_fields is not None
+        self._frame = frame
+        self._driver = driver
+        self._player_fields = player_fields
+    
+    def _player_value(self, name: str, default: Any) -> Any:
+        if self._player_fields is None:
+            return default
+        values = self._frame.derived.get('player_fields')
+        if values is None:
+            values = self._frame.derived['player_fields'] = self._player_fields(self._frame)
+        return values[name]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialise every CarData field"""
+        return {f.name: getattr(self, f.name) for f in fields(CarData)}
+    
+    def __repr__(self) -> str:
+        return f"CarView(car_id={self.car_id}, driver_name={self.driver_name!r}, position={self.position})"
+
+
+# CarView attributes served from the roster entry
+_CAR_VIEW_DRIVER_FIELDS = (
+    'driver_id', 'driver_name', 'car_number', 'car_name', 'team_name',
+    'irating', 'safety_rating', 'class_id', 'class_name',
+)
+
+# CarView attributes served from the frame's CarIdx* arrays
+_CAR_VIEW_COLUMN_FIELDS = {
+    'track_pct': ('CarIdxLapDistPct', float),
+    'in_pit': ('CarIdxOnPitRoad', bool),
+    'lap': ('CarIdxLap', int),
+    'position': ('CarIdxPosition', int),
+    'class_position': ('CarIdxClassPosition', int),
+    'incident_count': ('CarIdxSessionFlags', int),
+    'last_lap_time': ('CarIdxLastLapTime', float),
+    'best_lap_time': ('CarIdxBestLapTime', float),
+}
+
+
+def _driver_property(name: str) -> property:
+    return property(lambda self: getattr(self._driver, name))
+
+
+def _column_property(var_name: str, cast: Callable) -> property:
+    return property(lambda self: cast(self._frame.cars[var_name][self.car_id]))
+
+
+def _player_property(name: str, default: Any) -> property:
+    return property(lambda self: self._player_value(name, default))
+
+
+def _car_speed(self: CarView) -> float:
+    # Player speed comes from the SDK; everyone else's is estimated from lap distance
+    if self._player_fields is not None:
+        return self._player_value('speed', 0.0)
+    speeds = self._frame.derived.get('car_speed')
+    return float(speeds[self.car_id]) if speeds is not None else 0.0
+
+
+# Every remaining CarData field is player-only (default for opponent cars)
+for _field in fields(CarData):
+    if _field.name in CarView.__slots__:
+        continue
+    if _field.name in _CAR_VIEW_DRIVER_FIELDS:
+        setattr(CarView, _field.name, _driver_property(_field.name))
+    elif _field.name in _CAR_VIEW_COLUMN_FIELDS:
+        setattr(CarView, _field.name, _column_property(*_CAR_VIEW_COLUMN_FIELDS[_field.name]))
+    else:
+        _default = _field.default if _field.default is not MISSING else _field.type()
+        setattr(CarView, _field.name, _player_property(_field.name, _default))
+CarView.speed = property(_car_speed)
+
+
 @dataclass
 class SessionData:
     """Session metadata"""
@@ -119,14 +246,63 @@ class SessionData:
 class IRacingReader:
     """
     Reads data from iRacing via pyirsdk
+    
+    Any object with the IRSDK interface can be passed as `source`
+    (e.g. IbtFileSource to replay a recorded .ibt file).
     """
     
-    def __init__(self):
-        self.ir = irsdk.IRSDK()
+    # iRacing SessionFlags bits (irsdk_Flags)
+    FLAG_CHECKERED = 0x0001
+    FLAG_WHITE = 0x0002
+    FLAG_YELLOW = 0x0008
+    FLAG_RED = 0x0010
+    FLAG_YELLOW_WAVING = 0x0100
+    FLAG_CAUTION = 0x4000
+    FLAG_CAUTION_WAVING = 0x8000
+    FLAG_BLACK = 0x010000
+    FLAG_REPAIR = 0x100000
+    
+    def __init__(self, source=None):
+        if source is None:
+            if irsdk is None:
+                print("ERROR: pyirsdk not installed. Run: pip install pyirsdk")
+                print("NOTE: This only works on Windows with iRacing installed.")
+                raise ImportError("pyirsdk is required for live iRacing telemetry")
+            source = irsdk.IRSDK()
+        self.ir = source
         self.connected = False
         self._last_session_info = None
-        self._last_incident_counts: Dict[int, int] = {}
-        self._car_info_cache: Dict[int, Dict] = {}
+        self._incident_detector = IncidentDetector()
+        # Per-car incident points from DriverInfo (updated with session info)
+        self._incident_counts = np.zeros(MAX_CARS, dtype=np.int32)
+        # Lap-distance bin crossing times for live gaps (updated every frame)
+        self.timing = TimingEngine()
+        self._roster_mask = np.zeros(MAX_CARS, dtype=np.bool_)  # Racing cars (no pace car/spectators)
+        # Opponent speeds from lap-distance deltas (updated every frame)
+        self.speeds = SpeedEstimator()
+        # Pit entries/exits and stop counts, and the other v2 events (updated every frame)
+        self.pits = PitDetector()
+        self.event_engine = EventEngine()
+        self._events: List[Dict[str, Any]] = []
+        self._car_info_cache: Dict[int, DriverEntry] = {}
+        self._var_table: Optional[VarTable] = None
+        
+        # Per-tick frame snapshot (filled by freeze_frame)
+        self.frame: Optional[FrameSnapshot] = None
+        self._frame_cars: Optional[List[CarView]] = None
+        
+        # Session info tracking (YAML re-parsed only when SessionInfoUpdate changes)
+        self._session_info_update: Optional[int] = None
+        self._session_num: Optional[int] = None
+        self._session_data: Optional[SessionData] = None
+        self._roster_changes: List[RosterChange] = []
+        
+        # Optional 60 Hz capture thread (see start_capture)
+        self.ring: Optional[TelemetryRing] = None
+        self._capture_thread: Optional[threading.Thread] = None
+        self._capture_running = False
+        self._captured_frame: Optional[FrameSnapshot] = None
+        self._sdk_lock = threading.Lock()  # Serialises freeze/read/shutdown between threads
     
     def connect(self) -> bool:
         """
@@ -137,10 +313,22 @@ class IRacingReader:
             return True
         
         try:
-            if self.ir.startup():
+            with self._sdk_lock:
+                started = self.ir.startup()
+            if started:
                 self.connected = True
                 logger.info("✅ Connected to iRacing")
-                self._update_car_info_cache()
+                self._build_var_table()
+                # New connection: the whole roster is reported as joins
+                self._car_info_cache = {}
+                self._incident_detector.reset()
+                self.timing.reset()
+                self.speeds.reset()
+                self.pits.reset()
+                self.event_engine.reset()
+                self._events = []
+                self._session_info_update = None
+                self._check_session_info()
                 return True
             else:
                 self.connected = False
@@ -152,9 +340,14 @@ class IRacingReader:
     
     def disconnect(self):
         """Disconnect from iRacing"""
-        if self.ir:
-            self.ir.shutdown()
-        self.connected = False
+        # Drop the snapshot first: its arrays may be views of the source's memory
+        self._set_frame(None)
+        with self._sdk_lock:
+            if self.ir:
+                self.ir.shutdown()
+            self.connected = False
+            self._var_table = None
+            self._captured_frame = None
         logger.info("Disconnected from iRacing")
     
     def is_connected(self) -> bool:
@@ -166,25 +359,165 @@ class IRacingReader:
             return False
         return True
     
+    # =========================================================================
+    # Session Info Tracking
+    # =========================================================================
+    
+    def _check_session_info(self):
+        """
+        Re-parse session info only when iRacing bumps SessionInfoUpdate
+        (or the session number changes), keeping SessionData and the roster cached.
+        """
+        update = self.ir.session_info_update
+        session_num = int(self._get_frame().scalar('SessionNum'))
+        
+        if update == self._session_info_update and session_num == self._session_num:
+            return
+        
+        if update != self._session_info_update:
+            self._update_car_info_cache()
+        
+        self._session_info_update = update
+        self._session_num = session_num
+        self._session_data = self._parse_session_data(session_num)
+        if self._session_data is None:
+            self._session_info_update = None  # Retry on the next tick
+    
     def _update_car_info_cache(self):
-        """Update cached driver/car info from session info"""
+        """Update cached driver/car info from session info and record roster changes"""
         try:
             drivers = self.ir['DriverInfo']['Drivers']
-            self._car_info_cache = {d['CarIdx']: d for d in drivers}
         except (KeyError, TypeError):
-            pass
+            return
+        
+        roster: Dict[int, DriverEntry] = {}
+        for driver_info in drivers:
+            if driver_info.get('CarIsPaceCar') or driver_info.get('IsSpectator'):
+                continue
+            entry = self._parse_driver(driver_info)
+            roster[entry.car_id] = entry
+            if entry.car_id < MAX_CARS:
+                # Team count survives driver swaps; fall back to the driver's own
+                self._incident_counts[entry.car_id] = int(
+                    driver_info.get('TeamIncidentCount', driver_info.get('CurDriverIncidentCount', 0)) or 0
+                )
+        
+        previous = self._car_info_cache
+        for car_idx, entry in roster.items():
+            old = previous.get(car_idx)
+            if old is None:
+                self._roster_changes.append(RosterChange('join', entry))
+            elif old.driver_id != entry.driver_id:
+                self._roster_changes.append(RosterChange('swap', entry, previous=old))
+        for car_idx, old in previous.items():
+            if car_idx not in roster:
+                self._roster_changes.append(RosterChange('leave', old))
+        
+        self._car_info_cache = roster
+        self._roster_mask[:] = False
+        self._roster_mask[[car_idx for car_idx in roster if car_idx < MAX_CARS]] = True
+    
+    @staticmethod
+    def _parse_driver(driver_info: Dict[str, Any]) -> DriverEntry:
+        """Parse one DriverInfo.Drivers entry"""
+        car_idx = driver_info['CarIdx']
+        return DriverEntry(
+            car_id=car_idx,
+            driver_id=str(driver_info.get('UserID', car_idx)),
+            driver_name=driver_info.get('UserName', f'Driver {car_idx}'),
+            car_number=str(driver_info.get('CarNumber', car_idx)),
+            car_name=driver_info.get('CarScreenName', 'Unknown Car'),
+            team_name=driver_info.get('TeamName', ''),
+            irating=int(driver_info.get('IRating', 0)),
+            safety_rating=float(driver_info.get('LicString', '0.00').replace('A', '').replace('B', '').replace('C', '').replace('D', '').replace('R', '').replace(' ', '') or 0),
+            class_id=driver_info.get('CarClassID', 0),
+            class_name=driver_info.get('CarClassShortName', '')
+        )
+    
+    def pop_roster_changes(self) -> List[RosterChange]:
+        """Roster changes (joins, leaves, driver swaps) since the last call"""
+        changes, self._roster_changes = self._roster_changes, []
+        return changes
+    
+    def pop_events(self) -> List[Dict[str, Any]]:
+        """
+        v2 events since the last call (see PitDetector and EventEngine), each
+        with 'driver' set to the car's DriverEntry (None if not in the roster)
+        """
+        events, self._events = self._events, []
+        for event in events:
+            event['driver'] = self._car_info_cache.get(event['car_idx'])
+        return events
+    
+    def get_pit_stops(self) -> np.ndarray:
+        """Cumulative pit stops per car slot (copy)"""
+        return self.pits.stops.copy()
+    
+    # =========================================================================
+    # Frame Snapshot
+    # =========================================================================
+    
+    def _build_var_table(self):
+        """Resolve every var header to (offset, type, count) once per connection"""
+        # pyirsdk only exposes the parsed headers via its private accessor
+        self._var_table = VarTable(
+            (h.name, h.type, h.offset, h.count) for h in self.ir._var_headers
+        )
+    
+    def _read_snapshot(self) -> FrameSnapshot:
+        """Copy every CarIdx* array and session/player scalar out of the SDK once"""
+        if self._var_table is None:
+            self._build_var_table()
+        
+        # Frozen buffer when inside freeze_frame(), latest complete buffer otherwise.
+        # Snapshot arrays are views into the buffer, so never hand out views of
+        # the live shared memory - copy it first.
+        var_buf = self.ir._var_buffer_latest
+        was_frozen = var_buf.is_memory_frozen
+        if not was_frozen:
+            var_buf.freeze()
+        try:
+            memory = var_buf.get_memory()
+            base = var_buf.buf_offset
+            return FrameSnapshot(
+                timestamp=time.time(),
+                cars=self._var_table.read_cars(memory, base),
+                scalars=self._var_table.read_scalars(memory, base)
+            )
+        finally:
+            if not was_frozen:
+                var_buf.unfreeze()
+    
+    def _set_frame(self, frame: Optional[FrameSnapshot]):
+        """Install a new frame and drop everything derived from the old one"""
+        self.frame = frame
+        self._frame_cars = None
+    
+    def _get_frame(self) -> FrameSnapshot:
+        """Current frame snapshot, read on demand if no frame is frozen"""
+        if self.frame is None:
+            if self._capture_running:
+                # The capture thread owns the SDK buffers
+                self._set_frame(self._captured_frame or FrameSnapshot.empty())
+            else:
+                self._set_frame(self._read_snapshot())
+        return self.frame
     
     def get_session_data(self) -> Optional[SessionData]:
-        """Get current session metadata"""
+        """Get current session metadata (cached until session info changes)"""
         if not self.is_connected():
             return None
         
+        self._check_session_info()
+        return self._session_data
+    
+    def _parse_session_data(self, session_num: int) -> Optional[SessionData]:
+        """Build SessionData from the session info YAML"""
         try:
             weekend_info = self.ir['WeekendInfo']
             session_info = self.ir['SessionInfo']
             
             # Get current session
-            session_num = self.ir['SessionNum']
             sessions = session_info.get('Sessions', [])
             current_session = sessions[session_num] if session_num < len(sessions) else {}
             
@@ -212,144 +545,148 @@ class IRacingReader:
             logger.error(f"Error getting session data: {e}")
             return None
     
-    def get_all_cars(self) -> List[CarData]:
-        """Get telemetry for all cars in session"""
+    def get_all_cars(self) -> List[CarView]:
+        """
+        Get telemetry for all cars in session.
+        Built once per frame snapshot; repeated calls within a tick share the list.
+        """
         if not self.is_connected():
             return []
         
+        frame = self._get_frame()
+        if self._frame_cars is not None:
+            return self._frame_cars
+        
         cars = []
         try:
-            # Get indexed arrays from telemetry
-            positions = self.ir['CarIdxPosition'] or []
-            class_positions = self.ir['CarIdxClassPosition'] or []
-            laps = self.ir['CarIdxLap'] or []
-            lap_pcts = self.ir['CarIdxLapDistPct'] or []
-            on_pit = self.ir['CarIdxOnPitRoad'] or []
-            last_lap_times = self.ir['CarIdxLastLapTime'] or []
-            best_lap_times = self.ir['CarIdxBestLapTime'] or []
+            with perf.measure('get_all_cars'):
+                cars = self._build_cars(frame)
+        except Exception as e:
+            logger.error(f"Error getting car data: {e}")
+        
+        self._frame_cars = cars
+        return cars
+
+    def get_grid(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Whole-grid columns for the telemetry_binary stream, straight from the
+        frame arrays (no per-car objects): car_ids, lap_dist_pct, speed, lap,
+        position. Same cars as get_all_cars(), in car index order. The arrays
+        are copies, safe to hand to another thread.
+        """
+        if not self.is_connected():
+            return None
+
+        frame = self._get_frame()
+        positions = frame.car('CarIdxPosition')
+        n = min(len(positions), MAX_CARS)
+        car_ids = np.flatnonzero(self._roster_mask[:n] & (positions[:n] > 0))
+
+        speeds = frame.derived.get('car_speed')
+        speed = speeds[car_ids] if speeds is not None else np.zeros(len(car_ids))
+        # Player speed comes from the SDK (see CarView.speed)
+        speed[car_ids == frame.player_car_idx] = frame.scalar('Speed')
+
+        return {
+            'car_ids': car_ids,
+            'lap_dist_pct': frame.car('CarIdxLapDistPct')[car_ids],
+            'speed': speed,
+            'lap': frame.car('CarIdxLap')[car_ids],
+            'position': positions[car_ids],
+        }
+
+    def _build_cars(self, frame: FrameSnapshot) -> List[CarView]:
+        """Build a CarView for every car in the session from a frame snapshot"""
+        positions = frame.car('CarIdxPosition')
+        player_car_idx = frame.player_car_idx
+        
+        cars = []
+        for car_idx, driver in self._car_info_cache.items():
+            if car_idx >= len(positions) or positions[car_idx] <= 0:
+                continue  # Skip cars not in session
             
             # Speed, gear, etc. are only available for player car in standard telemetry
-            # For other cars, we estimate from position changes
-            player_car_idx = self.ir['PlayerCarIdx']
-            player_speed = self.ir['Speed'] or 0
-            player_gear = self.ir['Gear'] or 0
-            player_throttle = self.ir['Throttle'] or 0
-            player_brake = self.ir['Brake'] or 0
-            player_steering = self.ir['SteeringWheelAngle'] or 0
-            player_clutch = self.ir['Clutch'] or 0
-            player_rpm = self.ir['RPM'] or 0
+            player_fields = self._player_fields if car_idx == player_car_idx else None
+            cars.append(CarView(car_idx, frame, driver, player_fields))
+        
+        return cars
+    
+    def _player_fields(self, frame: FrameSnapshot) -> Dict[str, Any]:
+        """Player-only CarData fields (CarView materialises these once per frame)"""
+        s = frame.scalar
+        
+        def tire_wear(corner: str) -> float:
+            # iRacing gives L/M/R wear. Use average per tire.
+            if not s(f'{corner}wearL'):
+                return 1.0
+            return (s(f'{corner}wearL') + s(f'{corner}wearM') + s(f'{corner}wearR')) / 3.0
+        
+        engine_warnings = int(s('EngineWarnings'))
+        
+        return {
+            'speed': s('Speed'),
+            'gear': int(s('Gear')),
+            'throttle': s('Throttle'),
+            'brake': s('Brake'),
+            'steering': s('SteeringWheelAngle'),
+            'clutch': s('Clutch'),
+            'rpm': s('RPM'),
             
-            # Coordinate data (player car only for track map)
-            player_lat = self.ir['Lat'] or 0
-            player_lon = self.ir['Lon'] or 0
-            player_alt = self.ir['Alt'] or 0
-            player_vel_x = self.ir['VelocityX'] or 0
-            player_vel_y = self.ir['VelocityY'] or 0
-            player_vel_z = self.ir['VelocityZ'] or 0
-            player_yaw = self.ir['Yaw'] or 0
+            # Coordinate fields (player car only)
+            'lat': s('Lat'),
+            'lon': s('Lon'),
+            'alt': s('Alt'),
+            'velocity_x': s('VelocityX'),
+            'velocity_y': s('VelocityY'),
+            'velocity_z': s('VelocityZ'),
+            'yaw': s('Yaw'),
             
-            for car_idx, driver_info in self._car_info_cache.items():
-                if car_idx >= len(positions) or positions[car_idx] <= 0:
-                    continue  # Skip cars not in session
-                
-                # Get incident count for this car
-                incident_count = 0
-                try:
-                    incident_count = self.ir['CarIdxSessionFlags'][car_idx] if self.ir['CarIdxSessionFlags'] else 0
-                except (IndexError, TypeError):
-                    pass
-                
-                # Populate coordinate data for player car only
-                is_player = car_idx == player_car_idx
-                
-                car_data = CarData(
-                    car_id=car_idx,
-                    driver_id=str(driver_info.get('UserID', car_idx)),
-                    driver_name=driver_info.get('UserName', f'Driver {car_idx}'),
-                    car_number=driver_info.get('CarNumber', str(car_idx)),
-                    car_name=driver_info.get('CarScreenName', 'Unknown Car'),
-                    team_name=driver_info.get('TeamName', ''),
-                    irating=int(driver_info.get('IRating', 0)),
-                    safety_rating=float(driver_info.get('LicString', '0.00').replace('A', '').replace('B', '').replace('C', '').replace('D', '').replace('R', '').replace(' ', '') or 0),
-                    class_id=driver_info.get('CarClassID', 0),
-                    class_name=driver_info.get('CarClassShortName', ''),
-                    speed=player_speed if is_player else 0,
-                    gear=player_gear if is_player else 0,
-                    track_pct=lap_pcts[car_idx] if car_idx < len(lap_pcts) else 0,
-                    throttle=player_throttle if is_player else 0,
-                    brake=player_brake if is_player else 0,
-                    steering=player_steering if is_player else 0,
-                    clutch=player_clutch if is_player else 0,
-                    rpm=player_rpm if is_player else 0,
-                    in_pit=bool(on_pit[car_idx]) if car_idx < len(on_pit) else False,
-                    lap=laps[car_idx] if car_idx < len(laps) else 0,
-                    position=positions[car_idx] if car_idx < len(positions) else 0,
-                    class_position=class_positions[car_idx] if car_idx < len(class_positions) else 0,
-                    incident_count=incident_count,
-                    last_lap_time=last_lap_times[car_idx] if car_idx < len(last_lap_times) else 0,
-                    best_lap_time=best_lap_times[car_idx] if car_idx < len(best_lap_times) else 0,
-                    # Coordinate fields (player car only)
-                    lat=player_lat if is_player else 0,
-                    lon=player_lon if is_player else 0,
-                    alt=player_alt if is_player else 0,
-                    velocity_x=player_vel_x if is_player else 0,
-                    velocity_y=player_vel_y if is_player else 0,
-                    velocity_z=player_vel_z if is_player else 0,
-                    yaw=player_yaw if is_player else 0,
-                    is_player=is_player,
-                    
-                    # Strategy Data (Phase 11) - Player Only (mostly)
-                    fuel_level=self.ir['FuelLevel'] if is_player else 0.0,
-                    fuel_pct=self.ir['FuelLevelPct'] if is_player else 0.0,
-                    # Tires: iRacing gives L/M/R wear. Use average per tire.
-                    tire_wear_fl=(self.ir['LFwearL'] + self.ir['LFwearM'] + self.ir['LFwearR']) / 3.0 if is_player and self.ir['LFwearL'] else 1.0,
-                    tire_wear_fr=(self.ir['RFwearL'] + self.ir['RFwearM'] + self.ir['RFwearR']) / 3.0 if is_player and self.ir['RFwearL'] else 1.0,
-                    tire_wear_rl=(self.ir['LRwearL'] + self.ir['LRwearM'] + self.ir['LRwearR']) / 3.0 if is_player and self.ir['LRwearL'] else 1.0,
-                    tire_wear_rr=(self.ir['RRwearL'] + self.ir['RRwearM'] + self.ir['RRwearR']) / 3.0 if is_player and self.ir['RRwearL'] else 1.0,
-                    
-                    # Phase 16: Real Damage from EngineWarnings
-                    damage_aero=self._get_aero_damage() if is_player else 0.0,
-                    damage_engine=self._get_engine_damage() if is_player else 0.0,
-                    
-                    # Tire Temperatures
-                    tire_temp_fl_l=self.ir['LFtempCL'] or 0.0 if is_player else 0.0,
-                    tire_temp_fl_m=self.ir['LFtempCM'] or 0.0 if is_player else 0.0,
-                    tire_temp_fl_r=self.ir['LFtempCR'] or 0.0 if is_player else 0.0,
-                    tire_temp_fr_l=self.ir['RFtempCL'] or 0.0 if is_player else 0.0,
-                    tire_temp_fr_m=self.ir['RFtempCM'] or 0.0 if is_player else 0.0,
-                    tire_temp_fr_r=self.ir['RFtempCR'] or 0.0 if is_player else 0.0,
-                    tire_temp_rl_l=self.ir['LRtempCL'] or 0.0 if is_player else 0.0,
-                    tire_temp_rl_m=self.ir['LRtempCM'] or 0.0 if is_player else 0.0,
-                    tire_temp_rl_r=self.ir['LRtempCR'] or 0.0 if is_player else 0.0,
-                    tire_temp_rr_l=self.ir['RRtempCL'] or 0.0 if is_player else 0.0,
-                    tire_temp_rr_m=self.ir['RRtempCM'] or 0.0 if is_player else 0.0,
-                    tire_temp_rr_r=self.ir['RRtempCR'] or 0.0 if is_player else 0.0,
-                    
-                    # Brake Pressure
-                    brake_pressure_fl=self.ir['LFbrakeLinePress'] or 0.0 if is_player else 0.0,
-                    brake_pressure_fr=self.ir['RFbrakeLinePress'] or 0.0 if is_player else 0.0,
-                    brake_pressure_rl=self.ir['LRbrakeLinePress'] or 0.0 if is_player else 0.0,
-                    brake_pressure_rr=self.ir['RRbrakeLinePress'] or 0.0 if is_player else 0.0,
-                    
-                    # Engine Health
-                    oil_temp=self.ir['OilTemp'] or 0.0 if is_player else 0.0,
-                    oil_pressure=self.ir['OilPress'] or 0.0 if is_player else 0.0,
-                    water_temp=self.ir['WaterTemp'] or 0.0 if is_player else 0.0,
-                    voltage=self.ir['Voltage'] or 0.0 if is_player else 0.0,
-                    fuel_use_per_hour=self.ir['FuelUsePerHour'] or 0.0 if is_player else 0.0,
-                    
-                    # Tire Compound
-                    tire_compound=self.ir['PlayerTireCompound'] or 0 if is_player else 0,
-                    
-                    # Engine Warnings
-                    engine_warnings=self.ir['EngineWarnings'] or 0 if is_player else 0
-                )
-                cars.append(car_data)
+            # Strategy Data (Phase 11)
+            'fuel_level': s('FuelLevel'),
+            'fuel_pct': s('FuelLevelPct'),
+            'tire_wear_fl': tire_wear('LF'),
+            'tire_wear_fr': tire_wear('RF'),
+            'tire_wear_rl': tire_wear('LR'),
+            'tire_wear_rr': tire_wear('RR'),
             
-        except Exception as e:
-            logger.error(f"Error getting car data: {e}")
-        
-        return cars
+            # Phase 16: Real Damage from EngineWarnings
+            'damage_aero': self._get_aero_damage(frame.session_flags),
+            'damage_engine': self._get_engine_damage(engine_warnings),
+            
+            # Tire Temperatures
+            'tire_temp_fl_l': s('LFtempCL'),
+            'tire_temp_fl_m': s('LFtempCM'),
+            'tire_temp_fl_r': s('LFtempCR'),
+            'tire_temp_fr_l': s('RFtempCL'),
+            'tire_temp_fr_m': s('RFtempCM'),
+            'tire_temp_fr_r': s('RFtempCR'),
+            'tire_temp_rl_l': s('LRtempCL'),
+            'tire_temp_rl_m': s('LRtempCM'),
+            'tire_temp_rl_r': s('LRtempCR'),
+            'tire_temp_rr_l': s('RRtempCL'),
+            'tire_temp_rr_m': s('RRtempCM'),
+            'tire_temp_rr_r': s('RRtempCR'),
+            
+            # Brake Pressure
+            'brake_pressure_fl': s('LFbrakeLinePress'),
+            'brake_pressure_fr': s('RFbrakeLinePress'),
+            'brake_pressure_rl': s('LRbrakeLinePress'),
+            'brake_pressure_rr': s('RRbrakeLinePress'),
+            
+            # Engine Health
+            'oil_temp': s('OilTemp'),
+            'oil_pressure': s('OilPress'),
+            'water_temp': s('WaterTemp'),
+            'voltage': s('Voltage'),
+            'fuel_use_per_hour': s('FuelUsePerHour'),
+            
+            # Tire Compound
+            'tire_compound': int(s('PlayerTireCompound')),
+            
+            # Engine Warnings
+            'engine_warnings': engine_warnings,
+        }
+    
     # =========================================================================
     # Phase 16: Damage Detection from EngineWarnings
     # =========================================================================
@@ -363,55 +700,47 @@ class IRacingReader:
     ENGINE_WARNING_REV_LIMITER = 0x20
     ENGINE_WARNING_OIL_TEMP = 0x40
     
-    def _get_aero_damage(self) -> float:
+    def _get_aero_damage(self, session_flags: int) -> float:
         """
         Infer aero damage from available data.
         iRacing doesn't directly expose aero damage, so we use session flags.
         Returns 0.0 (no damage) to 1.0 (severe damage).
         """
-        try:
-            # Check for meatball flag (mechanical issue)
-            session_flags = self.ir['SessionFlags'] or 0
-            if session_flags & irsdk.Flags.repair:
-                return 1.0  # Required to pit for repairs
-            if session_flags & irsdk.Flags.black:
-                return 0.5  # Black flagged (possible damage)
-            return 0.0
-        except Exception:
-            return 0.0
-    
-    def _get_engine_damage(self) -> float:
+        # Check for meatball flag (mechanical issue)
+        if session_flags & self.FLAG_REPAIR:
+            return 1.0  # Required to pit for repairs
+        if session_flags & self.FLAG_BLACK:
+            return 0.5  # Black flagged (possible damage)
+        return 0.0
+    
+    def _get_engine_damage(self, warnings: int) -> float:
         """
         Parse EngineWarnings bitfield to detect engine issues.
         Returns 0.0 (healthy) to 1.0 (critical damage).
         """
-        try:
-            warnings = self.ir['EngineWarnings'] or 0
-            damage = 0.0
-            
-            # Oil pressure warning is serious
-            if warnings & self.ENGINE_WARNING_OIL_PRESSURE:
-                damage += 0.4
-            
-            # Water temp warning means overheating
-            if warnings & self.ENGINE_WARNING_WATER_TEMP:
-                damage += 0.3
-            
-            # Oil temp warning
-            if warnings & self.ENGINE_WARNING_OIL_TEMP:
-                damage += 0.2
-            
-            # Fuel pressure warning
-            if warnings & self.ENGINE_WARNING_FUEL_PRESSURE:
-                damage += 0.3
-            
-            # Engine stalled is critical
-            if warnings & self.ENGINE_WARNING_ENGINE_STALLED:
-                damage = 1.0
-            
-            return min(damage, 1.0)
-        except Exception:
-            return 0.0
+        damage = 0.0
+        
+        # Oil pressure warning is serious
+        if warnings & self.ENGINE_WARNING_OIL_PRESSURE:
+            damage += 0.4
+        
+        # Water temp warning means overheating
+        if warnings & self.ENGINE_WARNING_WATER_TEMP:
+            damage += 0.3
+        
+        # Oil temp warning
+        if warnings & self.ENGINE_WARNING_OIL_TEMP:
+            damage += 0.2
+        
+        # Fuel pressure warning
+        if warnings & self.ENGINE_WARNING_FUEL_PRESSURE:
+            damage += 0.3
+        
+        # Engine stalled is critical
+        if warnings & self.ENGINE_WARNING_ENGINE_STALLED:
+            damage = 1.0
+        
+        return min(damage, 1.0)
 
     def get_flag_state(self) -> str:
         """Get current flag state"""
@@ -419,20 +748,18 @@ class IRacingReader:
             return 'green'
         
         try:
-            flags = self.ir['SessionFlags']
-            if flags is None:
-                return 'green'
+            flags = self._get_frame().session_flags
             
             # Check flags in priority order
-            if flags & irsdk.Flags.checkered:
+            if flags & self.FLAG_CHECKERED:
                 return 'checkered'
-            if flags & irsdk.Flags.white:
+            if flags & self.FLAG_WHITE:
                 return 'white'
-            if flags & irsdk.Flags.red:
+            if flags & self.FLAG_RED:
                 return 'red'
-            if flags & irsdk.Flags.caution or flags & irsdk.Flags.caution_waving:
+            if flags & self.FLAG_CAUTION or flags & self.FLAG_CAUTION_WAVING:
                 return 'caution'
-            if flags & irsdk.Flags.yellow or flags & irsdk.Flags.yellow_waving:
+            if flags & self.FLAG_YELLOW or flags & self.FLAG_YELLOW_WAVING:
                 return 'yellow'
             
             return 'green'
@@ -440,61 +767,140 @@ class IRacingReader:
             logger.error(f"Error getting flag state: {e}")
             return 'green'
     
+    def get_gaps(self, car_idx: int) -> Tuple[Optional[float], Optional[float]]:
+        """(gap to the car ahead, gap to the car behind) in seconds, None if unknown"""
+        if not self.is_connected():
+            return None, None
+        return self.timing.gaps(car_idx)
+    
     def get_session_time(self) -> float:
         """Get session time remaining (seconds)"""
         if not self.is_connected():
             return 0
-        try:
-            return self.ir['SessionTimeRemain'] or 0
-        except:
-            return 0
+        return self._get_frame().scalar('SessionTimeRemain')
     
     def get_leader_lap(self) -> int:
         """Get current lap of race leader"""
         if not self.is_connected():
             return 0
-        try:
-            laps = self.ir['CarIdxLap'] or []
-            return max(laps) if laps else 0
-        except:
-            return 0
+        laps = self._get_frame().car('CarIdxLap')
+        return int(laps.max()) if laps.size else 0
     
     def detect_incidents(self) -> List[Dict[str, Any]]:
         """
-        Detect new incidents by monitoring incident count changes
+        Detect new incidents: incident point increases, position jumps,
+        cars stopping on track and off-tracks (see IncidentDetector)
         Returns list of incident events
         """
-        incidents = []
         if not self.is_connected():
-            return incidents
+            return []
         
         try:
-            cars = self.get_all_cars()
-            for car in cars:
-                prev_count = self._last_incident_counts.get(car.car_id, 0)
-                if car.incident_count > prev_count:
-                    # Incident detected!
-                    incidents.append({
-                        'cars': [car.car_id],
-                        'car_names': [car.car_name],
-                        'driver_names': [car.driver_name],
-                        'lap': car.lap,
-                        'track_position': car.track_pct,
-                        'severity': 'med',  # Default severity
-                        'incident_delta': car.incident_count - prev_count
-                    })
-                self._last_incident_counts[car.car_id] = car.incident_count
+            track_length = self._session_data.track_length if self._session_data else 0.0
+            return self._incident_detector.update(
+                self._get_frame(),
+                self._car_info_cache,
+                self._incident_counts,
+                track_length
+            )
         except Exception as e:
             logger.error(f"Error detecting incidents: {e}")
-        
-        return incidents
+            return []
     
     def freeze_frame(self):
-        """Freeze telemetry data for consistent reads"""
-        if self.is_connected():
+        """
+        Freeze telemetry data and take this tick's frame snapshot.
+        While capturing, adopts the capture thread's latest frame instead.
+        """
+        if not self.is_connected():
+            return
+        
+        if self._capture_running:
+            frame = self._captured_frame
+            if frame is self.frame or frame is None:
+                self._check_session_info()
+                return
+            self._set_frame(frame)
+        else:
             self.ir.freeze_var_buffer_latest()
+            with perf.measure('read'):
+                self._set_frame(self._read_snapshot())
+        self._check_session_info()
+        with perf.measure('estimates'):
+            self._update_frame_estimates(self.frame)
+    
+    def _update_frame_estimates(self, frame: FrameSnapshot):
+        """Feed a new frame to the timing engine, speed estimator and event detectors"""
+        self.timing.update(frame, self._roster_mask)
+        track_length = self._session_data.track_length if self._session_data else 0.0
+        frame.derived['car_speed'] = self.speeds.update(frame, track_length).copy()
+        self._events.extend(self.pits.update(frame, frame.derived['car_speed']))
+        self._events.extend(self.event_engine.update(frame, self.get_flag_state(), self._roster_mask))
     
     def unfreeze_frame(self):
         """Unfreeze telemetry data"""
-        if self.is_connected():
+        if self.is_connected() and not self._capture_running:
             self.ir.unfreeze_var_buffer_latest()
+    
+    # =========================================================================
+    # High-Rate Capture
+    # =========================================================================
+    
+    def start_capture(self, channels=CAPTURE_CHANNELS, seconds: float = 120.0) -> TelemetryRing:
+        """
+        Start a background thread that snapshots every sim tick (60 Hz) and
+        appends the given channels to a preallocated ring buffer.
+        
+        While it runs, freeze_frame() hands out the thread's latest frame, so
+        the network loop never touches the SDK buffers itself.
+        """
+        if self._capture_running:
+            return self.ring
+        
+        self.ring = TelemetryRing(channels, capacity=int(seconds * 60))
+        self._capture_running = True
+        self._capture_thread = threading.Thread(target=self._capture_loop, name='ir-capture', daemon=True)
+        self._capture_thread.start()
+        logger.info(f"🎞️ High-rate capture started ({len(self.ring.channels)} channels, {seconds:g}s buffer)")
+        return self.ring
+    
+    def stop_capture(self):
+        """Stop the capture thread (the ring buffer keeps its history)"""
+        if not self._capture_running:
+            return
+        self._capture_running = False
+        self._capture_thread.join(timeout=1.0)
+        self._capture_thread = None
+        self._captured_frame = None
+        self._set_frame(None)
+    
+    def _capture_loop(self):
+        """Capture thread: one snapshot per new sim tick"""
+        last_tick = None
+        while self._capture_running:
+            if not self.is_connected():
+                last_tick = None
+                time.sleep(0.1)
+                continue
+            
+            try:
+                with self._sdk_lock:
+                    if not self.connected:
+                        continue
+                    # Blocks until iRacing signals new data (up to ~32 ms)
+                    self.ir.freeze_var_buffer_latest()
+                    try:
+                        frame = self._read_snapshot()
+                    finally:
+                        self.ir.unfreeze_var_buffer_latest()
+            except Exception as e:
+                logger.error(f"Capture error: {e}")
+                time.sleep(0.1)
+                continue
+            
+            if frame.tick == last_tick:
+                time.sleep(0.001)  # No new data (sim paused, or no data-valid event)
+                continue
+            last_tick = frame.tick
+            self._captured_frame = frame
+            self.ring.append(frame.tick, frame.timestamp, frame.scalars)
@@ -4,7 +4,7 @@ PitBox Relay Agent - Main Entry Point
 Connects iRacing to PitBox Server for real-time telemetry and AI coaching
 
 Usage:
-    python main.py [--url SERVER_URL]
+    python main.py [--url SERVER_URL] [--ibt FILE [--ibt-speed N]] [--async]
 
 Environment Variables:
     BLACKBOX_SERVER_URL - PitBox Server WebSocket URL (default: http://localhost:3000)
@@ -12,23 +12,31 @@ Environment Variables:
     LOG_LEVEL - Logging level (default: INFO)
 """
 import argparse
+import asyncio
 import logging
 import signal
 import sys
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
 
 import config
 from iracing_reader import IRacingReader
 from pitbox_client import PitBoxClient
+from async_client import AsyncPitBoxClient
 from video_encoder import VideoEncoder
 from voice_recognition import VoiceRecognition
 from overlay import PTTOverlay
+from tick_scheduler import FrameSync, StreamScheduler
+from pipeline import PipelineStage, QueuedSender
+from perf_stats import perf
+from debug_server import DebugServer
 from data_mapper import (
     map_session_metadata,
-    map_telemetry_snapshot,
     map_race_event,
-    map_incident
+    map_incident,
+    map_driver_update,
+    map_event
 )
 
 # ========================
@@ -61,9 +69,23 @@ class RelayAgent:
     - Events: Instant (not tick-gated)
     """
     
-    def __init__(self, cloud_url: str = None):
-        self.ir_reader = IRacingReader()
-        self.cloud_client = PitBoxClient(cloud_url)
+    # Minimum wait after a duplicate frame, so a paused sim doesn't spin the loop
+    DUPLICATE_FRAME_BACKOFF = 0.005
+    # Server client implementation
+    CLIENT_CLASS = PitBoxClient
+    # Run the pipeline stages on their own threads (when PIPELINE_ENABLED)
+    PIPELINE_THREADS = True
+    
+    def __init__(self, cloud_url: str = None, ir_source=None):
+        self.ir_reader = IRacingReader(source=ir_source)
+        self.cloud_client = self.CLIENT_CLASS(cloud_url)
+        
+        # Staged pipeline: the loop samples, the encoder maps payloads and the
+        # sender does the (possibly stalling) network I/O, via bounded queues
+        threaded = config.PIPELINE_ENABLED and self.PIPELINE_THREADS
+        self.encoder_stage = PipelineStage('encoder', maxsize=8, threaded=threaded)
+        self.sender_stage = PipelineStage('sender', maxsize=256, threaded=threaded)
+        self.sender = QueuedSender(self.cloud_client, self.sender_stage)
         self.video_encoder = VideoEncoder(self.cloud_client)
         self.vr = VoiceRecognition(
             ptt_type=config.PTT_TYPE,
@@ -73,20 +95,28 @@ class RelayAgent:
         )
         self.overlay = PTTOverlay()
         
+        # Local debug endpoints (/debug/perf etc.)
+        self.debug_server = DebugServer(get_perf_stats=perf.snapshot) if config.RELAY_DEBUG_SERVER else None
+        
         # MoTeC Exporter
         self.motec_exporter = MoTeCLDExporter()
         self._setup_motec_channels()
+        self.motec_seq = 0  # Ring buffer position already logged (high-rate capture)
         
         self.running = False
+        self.session_sent = False
         self.session_id: Optional[str] = None
         self.last_flag_state: str = 'green'
-        self.last_strategy_update: float = 0 # Phase 11
 
-        # v2: Rate control for multi-stream telemetry
-        self.last_baseline_time: float = 0
-        self.last_controls_time: float = 0
-        self.BASELINE_INTERVAL: float = 1.0 / 4    # 4 Hz
-        self.CONTROLS_INTERVAL: float = 1.0 / 15   # 15 Hz
+        # Tick-synchronised scheduling: each sim frame is processed once,
+        # streams run on their own monotonic deadlines
+        self.frame_sync = FrameSync()
+        self.scheduler = StreamScheduler()
+        self._setup_streams()
+        
+        # Player car data for the v2 streams, built once per frame
+        self._car_data_frame = None
+        self._car_data = None
         
         # Stats
         self.start_time = 0
@@ -97,6 +127,36 @@ class RelayAgent:
     def is_connected(self):
         """Check if connected to cloud"""
         return self.cloud_client.is_connected()
+    def _setup_streams(self):
+        """
+        Register every periodic stream: (name, rate Hz, callback, priority).
+        Lower priority runs first when several streams are due on the same frame.
+        """
+        poll_hz = config.POLL_RATE_HZ
+        add = self.scheduler.add
+        
+        # Race control first: flags and incidents shouldn't wait behind telemetry
+        add('flags', poll_hz, lambda now: self._check_flag_state(), priority=0)
+        add('incidents', poll_hz, lambda now: self._check_incidents(), priority=1)
+        # Driver joins/leaves/swaps (session info changes only)
+        add('roster', poll_hz, lambda now: self._check_roster(), priority=2)
+        # v2 streams: controls only while viewers are watching
+        add('controls', config.CONTROLS_RATE_HZ, self._send_controls, priority=3,
+            enabled=self.cloud_client.should_send_controls)
+        add('baseline', 4, self._send_baseline, priority=4)
+        # Legacy snapshot (+ MoTeC logging)
+        add('legacy', poll_hz, self._send_legacy_telemetry, priority=5)
+        # PHASE 11: Strategy Data (Slow Lane - 1Hz)
+        add('strategy', 1, self._send_strategy, priority=6,
+            enabled=lambda: self.is_connected or self.cloud_client.spools('strategy_update'))
+        # Micro-batched v2 streams: send batches whose latency window is up
+        if config.BATCH_WINDOWS_MS:
+            add('batches', poll_hz, lambda now: self.sender.flush_batches(), priority=7)
+        # Replay messages spooled while disconnected (rate-limited by the client)
+        if self.cloud_client.spool is not None:
+            add('spool', poll_hz, lambda now: self.sender.drain_spool(), priority=8,
+                enabled=lambda: self.is_connected)
+    
     def _setup_motec_channels(self):
         """Configure MoTeC channels"""
         self.motec_exporter.add_channel("Speed", "km/h")
@@ -109,6 +169,13 @@ class RelayAgent:
         
     def start(self):
         """Start the relay agent"""
+        self._start_components()
+        self.cloud_client.connect()
+        self._start_pipeline()
+        self._main_loop()
+    
+    def _start_components(self):
+        """Everything except the server connection and the pipeline"""
         self.running = True
         self.start_time = time.time()
         
@@ -118,23 +185,43 @@ class RelayAgent:
         # Start Overlay
         self.overlay.start()
         
+        if self.debug_server:
+            self.debug_server.start()
+        
         print("╔════════════════════════════════════════════════════════════╗")
         print("║         PitBox Relay Agent v1.0.0                        ║")
         print("║         iRacing → PitBox AI Coaching Bridge              ║")
         print("╚════════════════════════════════════════════════════════════╝")
         print(f"Connecting to: {self.cloud_client.url}")
+    
+    def _start_pipeline(self):
+        self.encoder_stage.start()
+        self.sender_stage.start()
         
-        self.cloud_client.connect()
-        self._main_loop()
+        # Optional 60 Hz capture thread (MoTeC logging at full sim rate)
+        if config.CAPTURE_ENABLED:
+            self.ir_reader.start_capture(seconds=config.CAPTURE_SECONDS)
     
     def stop(self):
         """Stop the relay agent"""
+        self._stop_components()
+        self.cloud_client.disconnect()
+        self._finish_session()
+    
+    def _stop_components(self):
+        """Everything except the server connection"""
         self.running = False
         self.video_encoder.stop()
         self.overlay.stop()
+        self.ir_reader.stop_capture()
+        self.encoder_stage.stop()
+        self.sender_stage.stop()
         self.ir_reader.disconnect()
-        self.cloud_client.disconnect()
-        
+        if self.debug_server:
+            self.debug_server.stop()
+    
+    def _finish_session(self):
+        """Export the MoTeC log and print session stats"""
         # Export MoTeC Data
         if self.session_id:
             filename = f"pitbox_session_{self.session_id}_{int(time.time())}.ld"
@@ -148,150 +235,180 @@ class RelayAgent:
         print(f"Session Stats:")
         print(f"  Runtime: {elapsed:.1f}s")
         print(f"  Telemetry frames sent: {self.telemetry_count}")
+        print(f"  Sim frames processed: {self.frame_sync.frames} "
+              f"(duplicates skipped: {self.frame_sync.duplicates})")
         print(f"  Video frames sent: {self.video_encoder.frames_sent}")
         print(f"  Incidents detected: {self.incident_count}")
+        for name, stats in self.scheduler.stats().items():
+            print(f"  Stream {name}: {stats['achieved_hz']:.1f}/{stats['target_hz']:g} Hz "
+                  f"({stats['runs']} runs, {stats['missed']} missed)")
+        for stage in (self.encoder_stage, self.sender_stage):
+            stats = stage.stats()
+            print(f"  Stage {stage.name}: {stats['processed']} jobs "
+                  f"({stats['conflated']} conflated, {stats['dropped']} dropped, "
+                  f"{stats['dropped_events']} of them events)")
+        if self.cloud_client.spool is not None:
+            stats = self.cloud_client.spool.stats()
+            print(f"  Spool: {stats['appended']} spooled, {stats['drained']} replayed, "
+                  f"{stats['evicted']} evicted, {stats['pending']} pending")
+        stats = self.cloud_client.validator.stats()
+        print(f"  Validation ({stats['mode']}): {stats['checked']} checked, {stats['skipped']} skipped, "
+              f"{sum(stats['violations'].values())} violations")
+        if perf.enabled:
+            print(f"  Tick budget overruns: {perf.tick_overruns}")
+            for name, hist in perf.stages.items():
+                print(f"  Perf {name}: p50 {hist.percentile(50) * 1000:.3f} ms, "
+                      f"p95 {hist.percentile(95) * 1000:.3f} ms, "
+                      f"p99 {hist.percentile(99) * 1000:.3f} ms ({hist.count} samples)")
         print("═" * 50)
     
     def _main_loop(self):
         """Main polling loop"""
         logger.info("Waiting for iRacing...")
         
-        session_sent = False
-        
         while self.running:
-            # Check PTT for Overlay
-            if hasattr(self, 'vr') and hasattr(self, 'overlay'):
-                self.overlay.set_talking(self.vr.is_pressed())
-                
-            # Try to connect to iRacing
-            if not self.ir_reader.is_connected():
-                if self.ir_reader.connect():
-                    session_sent = False  # Reset for new connection
-                else:
-                    # Not connected, wait and retry
-                    self.cloud_client.wait(1.0)
-                    continue
-            
-            # Freeze telemetry frame for consistent reads
-            self.ir_reader.freeze_frame()
+            is_new_frame = self._poll_sim()
+            if is_new_frame is None:
+                # Not connected, wait and retry
+                self.cloud_client.wait(1.0)
+                continue
             
-            try:
-                # Send session metadata on first connect
-                if not session_sent:
-                    self._send_session_metadata()
-                    session_sent = True
-                
-                # Check flag state changes
-                self._check_flag_state()
-                
-                # Detect and report incidents
-                self._check_incidents()
-                
-                # Send telemetry
-                self._send_telemetry()
-
-                # PHASE 11: Strategy Data (Slow Lane - 1Hz)
-                now = time.time()
-                if self.is_connected and (now - self.last_strategy_update) > 1.0:
-                    session = self.ir_reader.get_session_data()
-                    cars = self.ir_reader.get_all_cars()
-                    if session and cars:
-                        self._send_strategy_update(session, cars)
-                        self.last_strategy_update = now
-                
-            finally:
-                self.ir_reader.unfreeze_frame()
+            if is_new_frame:
+                self._process_frame()
+            self.cloud_client.wait(self._next_delay(is_new_frame))
+    
+    def _poll_sim(self) -> Optional[bool]:
+        """
+        Take this tick's snapshot (blocking read - the live SDK waits for iRacing).
+        
+        Returns:
+            None if iRacing isn't running, else whether the frame is new
+        """
+        # Check PTT for Overlay
+        if hasattr(self, 'vr') and hasattr(self, 'overlay'):
+            self.overlay.set_talking(self.vr.is_pressed())
             
-            # Wait for next poll interval
-            self.cloud_client.wait(config.POLL_INTERVAL)
+        # Try to connect to iRacing
+        if not self.ir_reader.is_connected():
+            if not self.ir_reader.connect():
+                return None
+            self.session_sent = False  # Reset for new connection
+            self.frame_sync.reset()
+        
+        # Freeze telemetry frame and take this tick's snapshot
+        # (the live SDK blocks here until iRacing signals new data).
+        # The snapshot is a copy, so release the SDK buffer straight away.
+        try:
+            self.ir_reader.freeze_frame()
+        finally:
+            self.ir_reader.unfreeze_frame()
+        
+        # Skip frames we've already processed (sim paused / woke early)
+        frame = self.ir_reader.frame
+        return frame is not None and self.frame_sync.is_new(frame.tick)
+    
+    def _next_delay(self, is_new_frame: bool) -> float:
+        """Sleep until the next sub-task deadline"""
+        delay = self._time_until_next_task()
+        if not is_new_frame:
+            delay = max(delay, self.DUPLICATE_FRAME_BACKOFF)
+        return delay
+    
+    def _process_frame(self):
+        """Run every stream that is due for this (new) frame"""
+        # Send session metadata on first connect
+        if not self.session_sent:
+            self._send_session_metadata()
+            self.session_sent = True
+        
+        with perf.measure('tick'):
+            # Events go out on the frame they're detected, not on a stream tick
+            self._send_events()
+            self.scheduler.run_due(time.monotonic())
+    
+    def _time_until_next_task(self) -> float:
+        """Seconds until the earliest stream deadline"""
+        return self.scheduler.time_until_next()
+    
+    def _send_strategy(self, now: float):
+        """Strategy stream: sample here, build the payload on the encoder stage"""
+        session = self.ir_reader.get_session_data()
+        cars = self.ir_reader.get_all_cars()
+        if session and cars:
+            gaps = {car.car_id: self.ir_reader.get_gaps(car.car_id) for car in cars}
+            pit_stops = self.ir_reader.get_pit_stops()
+            self.encoder_stage.submit(
+                lambda: self._send_strategy_update(session, cars, gaps, pit_stops), key='strategy'
+            )
 
-    def _send_strategy_update(self, session, cars):
+    def _send_strategy_update(self, session, cars, gaps, pit_stops):
         """
         Send low-frequency strategy data (fuel, tires, damage)
         Phase 16: Now includes tire temps, brake pressure, engine health
+        The client delta-encodes it: full keyframes, changed fields in between.
         """
-        if not self.cloud_client.connected:
+        if not (self.cloud_client.connected or self.cloud_client.spools('strategy_update')):
             return
 
-        strategy_payload = {
-            'type': 'strategy_update',
-            'sessionId': session.session_id,
-            'timestamp': time.time() * 1000,
-            'cars': []
-        }
-
-        for car in cars:
-            # Track pit stops (Phase 16 fix)
-            pit_stops = self._get_pit_stop_count(car.car_id, car.in_pit)
+        with perf.measure('map'):
+            strategy_cars = []
+            for car in cars:
+                gap_ahead, gap_behind = gaps.get(car.car_id, (None, None))
             
-            car_strategy = {
-                'carId': car.car_id,
-                'fuel': {
-                    'level': car.fuel_level,
-                    'pct': car.fuel_pct,
-                    'usePerHour': car.fuel_use_per_hour
-                },
-                'tires': {
-                    'fl': car.tire_wear_fl,
-                    'fr': car.tire_wear_fr,
-                    'rl': car.tire_wear_rl,
-                    'rr': car.tire_wear_rr
-                },
-                # Phase 16: Tire Temperatures
-                'tireTemps': {
-                    'fl': {'l': car.tire_temp_fl_l, 'm': car.tire_temp_fl_m, 'r': car.tire_temp_fl_r},
-                    'fr': {'l': car.tire_temp_fr_l, 'm': car.tire_temp_fr_m, 'r': car.tire_temp_fr_r},
-                    'rl': {'l': car.tire_temp_rl_l, 'm': car.tire_temp_rl_m, 'r': car.tire_temp_rl_r},
-                    'rr': {'l': car.tire_temp_rr_l, 'm': car.tire_temp_rr_m, 'r': car.tire_temp_rr_r}
-                },
-                # Phase 16: Brake Pressure
-                'brakePressure': {
-                    'fl': car.brake_pressure_fl,
-                    'fr': car.brake_pressure_fr,
-                    'rl': car.brake_pressure_rl,
-                    'rr': car.brake_pressure_rr
-                },
-                'damage': {
-                    'aero': car.damage_aero,
-                    'engine': car.damage_engine
-                },
-                # Phase 16: Engine Health
-                'engine': {
-                    'oilTemp': car.oil_temp,
-                    'oilPressure': car.oil_pressure,
-                    'waterTemp': car.water_temp,
-                    'voltage': car.voltage,
-                    'warnings': car.engine_warnings
-                },
-                # Phase 16: Tire Compound
-                'tireCompound': car.tire_compound,
-                'pit': {
-                    'inLane': car.in_pit,
-                    'stops': pit_stops
+                car_strategy = {
+                    'carId': car.car_id,
+                    'fuel': {
+                        'level': car.fuel_level,
+                        'pct': car.fuel_pct,
+                        'usePerHour': car.fuel_use_per_hour
+                    },
+                    'tires': {
+                        'fl': car.tire_wear_fl,
+                        'fr': car.tire_wear_fr,
+                        'rl': car.tire_wear_rl,
+                        'rr': car.tire_wear_rr
+                    },
+                    # Phase 16: Tire Temperatures
+                    'tireTemps': {
+                        'fl': {'l': car.tire_temp_fl_l, 'm': car.tire_temp_fl_m, 'r': car.tire_temp_fl_r},
+                        'fr': {'l': car.tire_temp_fr_l, 'm': car.tire_temp_fr_m, 'r': car.tire_temp_fr_r},
+                        'rl': {'l': car.tire_temp_rl_l, 'm': car.tire_temp_rl_m, 'r': car.tire_temp_rl_r},
+                        'rr': {'l': car.tire_temp_rr_l, 'm': car.tire_temp_rr_m, 'r': car.tire_temp_rr_r}
+                    },
+                    # Phase 16: Brake Pressure
+                    'brakePressure': {
+                        'fl': car.brake_pressure_fl,
+                        'fr': car.brake_pressure_fr,
+                        'rl': car.brake_pressure_rl,
+                        'rr': car.brake_pressure_rr
+                    },
+                    'damage': {
+                        'aero': car.damage_aero,
+                        'engine': car.damage_engine
+                    },
+                    # Phase 16: Engine Health
+                    'engine': {
+                        'oilTemp': car.oil_temp,
+                        'oilPressure': car.oil_pressure,
+                        'waterTemp': car.water_temp,
+                        'voltage': car.voltage,
+                        'warnings': car.engine_warnings
+                    },
+                    # Phase 16: Tire Compound
+                    'tireCompound': car.tire_compound,
+                    'pit': {
+                        'inLane': car.in_pit,
+                        'stops': int(pit_stops[car.car_id])
+                    },
+                    # Live timing (seconds to the cars ahead/behind on the road)
+                    'gaps': {
+                        'ahead': gap_ahead,
+                        'behind': gap_behind
+                    }
                 }
-            }
-            strategy_payload['cars'].append(car_strategy)
+                strategy_cars.append(car_strategy)
         
-        self.cloud_client.emit('strategy_update', strategy_payload)
-    
-    def _get_pit_stop_count(self, car_id: int, in_pit: bool) -> int:
-        """
-        Track pit stop count by detecting pit entry/exit transitions.
-        """
-        if not hasattr(self, '_pit_stop_counts'):
-            self._pit_stop_counts = {}
-        if not hasattr(self, '_was_in_pit'):
-            self._was_in_pit = {}
-        
-        was_in_pit = self._was_in_pit.get(car_id, False)
-        
-        # Increment count when entering pit (was out, now in)
-        if in_pit and not was_in_pit:
-            self._pit_stop_counts[car_id] = self._pit_stop_counts.get(car_id, 0) + 1
-        
-        self._was_in_pit[car_id] = in_pit
-        return self._pit_stop_counts.get(car_id, 0)
-
+        self.sender.send_strategy_update(session.session_id, strategy_cars)
     
     def _send_session_metadata(self):
         """Send session metadata to cloud"""
@@ -301,14 +418,15 @@ class RelayAgent:
             return
         
         self.session_id = session.session_id
-        metadata = map_session_metadata(session, config.RELAY_ID)
+        with perf.measure('map'):
+            metadata = map_session_metadata(session, config.RELAY_ID)
         self.discipline_category = metadata['category']
         
         logger.info(f"📋 Session: {session.track_name} [{session.session_type}]")
         logger.info(f"   Category: {self.discipline_category}")
         logger.info(f"   Multi-class: {session.is_multiclass}")
         
-        self.cloud_client.send_session_metadata(metadata)
+        self.sender.send_session_metadata(metadata)
         
         # NOW start video encoder (client has session ID)
         if not self.video_encoder.running:
@@ -328,9 +446,35 @@ class RelayAgent:
                 self.ir_reader.get_leader_lap(),
                 self.ir_reader.get_session_time()
             )
-            self.cloud_client.send_race_event(event)
+            self.sender.send_race_event(event)
             self.last_flag_state = flag_state
     
+    def _check_roster(self):
+        """Send driver updates for roster changes since the last tick"""
+        for change in self.ir_reader.pop_roster_changes():
+            driver = change.driver
+            if change.action == 'join':
+                logger.debug(f"👤 Driver joined: #{driver.car_number} {driver.driver_name}")
+            elif change.action == 'swap':
+                logger.info(f"🔄 Driver swap: #{driver.car_number} {change.previous.driver_name} → {driver.driver_name}")
+            else:
+                logger.info(f"👋 Driver left: #{driver.car_number} {driver.driver_name}")
+            
+            update = map_driver_update(self.session_id, driver, change.action, change.previous)
+            self.sender.send_driver_update(update)
+    
+    def _send_events(self):
+        """Send v2 events (pit, overlap, position, off-track, flag) detected on this frame"""
+        for event in self.ir_reader.pop_events():
+            with perf.measure('map'):
+                payload = map_event(event)
+            if event['type'] == 'pit:exit':
+                logger.info(f"🔧 Pit exit: #{payload['carNumber']} {payload['driverName']} "
+                            f"({payload['pitLaneTime']:.1f}s in lane, {payload['stationaryTime']:.1f}s stopped)")
+            else:
+                logger.debug(f"📣 {event['type']}: #{payload['carNumber']} {payload['driverName']}")
+            self.sender.send_event(event['type'], payload)
+    
     def _check_incidents(self):
         """Check for and report incidents"""
         incidents = self.ir_reader.detect_incidents()
@@ -338,88 +482,180 @@ class RelayAgent:
         for incident_data in incidents:
             logger.warning(f"⚠️ Incident detected: {incident_data['driver_names']}")
             
-            incident = map_incident(
-                self.session_id,
-                incident_data,
-                self.discipline_category
-            )
-            self.cloud_client.send_incident(incident)
+            with perf.measure('map'):
+                incident = map_incident(
+                    self.session_id,
+                    incident_data,
+                    self.discipline_category
+                )
+            self.sender.send_incident(incident)
             self.incident_count += 1
     
-    def _send_telemetry(self):
+    def _log_motec_from_ring(self):
+        """Log every tick captured since the last call (60 Hz) to MoTeC"""
+        ring = self.ir_reader.ring
+        self.motec_seq, _, _, data = ring.since(self.motec_seq)
+        col = ring.column
+        for row in data:
+            self.motec_exporter.add_sample({
+                "Speed": row[col['Speed']] * 3.6, # m/s to km/h
+                "RPM": row[col['RPM']],
+                "Gear": row[col['Gear']],
+                "Throttle": row[col['Throttle']] * 100,
+                "Brake": row[col['Brake']] * 100,
+                "Steering": row[col['SteeringWheelAngle']] * 100,
+                "Lap": row[col['Lap']]
+            })
+    
+    def _player_car_data(self) -> Optional[Dict[str, Any]]:
         """
-        Send telemetry using v2 multi-stream protocol.
-        
-        - Baseline: 4 Hz (always)
-        - Controls: 15 Hz (when viewers present)
+        Player car data dict for the v2 streams, built once per frame and
+        shared by the baseline and controls streams.
         """
-        cars = self.ir_reader.get_all_cars()
-        
-        if not cars:
-            return
-        
-        now = time.time()
-        player_car = None
-        
-        # Find player car
-        for car in cars:
-            if car.is_player:
-                player_car = car
-                # Log to MoTeC
-                self.motec_exporter.add_sample({
-                    "Speed": car.speed * 3.6, # m/s to km/h
-                    "RPM": car.rpm,
-                    "Gear": float(car.gear),
-                    "Throttle": car.throttle * 100,
-                    "Brake": car.brake * 100,
-                    "Steering": car.steering * 100,
-                    "Lap": float(car.lap)
-                })
-                break
-        
-        if not player_car:
-            return
-        
-        # Build car data dict for v2 streams
-        car_data = {
-            'speed': player_car.speed,
-            'gear': player_car.gear,
-            'rpm': player_car.rpm,
-            'lap': player_car.lap,
-            'lapDistPct': player_car.track_pct,
-            'position': player_car.position,
-            'fuelLevel': player_car.fuel_level,
-            'fuelPct': player_car.fuel_pct,
-            'sessionFlags': 0,  # TODO: get from session
-            'gapAhead': None,   # TODO: calculate
-            'gapBehind': None,  # TODO: calculate
-            'throttle': player_car.throttle,
-            'brake': player_car.brake,
-            'clutch': player_car.clutch,
-            'steering': player_car.steering,
-        }
-        
-        # v2: Baseline stream (4 Hz always)
-        if (now - self.last_baseline_time) >= self.BASELINE_INTERVAL:
-            self.cloud_client.send_baseline_stream(car_data)
-            self.last_baseline_time = now
+        frame = self.ir_reader.frame
+        if frame is not None and frame is self._car_data_frame:
+            return self._car_data
+        
+        self._car_data_frame = frame
+        self._car_data = None
+        
+        with perf.measure('map'):
+            # Find player car
+            player_car = None
+            for car in self.ir_reader.get_all_cars():
+                if car.is_player:
+                    player_car = car
+                    break
+        
+            if not player_car:
+                return None
+        
+            gap_ahead, gap_behind = self.ir_reader.get_gaps(player_car.car_id)
+            self._car_data = {
+                'speed': player_car.speed,
+                'gear': player_car.gear,
+                'rpm': player_car.rpm,
+                'lap': player_car.lap,
+                'lapDistPct': player_car.track_pct,
+                'position': player_car.position,
+                'fuelLevel': player_car.fuel_level,
+                'fuelPct': player_car.fuel_pct,
+                'sessionFlags': 0,  # TODO: get from session
+                'gapAhead': gap_ahead,
+                'gapBehind': gap_behind,
+                'throttle': player_car.throttle,
+                'brake': player_car.brake,
+                'clutch': player_car.clutch,
+                'steering': player_car.steering,
+            }
+            return self._car_data
+    
+    def _send_baseline(self, now: float):
+        """v2: Baseline stream (4 Hz always)"""
+        car_data = self._player_car_data()
+        if car_data:
+            self.sender.send_baseline_stream(car_data)
             self.telemetry_count += 1
-        
-        # v2: Controls stream (15 Hz when viewers present)
-        if self.cloud_client.should_send_controls():
-            if (now - self.last_controls_time) >= self.CONTROLS_INTERVAL:
-                self.cloud_client.send_controls_stream(car_data)
-                self.last_controls_time = now
-        
-        # Legacy: Also send old format for backward compatibility
-        telemetry = map_telemetry_snapshot(self.session_id, cars)
-        self.cloud_client.send_telemetry_binary(telemetry)
+    
+    def _send_controls(self, now: float):
+        """v2: Controls stream (CONTROLS_RATE_HZ when viewers present)"""
+        car_data = self._player_car_data()
+        if car_data:
+            self.sender.send_controls_stream(car_data)
+    
+    def _send_legacy_telemetry(self, now: float):
+        """Legacy stream: sample the grid columns here, pack and log on the encoder stage"""
+        with perf.measure('map'):
+            grid = self.ir_reader.get_grid()
+        if grid is None or not len(grid['car_ids']):
+            return
+        # MoTeC falls back to the player CarView when there's no capture ring
+        cars = self.ir_reader.get_all_cars() if self.ir_reader.ring is None else None
+        ts = int(time.time() * 1000)
+        self.encoder_stage.submit(lambda: self._encode_legacy_telemetry(ts, grid, cars), key='legacy')
+    
+    def _encode_legacy_telemetry(self, ts: int, grid, cars):
+        """Legacy full-field snapshot (backward compatibility) and MoTeC logging"""
+        # Log to MoTeC
+        if cars is None:
+            self._log_motec_from_ring()
+        else:
+            for car in cars:
+                if car.is_player:
+                    self.motec_exporter.add_sample({
+                        "Speed": car.speed * 3.6, # m/s to km/h
+                        "RPM": car.rpm,
+                        "Gear": float(car.gear),
+                        "Throttle": car.throttle * 100,
+                        "Brake": car.brake * 100,
+                        "Steering": car.steering * 100,
+                        "Lap": float(car.lap)
+                    })
+                    break
+        
+        self.sender.send_grid_binary(ts, grid)
         
         if config.LOG_TELEMETRY:
-            logger.debug(f"📊 Telemetry: {len(cars)} cars")
+            logger.debug(f"📊 Telemetry: {len(grid['car_ids'])} cars")
 
 
 
+class AsyncRelayAgent(RelayAgent):
+    """
+    Relay Agent on a single asyncio event loop (--async)
+    
+    Same streams and payloads as RelayAgent, but every backend target is a
+    socketio.AsyncClient on one loop: sends and timers are coroutines, and the
+    (blocking) iRacing read runs on a single executor thread. The pipeline
+    stages run inline - the client's per-target queues already decouple the
+    loop from the network.
+    """
+    
+    CLIENT_CLASS = AsyncPitBoxClient
+    PIPELINE_THREADS = False
+    
+    def __init__(self, cloud_url: str = None, ir_source=None):
+        super().__init__(cloud_url, ir_source=ir_source)
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ir-read')
+    
+    async def run(self):
+        """Run until stop() is called, then shut down"""
+        self._start_components()
+        await self.cloud_client.start()
+        self._start_pipeline()
+        try:
+            await self._main_loop()
+        finally:
+            await self.shutdown()
+    
+    def stop(self):
+        """Ask the loop to exit (safe from signal handlers); run() shuts down"""
+        self.running = False
+    
+    async def shutdown(self):
+        loop = asyncio.get_running_loop()
+        # Component shutdown joins threads - keep it off the event loop
+        await loop.run_in_executor(self._reader, self._stop_components)
+        self._reader.shutdown(wait=False)
+        await self.cloud_client.stop()
+        self._finish_session()
+    
+    async def _main_loop(self):
+        """Main polling loop (reads in the executor, waits as coroutines)"""
+        logger.info("Waiting for iRacing...")
+        loop = asyncio.get_running_loop()
+        
+        while self.running:
+            is_new_frame = await loop.run_in_executor(self._reader, self._poll_sim)
+            if is_new_frame is None:
+                await asyncio.sleep(1.0)
+                continue
+            
+            if is_new_frame:
+                self._process_frame()
+            await asyncio.sleep(self._next_delay(is_new_frame))
+
+
 # ========================
 # Entry Point
 # ========================
@@ -439,6 +675,23 @@ def main():
         default=config.POLL_RATE_HZ,
         help=f'Telemetry poll rate in Hz (default: {config.POLL_RATE_HZ})'
     )
+    parser.add_argument(
+        '--ibt',
+        metavar='FILE',
+        help='Replay a recorded .ibt telemetry file instead of live iRacing'
+    )
+    parser.add_argument(
+        '--ibt-speed',
+        type=float,
+        default=1.0,
+        help='Replay speed multiplier for --ibt (0 = as fast as possible, default: 1.0)'
+    )
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Run on a single asyncio event loop (socketio.AsyncClient)'
+    )
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -461,8 +714,27 @@ def main():
     except Exception as e:
         logger.warning(f"Auto-update check failed: {e}")
     
+    # Optional offline source: replay an .ibt file
+    ir_source = None
+    if args.ibt:
+        from ibt_source import IbtFileSource
+        ir_source = IbtFileSource(args.ibt, speed=args.ibt_speed or None)
+    
+    if args.use_async:
+        agent = AsyncRelayAgent(args.url, ir_source=ir_source)
+        
+        # The loop exits on the next tick and run() shuts everything down
+        def async_signal_handler(sig, frame):
+            logger.info("Received shutdown signal")
+            agent.stop()
+        
+        signal.signal(signal.SIGINT, async_signal_handler)
+        signal.signal(signal.SIGTERM, async_signal_handler)
+        asyncio.run(agent.run())
+        return
+    
     # Create and start agent
-    agent = RelayAgent(args.url)
+    agent = RelayAgent(args.url, ir_source=ir_source)
     
     # Handle signals
     def signal_handler(sig, frame):
@@ -0,0 +1,200 @@
+"""
+PitBox Relay Agent - Performance Stats
+Fixed-bucket latency histograms per hot-path stage, with per-tick budget tracking
+"""
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket_edges(lowest: float = 1e-6, highest: float = 10.0, per_decade: int = 10) -> List[float]:
+    """Log-spaced bucket upper bounds (seconds), lowest..highest"""
+    edges = []
+    edge = lowest
+    step = 10 ** (1.0 / per_decade)
+    while edge < highest * 1.0001:
+        edges.append(edge)
+        edge *= step
+    return edges
+
+
+# Shared by every histogram: 1 µs .. 10 s, ~26% wide buckets
+BUCKET_EDGES = _bucket_edges()
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed log-spaced buckets.
+
+    Recording is a bisect and an increment (no allocation, no sorting), so it
+    can sit on the hot path. Percentiles are read from the bucket counts and
+    are accurate to one bucket width. Counters aren't locked: a racing update
+    from another stage thread can at worst lose one sample.
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        """
+        Args:
+            budget: Optional per-sample budget (seconds); samples over it count as overruns
+        """
+        self.budget = budget
+        self.counts = [0] * (len(BUCKET_EDGES) + 1)  # Last bucket = overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.overruns = 0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(BUCKET_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if self.budget is not None and seconds > self.budget:
+            self.overruns += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (seconds) of the bucket holding the q-th percentile (0-100), capped at max"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKET_EDGES[i], self.max) if i < len(BUCKET_EDGES) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary in milliseconds"""
+        return {
+            'count': self.count,
+            'meanMs': self.total / self.count * 1000 if self.count else 0.0,
+            'p50Ms': self.percentile(50) * 1000,
+            'p95Ms': self.percentile(95) * 1000,
+            'p99Ms': self.percentile(99) * 1000,
+            'maxMs': self.max * 1000,
+            'budgetMs': self.budget * 1000 if self.budget is not None else None,
+            'overruns': self.overruns,
+        }
+
+
+class _StageTimer:
+    """Context manager recording the time spent in a block"""
+
+    __slots__ = ('hist', 'start')
+
+    def __init__(self, hist: LatencyHistogram):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class PerfStats:
+    """
+    Per-stage latency histograms for the relay hot path.
+
+    Stages (recorded where the work happens):
+        read          - frame snapshot copy after the SDK freeze
+        estimates     - timing, speed, pit and event detectors
+        get_all_cars  - CarView list for a frame
+        map           - data_mapper payload building
+        validate      - Pydantic model validation
+        pack          - binary telemetry packing
+        compress      - per-message compression (when negotiated)
+        emit          - Socket.IO emit
+        tick          - every stream due on one new sim frame (the loop's work)
+
+    Usage:
+        with perf.measure('pack'):
+            ...
+    """
+
+    def __init__(
+        self,
+        enabled: bool = config.PERF_ENABLED,
+        tick_budget_ms: float = config.PERF_TICK_BUDGET_MS,
+        stage_budgets_ms: str = config.PERF_STAGE_BUDGETS_MS
+    ):
+        """
+        Args:
+            enabled: False makes measure() a no-op
+            tick_budget_ms: Per-tick budget; longer ticks count as overruns
+            stage_budgets_ms: Per-stage budgets, "stage=ms,stage=ms"
+        """
+        self.enabled = enabled
+        self.budgets: Dict[str, float] = {'tick': tick_budget_ms / 1000}
+        for item in stage_budgets_ms.split(','):
+            if '=' not in item:
+                continue
+            name, ms = item.split('=', 1)
+            try:
+                self.budgets[name.strip()] = float(ms) / 1000
+            except ValueError:
+                logger.warning(f"Ignoring invalid stage budget: {item!r}")
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.started = time.time()
+
+    def _hist(self, stage: str) -> LatencyHistogram:
+        hist = self.stages.get(stage)
+        if hist is None:
+            hist = self.stages.setdefault(stage, LatencyHistogram(self.budgets.get(stage)))
+        return hist
+
+    def measure(self, stage: str):
+        """Context manager timing a block as one sample of the stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._hist(stage))
+
+    def record(self, stage: str, seconds: float):
+        """Record one sample measured elsewhere"""
+        if self.enabled:
+            self._hist(stage).record(seconds)
+
+    @property
+    def tick_overruns(self) -> int:
+        hist = self.stages.get('tick')
+        return hist.overruns if hist else 0
+
+    def reset(self):
+        self.stages = {}
+        self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary for /debug/perf"""
+        return {
+            'enabled': self.enabled,
+            'uptimeS': time.time() - self.started,
+            'tickBudgetMs': self.budgets['tick'] * 1000,
+            'tickOverruns': self.tick_overruns,
+            'stages': {name: hist.snapshot() for name, hist in list(self.stages.items())},
+        }
+
+
+# Process-wide instance (stages are recorded from the reader, mappers and client)
+perf = PerfStats()
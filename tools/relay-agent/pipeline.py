@@ -0,0 +1,207 @@
+"""
+PitBox Relay Agent - Pipeline Stages
+Bounded hand-off queues and worker threads between sampling, encoding and sending
+"""
+import logging
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Full-queue policies
+DROP_OLDEST = 'drop_oldest'  # Make room by discarding the oldest pending job
+DROP_NEWEST = 'drop_newest'  # Reject the job being submitted
+
+
+class _Unkeyed:
+    """Queue key of a job submitted without one (unique, never conflated)"""
+    __slots__ = ()
+
+
+class StageQueue:
+    """
+    Bounded FIFO with an explicit overflow policy and optional conflation.
+
+    Jobs submitted with a key replace any pending job with the same key
+    (keeping its place in line), so a slow consumer only ever sees the latest
+    telemetry for each stream. Jobs without a key (events) are never conflated.
+
+    When full, keyed jobs are given up first: the policy picks the oldest
+    pending keyed job (DROP_OLDEST) or the one being submitted (DROP_NEWEST),
+    and an unkeyed job is only dropped when no keyed job is left to make
+    room (counted in dropped_events).
+    """
+
+    def __init__(self, maxsize: int, policy: str = DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._items: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._cond = threading.Condition()
+
+        self.submitted = 0
+        self.conflated = 0
+        self.dropped = 0         # Every dropped job
+        self.dropped_events = 0  # Of which unkeyed (lossless) jobs
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any, key: Optional[Hashable] = None) -> bool:
+        """Queue an item; returns False if it was dropped"""
+        with self._cond:
+            self.submitted += 1
+            if key is not None and key in self._items:
+                self._items[key] = item  # Conflate: same position, newest data
+                self.conflated += 1
+                return True
+
+            if len(self._items) >= self.maxsize and not self._make_room(key is None):
+                return False
+
+            self._items[key if key is not None else _Unkeyed()] = item
+            self._cond.notify()
+            return True
+
+    def _make_room(self, unkeyed: bool) -> bool:
+        """Drop one job for a new one (lock held); False if the new one is dropped"""
+        self.dropped += 1
+        if self.policy == DROP_NEWEST and not unkeyed:
+            return False
+        oldest_keyed = next((k for k in self._items if not isinstance(k, _Unkeyed)), None)
+        if oldest_keyed is not None:
+            del self._items[oldest_keyed]
+            return True
+        if not unkeyed:
+            return False  # Only events pending: give up the telemetry instead
+        self.dropped_events += 1
+        if self.policy == DROP_NEWEST:
+            return False
+        self._items.popitem(last=False)
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Next item, or None on timeout"""
+        with self._cond:
+            if not self._items and not self._cond.wait(timeout):
+                return None
+            if not self._items:
+                return None
+            return self._items.popitem(last=False)[1]
+
+
+class PipelineStage:
+    """
+    Worker thread that runs submitted jobs (callables) in order.
+
+    With threaded=False the stage runs jobs inline on submit, so callers
+    use the same code path with or without the pipeline.
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: str = DROP_OLDEST, threaded: bool = True):
+        self.name = name
+        self.threaded = threaded
+        self.queue = StageQueue(maxsize, policy)
+        self.processed = 0
+        self.errors = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not self.threaded or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f'pipeline-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """Stop after draining what is already queued (bounded by timeout)"""
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, job: Callable[[], Any], key: Optional[Hashable] = None) -> bool:
+        """Queue a job (or run it now when not threaded)"""
+        if not self._running:
+            self._execute(job)
+            return True
+        return self.queue.put(job, key)
+
+    def _run(self):
+        while self._running or len(self.queue):
+            job = self.queue.get(timeout=0.1)
+            if job is not None:
+                self._execute(job)
+
+    def _execute(self, job: Callable[[], Any]):
+        try:
+            job()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Pipeline stage '{self.name}' job failed: {e}")
+        self.processed += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': len(self.queue),
+            'processed': self.processed,
+            'conflated': self.queue.conflated,
+            'dropped': self.queue.dropped,
+            'dropped_events': self.queue.dropped_events,
+            'errors': self.errors,
+        }
+
+
+class QueuedSender:
+    """
+    Client proxy whose send methods are queued on a network stage.
+
+    Telemetry streams are conflated (only the newest pending packet per stream
+    is sent); events, incidents and metadata are queued individually. Anything
+    other than a send method is passed straight through to the client.
+    """
+
+    # Methods that go through the network stage -> conflated?
+    SEND_METHODS = {
+        'send_baseline_stream': True,
+        'send_controls_stream': True,
+        'send_telemetry_binary': True,
+        'send_grid_binary': True,
+        'send_telemetry': True,
+        'send_strategy_update': True,  # Full state in; deltas are computed at send time
+        'flush_batches': True,
+        'drain_spool': True,
+        'send_session_metadata': False,
+        'send_race_event': False,
+        'send_incident': False,
+        'send_driver_update': False,
+        'send_event': False,
+        'emit': False,
+    }
+    # emit() events conflated like telemetry streams
+    CONFLATED_EVENTS = set()
+
+    def __init__(self, client: Any, stage: PipelineStage):
+        self._client = client
+        self._stage = stage
+
+    def __getattr__(self, name: str):
+        target = getattr(self._client, name)
+        if name not in self.SEND_METHODS:
+            return target
+
+        conflate = self.SEND_METHODS[name]
+
+        def send(*args, **kwargs) -> bool:
+            key = name if conflate else None
+            if name == 'emit' and args and args[0] in self.CONFLATED_EVENTS:
+                key = ('emit', args[0])
+            return self._stage.submit(partial(target, *args, **kwargs), key)
+
+        return send
@@ -0,0 +1,130 @@
+"""
+PitBox Relay Agent - Pit Lane Detector
+Per-tick pit entry/exit detection with pit-lane and stationary timing
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from frame_snapshot import FrameSnapshot, MAX_CARS
+from incident_detector import TRACK_NOT_IN_WORLD
+
+logger = logging.getLogger(__name__)
+
+
+class PitDetector:
+    """
+    Watches CarIdxOnPitRoad for every car slot each frame.
+
+    - pit:enter when a car in the world joins pit road
+    - pit:exit when it leaves, with time on pit road and time stationary
+    - A visit with at least MIN_STOP_TIME stationary counts as a pit stop
+      (drive-throughs don't)
+
+    Cars already on pit road when the detector starts, or that appear there
+    from the garage, produce no events until their next visit. Cars that
+    leave the world on pit road (tow to garage, disconnect) are dropped silently.
+    """
+
+    # Below this speed (m/s) a car on pit road counts as stationary
+    STATIONARY_SPEED = 0.5
+    # Stationary time (seconds) for a visit to count as a pit stop
+    MIN_STOP_TIME = 1.0
+
+    def __init__(self):
+        self.stops = np.zeros(MAX_CARS, dtype=np.int32)  # Cumulative pit stops per car
+        self.reset()
+
+    def reset(self):
+        """Forget all cars (new connection or session)"""
+        self.stops.fill(0)
+        self._prev_time: Optional[float] = None
+        self._on_pit = np.zeros(MAX_CARS, dtype=np.bool_)
+        self._in_world = np.zeros(MAX_CARS, dtype=np.bool_)
+        self._enter_time = np.full(MAX_CARS, np.nan)      # Session time of pit entry
+        self._stationary = np.zeros(MAX_CARS)             # Seconds stationary this visit
+        self._entered = np.zeros(MAX_CARS, dtype=np.bool_)  # Entry was seen (not started in pits)
+
+    def update(self, frame: FrameSnapshot, speeds: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Detect pit entries/exits since the previous frame.
+
+        Args:
+            frame: Current frame snapshot
+            speeds: Per-car speed (m/s), e.g. the speed estimator's output
+
+        Returns:
+            Events: {'type': 'pit:enter'|'pit:exit', 'car_idx', 'lap', 'session_time',
+                     and for exits 'pit_lane_time', 'stationary_time', 'stopped', 'stops'}
+        """
+        now = frame.scalar('SessionTime')
+        on_pit = frame.car('CarIdxOnPitRoad')
+        surface = frame.car('CarIdxTrackSurface')
+        n = min(len(on_pit), MAX_CARS)
+        on_pit, surface = on_pit[:n].astype(np.bool_), surface[:n]
+
+        if self._prev_time is not None and now < self._prev_time:
+            # Session time went backwards (new session / replay seek)
+            self.reset()
+
+        first = self._prev_time is None
+        dt = 0.0 if first else now - self._prev_time
+        self._prev_time = now
+
+        was_on_pit = self._on_pit[:n].copy()
+        was_in_world = self._in_world[:n].copy()
+        in_world = surface != TRACK_NOT_IN_WORLD
+        self._on_pit[:n] = on_pit
+        self._in_world[:n] = in_world
+
+        # Stationary time accrues for cars that stayed on pit road
+        stayed = on_pit & was_on_pit
+        if dt > 0:
+            self._stationary[:n][stayed & (speeds[:n] < self.STATIONARY_SPEED)] += dt
+
+        events: List[Dict[str, Any]] = []
+        if first:
+            # Whoever is on pit road now was already there - no entry to report
+            return events
+
+        entered = np.flatnonzero(on_pit & ~was_on_pit)
+        exited = np.flatnonzero(was_on_pit & ~on_pit)
+
+        laps = frame.car('CarIdxLap')
+        for car_idx in exited:
+            seen_entry = self._entered[car_idx]
+            self._entered[car_idx] = False
+            if not in_world[car_idx] or not seen_entry:
+                continue
+            pit_lane_time = now - self._enter_time[car_idx]
+            stationary = float(self._stationary[car_idx])
+            stopped = stationary >= self.MIN_STOP_TIME
+            if stopped:
+                self.stops[car_idx] += 1
+            events.append({
+                'type': 'pit:exit',
+                'car_idx': int(car_idx),
+                'lap': int(laps[car_idx]),
+                'session_time': float(now),
+                'pit_lane_time': float(pit_lane_time),
+                'stationary_time': stationary,
+                'stopped': stopped,
+                'stops': int(self.stops[car_idx]),
+            })
+
+        for car_idx in entered:
+            self._enter_time[car_idx] = now
+            self._stationary[car_idx] = 0.0
+            # Out of the garage isn't a pit entry
+            self._entered[car_idx] = in_world[car_idx] and was_in_world[car_idx]
+            if not self._entered[car_idx]:
+                continue
+            events.append({
+                'type': 'pit:enter',
+                'car_idx': int(car_idx),
+                'lap': int(laps[car_idx]),
+                'session_time': float(now),
+                'stops': int(self.stops[car_idx]),
+            })
+        return events
@@ -1,20 +1,27 @@
 """
 PitBox Relay Agent - Server Client
-Socket.IO client for connecting to PitBox Server
+Client for connecting to PitBox Server (Socket.IO, or raw WebSocket with RELAY_TRANSPORT)
 """
 import logging
 import time
-from typing import Callable, Optional, Dict, Any
-import socketio
-import socketio.exceptions
+from typing import Callable, Optional, Dict, Any, List
 
 import config
 from protocol import (
     SessionMetadata, 
     TelemetrySnapshot, 
     Incident, 
-    RaceEvent
+    RaceEvent,
+    MessageValidator
 )
+import binary_codec
+import compression
+from perf_stats import perf
+from controls_delta import CHANNELS, ControlsDeltaEncoder
+from spool import OutboundSpool
+from strategy_delta import StrategyDeltaEncoder
+from stream_batcher import Batch, StreamBatcher, parse_windows
+from transport import Transport, create_transport
 
 logger = logging.getLogger(__name__)
 
@@ -22,23 +29,21 @@ logger = logging.getLogger(__name__)
 class PitBoxClient:
     """
     Socket.IO client for communicating with PitBox Server
+    (or the raw WebSocket transport, RELAY_TRANSPORT=websocket)
     
     Protocol v2 Support:
     - Multi-stream telemetry (baseline 4Hz, controls 15Hz)
     - Viewer-aware adaptive streaming
     - Sequence numbers and timestamps on all packets
+    - Optional per-message compression (negotiated via 'relay:capabilities')
     """
     
+    # Never compressed: handshake, and already-compressed JPEG frames
+    UNCOMPRESSED_EVENTS = {'relay:register', 'relay:capabilities', 'telemetry:schema', 'video_frame'}
+    
     def __init__(self, url: str = None):
         self.url = url or config.CLOUD_URL
-        self.sio = socketio.Client(
-            reconnection=True,
-            reconnection_attempts=10,
-            reconnection_delay=1,
-            reconnection_delay_max=30,
-            logger=False,
-            engineio_logger=False
-        )
+        self.sio = self._create_sio()
         self.connected = False
         self.session_id: Optional[str] = None
         
@@ -48,51 +53,175 @@ class PitBoxClient:
         self.baseline_seq = 0
         self.controls_seq = 0
         self.event_seq = 0
+        self.strategy = StrategyDeltaEncoder()
+        self.controls_delta = ControlsDeltaEncoder()
+        # Protocol model validation: full / sampled / first / off (VALIDATION_MODE)
+        self.validator = MessageValidator(
+            config.VALIDATION_MODE,
+            sample_every=config.VALIDATION_SAMPLE_EVERY,
+            log_interval=config.VALIDATION_LOG_INTERVAL
+        )
+        # Opt-in micro-batching of v2 stream samples (BATCH_WINDOWS_MS)
+        self.batcher = StreamBatcher(parse_windows(config.BATCH_WINDOWS_MS))
+        
+        # Compression: codecs we offer, our dictionary, and what the server accepted
+        self.compression_codecs = [
+            codec for codec in (c.strip() for c in config.COMPRESSION.split(','))
+            if codec in compression.available_codecs()
+        ]
+        if config.COMPRESSION and not self.compression_codecs:
+            logger.warning(f"⚠️ No usable compression codec in COMPRESSION={config.COMPRESSION!r}")
+        self.compression_dict = (
+            compression.load_dictionary(config.COMPRESSION_DICT) if self.compression_codecs else None
+        )
+        self.compressor: Optional[compression.PacketCompressor] = None
+        self.recorder = compression.TrafficRecorder(config.COMPRESSION_RECORD) if config.COMPRESSION_RECORD else None
+        
+        # Disk spool for events sent while disconnected (SPOOL_EVENTS)
+        self.spool_events = {e.strip() for e in config.SPOOL_EVENTS.split(',') if e.strip()}
+        self.spool: Optional[OutboundSpool] = None
+        if config.SPOOL_ENABLED:
+            self.spool = OutboundSpool(
+                config.SPOOL_DIR,
+                max_bytes=int(config.SPOOL_MAX_MB * 1024 * 1024),
+                segment_bytes=config.SPOOL_SEGMENT_KB * 1024,
+                fsync=config.SPOOL_FSYNC
+            )
+        self._drain_allowance = 0.0
+        self._last_drain = time.monotonic()
         
         # Set up event handlers
         self._setup_handlers()
     
+    def _create_sio(self) -> Transport:
+        """Create the connection (socketio.Client unless RELAY_TRANSPORT says otherwise)"""
+        return create_transport(
+            config.RELAY_TRANSPORT,
+            reconnection=True,
+            reconnection_attempts=10,
+            reconnection_delay=1,
+            reconnection_delay_max=30
+        )
+    
     def _setup_handlers(self):
         """Set up Socket.IO event handlers"""
         
         @self.sio.event
         def connect():
             self.connected = True
+            self.strategy.request_keyframe()  # Server may have missed deltas
+            self.controls_delta.request_keyframe()
+            self.compressor = None  # Uncompressed until the server accepts a codec
             logger.info(f"✅ Connected to PitBox Server at {self.url}")
+            if self.compression_codecs:
+                self.sio.emit('relay:capabilities', self.capabilities())
             # Register as relay for this session
             if self.session_id:
                 self.sio.emit('relay:register', {'sessionId': self.session_id})
+                if self.sends_schema():
+                    self.sio.emit('telemetry:schema', self.telemetry_schema())
         
         @self.sio.event
         def disconnect():
             self.connected = False
+            self.batcher.clear()
+            self.controls_delta.request_keyframe()  # Cleared samples were already committed
+            self.compressor = None
             logger.warning("⚠️ Disconnected from PitBox Server")
         
         @self.sio.event
         def connect_error(error):
             logger.error(f"❌ Connection error: {error}")
         
-        @self.sio.on('recommendation')
+        # Server's answer to our capabilities: the codec it accepts (or none)
+        @self.sio.on('relay:capabilities')
+        def on_capabilities(data):
+            self.compressor = self._negotiate_compression(data or {})
+        
+        self._setup_message_handlers(self.sio)
+    
+    def sends_schema(self) -> bool:
+        """Do the streams need 'telemetry:schema' (binary or delta encoded)?"""
+        return config.BINARY_STREAMS or config.CONTROLS_DELTA
+    
+    def telemetry_schema(self) -> Dict[str, Any]:
+        """'telemetry:schema': binary codec layouts plus the controls delta channels"""
+        schema = binary_codec.schema()
+        if config.CONTROLS_DELTA:
+            schema['controlsDelta'] = {
+                'channels': [name for name, _ in CHANNELS],
+                'steps': [self.controls_delta.steps[name] for name, _ in CHANNELS],
+                'keyframeEvery': self.controls_delta.keyframe_every,
+            }
+        return schema
+    
+    def capabilities(self) -> Dict[str, Any]:
+        """'relay:capabilities' sent on connect"""
+        return {
+            'relayVersion': config.RELAY_VERSION,
+            'compression': self.compression_codecs,
+            'dictId': compression.dictionary_id(self.compression_dict),
+        }
+    
+    def _negotiate_compression(self, reply: Dict[str, Any]) -> Optional[compression.PacketCompressor]:
+        compressor = compression.negotiate(
+            self.compression_codecs, reply, self.compression_dict, config.COMPRESSION_LEVEL
+        )
+        if compressor:
+            dictionary = 'with dictionary' if compressor.dictionary else 'no dictionary'
+            logger.info(f"🗜️ Compression: {compressor.codec} ({dictionary})")
+        else:
+            logger.info("🗜️ Compression: off (not accepted by server)")
+        return compressor
+    
+    def _compress(
+        self,
+        compressor: Optional[compression.PacketCompressor],
+        event: str,
+        data: Dict[str, Any]
+    ):
+        """(event, data) as sent: compressed if a codec was negotiated"""
+        if compressor is None or event in self.UNCOMPRESSED_EVENTS:
+            return event, data
+        with perf.measure('compress'):
+            return compression.compress_message(compressor, event, data, config.COMPRESSION_MIN_BYTES)
+    
+    def _setup_message_handlers(self, sio):
+        """Handlers for server messages (shared by every connection)"""
+        
+        @sio.on('recommendation')
         def on_recommendation(data):
             logger.info(f"📥 RECOMMENDATION: {data.get('action')} - {data.get('details')}")
             logger.info(f"   Confidence: {data.get('confidence', 0) * 100:.0f}%")
         
-        @self.sio.on('profile_loaded')
+        @sio.on('profile_loaded')
         def on_profile_loaded(data):
             logger.info(f"📖 Profile loaded: {data.get('profileName')} [{data.get('category')}]")
         
-        @self.sio.on('ack')
+        @sio.on('ack')
         def on_ack(data):
             logger.debug(f"   ✓ {data.get('originalType')} acknowledged")
         
-        @self.sio.on('steward_command')
+        @sio.on('steward_command')
         def on_steward_command(data):
             logger.info(f"⚡ STEWARD COMMAND: {data.get('command')}")
             logger.info(f"   Reason: {data.get('reason')}")
             # TODO: Implement command execution in iRacing
         
         # v2: Viewer count control message
-        @self.sio.on('relay:viewers')
+        # Server saw a strategy_update sequence gap
+        @sio.on('strategy:keyframe')
+        def on_strategy_keyframe(data=None):
+            logger.debug("   Strategy keyframe requested")
+            self.strategy.request_keyframe()
+        
+        # Server got a controls delta it couldn't apply
+        @sio.on('controls:keyframe')
+        def on_controls_keyframe(data=None):
+            logger.debug("   Controls keyframe requested")
+            self.controls_delta.request_keyframe()
+        
+        @sio.on('relay:viewers')
         def on_relay_viewers(data):
             old_count = self.viewer_count
             self.viewer_count = data.get('viewerCount', 0)
@@ -126,8 +255,13 @@ class PitBoxClient:
     def disconnect(self):
         """Disconnect from PitBox Cloud"""
         if self.sio.connected:
+            self._emit_batches(self.batcher.flush_all())
             self.sio.disconnect()
         self.connected = False
+        if self.recorder:
+            self.recorder.flush()
+        if self.spool:
+            self.spool.close()
         logger.info("🔌 Disconnected from PitBox Server")
     
     def is_connected(self) -> bool:
@@ -136,20 +270,67 @@ class PitBoxClient:
     
     def emit(self, event: str, data: Dict[str, Any]):
         """
-        Emit an event to PitBox Cloud
+        Emit an event to PitBox Cloud.
+        While disconnected (or if the send fails), events listed in SPOOL_EVENTS
+        go to the disk spool instead and count as sent; drain_spool() replays them.
         """
+        return self._emit(event, data) is not None
+    
+    def _emit(self, event: str, data: Dict[str, Any]) -> Optional[bool]:
+        """emit(): True if sent, False if only spooled, None if dropped"""
+        if self.is_connected() and self._send(event, data):
+            return True
+        if self.spools(event) and self.spool.append(event, data):
+            return False
         if not self.is_connected():
             logger.warning(f"Cannot emit {event}: not connected")
-            return False
-        
+        return None
+    
+    def _send(self, event: str, data: Dict[str, Any]) -> bool:
+        """Put one message on the wire (recorded, compressed if negotiated)"""
         try:
-            self.sio.emit(event, data)
+            if self.recorder:
+                self.recorder.record(event, data)
+            wire_event, wire_data = self._compress(self.compressor, event, data)
+            with perf.measure('emit'):
+                self.sio.emit(wire_event, wire_data)
             logger.debug(f"📤 Sent {event}")
             return True
         except Exception as e:
             logger.error(f"Failed to emit {event}: {e}")
             return False
     
+    def spools(self, event: str) -> bool:
+        """Is this event kept in the spool while disconnected?"""
+        return self.spool is not None and event in self.spool_events
+    
+    def drain_spool(self) -> int:
+        """
+        Replay spooled messages, oldest first, at most SPOOL_DRAIN_RATE per
+        second (call every frame). Replayed messages carry 'replayed': True
+        and 'spooledAt' (ms) so the server can tell them from live data.
+        """
+        if self.spool is None or not self.is_connected():
+            return 0
+        now = time.monotonic()
+        rate = config.SPOOL_DRAIN_RATE
+        self._drain_allowance = min(rate, self._drain_allowance + (now - self._last_drain) * rate)
+        self._last_drain = now
+        if self._drain_allowance < 1:
+            return 0
+        
+        sent = self.spool.drain(self._send_replayed, int(self._drain_allowance))
+        self._drain_allowance -= sent
+        if sent:
+            pending = self.spool.pending()
+            logger.debug(f"📦 Replayed {sent} spooled messages ({pending} left)")
+            if not pending:
+                logger.info(f"📦 Spool drained ({self.spool.drained} messages replayed)")
+        return sent
+    
+    def _send_replayed(self, event: str, data: Dict[str, Any], spooled_at: float) -> bool:
+        return self._send(event, {**data, 'replayed': True, 'spooledAt': spooled_at})
+    
     def send_session_metadata(self, metadata: Dict[str, Any]):
         """Send session metadata message"""
         try:
@@ -160,11 +341,18 @@ class PitBoxClient:
             if 'timestamp' not in metadata:
                  metadata['timestamp'] = time.time() * 1000
                  
-            model = SessionMetadata(**metadata)
-            self.session_id = model.sessionId
+            with perf.measure('validate'):
+                message = self.validator.validate(SessionMetadata, metadata, 'Metadata')
+            if message is None:
+                return False
+            self.session_id = message['sessionId']
             
             # Emit the dict representation
-            return self.emit('session_metadata', model.model_dump())
+            sent = self.emit('session_metadata', message)
+            if sent and self.sends_schema():
+                # Layouts for the binary v2 streams that follow
+                self.emit('telemetry:schema', self.telemetry_schema())
+            return sent
         except Exception as e:
             logger.error(f"❌ Protocol Violation (Metadata): {e}")
             return False
@@ -182,16 +370,39 @@ class PitBoxClient:
             # For now, we keep the JSON path as fallback or for debug
             # In a full binary switch, we would call send_binary_telemetry here
             
-            model = TelemetrySnapshot(**telemetry)
-            return self.emit('telemetry', model.model_dump())
+            with perf.measure('validate'):
+                message = self.validator.validate(TelemetrySnapshot, telemetry, 'Telemetry')
+            if message is None:
+                return False
+            return self.emit('telemetry', message)
         except Exception as e:
-            # Rate limit this log in production
             logger.error(f"❌ Protocol Violation (Telemetry): {e}")
             return False
 
     def send_telemetry_binary(self, telemetry: Dict[str, Any]):
         """
-        Send compressed binary telemetry
+        Send compressed binary telemetry from a mapped telemetry snapshot.
+        Layout: see binary_codec.pack_grid (~14 bytes per car vs ~200 bytes JSON).
+        Prefer send_grid_binary() when the frame columns are at hand.
+        """
+        cars = telemetry.get('cars', [])
+        grid = {
+            'car_ids': [int(car.get('carId', 0)) for car in cars],
+            # Dist is nested in 'pos' object usually, handle flat or nested
+            'lap_dist_pct': [
+                car['pos'].get('s', 0.0) if isinstance(car.get('pos'), dict) else 0.0
+                for car in cars
+            ],
+            'speed': [float(car.get('speed', 0.0)) for car in cars],
+            'lap': [int(car.get('lap', 0)) for car in cars],
+            'position': [int(car.get('position', 0)) for car in cars],
+        }
+        return self.send_grid_binary(telemetry.get('timestamp', time.time() * 1000), grid)
+
+    def send_grid_binary(self, ts_ms: float, grid: Dict[str, Any]):
+        """
+        Send the whole grid as telemetry_binary, packed in one vectorised pass
+        from per-car columns (IRacingReader.get_grid()).
         Layout:
         - Timestamp (8 bytes double)
         - CarCount (1 byte)
@@ -202,43 +413,19 @@ class PitBoxClient:
             - Lap (2 bytes short)
             - Position (1 byte)
             - Flags (1 byte, Placeholder)
-        Total per car: ~14 bytes vs ~200 bytes JSON
         """
         try:
-            import struct
-            ts = telemetry.get('timestamp', time.time() * 1000)
-            cars = telemetry.get('cars', [])
-            
-            # Header needs to include session ID for routing on server
-            # But socket.io sends that in the wrapper or we can send as separate arg
-            # Let's pack the payload body
-            
-            # Pack Header: Timestamp(d) + CarCount(B)
-            # < = little endian
-            buffer = bytearray()
-            buffer.extend(struct.pack('<dB', ts, len(cars)))
-            
-            for car in cars:
-                # Car Struct
-                # ID(H), Dist(f), Speed(f), Lap(H), Pos(B), Flags(B)
-                c_id = int(car.get('carId', 0))
-                # Dist is nested in 'pos' object usually, handle flat or nested
-                dist = car.get('pos', {}).get('s', 0.0) if isinstance(car.get('pos'), dict) else 0.0
-                speed = float(car.get('speed', 0.0))
-                lap = int(car.get('lap', 0))
-                pos = int(car.get('position', 0))
-                
-                buffer.extend(struct.pack('<HffHBx', c_id, dist, speed, lap, pos))
-                
+            with perf.measure('pack'):
+                payload = binary_codec.pack_grid(ts_ms, **grid)
+
             if self.connected and self.session_id:
                 # Emit binary event
-                self.sio.emit('telemetry_binary', {
+                return self.emit('telemetry_binary', {
                     'sessionId': self.session_id,
-                    'payload': bytes(buffer)
+                    'payload': payload
                 })
-                return True
             return False
-            
+
         except Exception as e:
             logger.error(f"❌ Binary Packing Error: {e}")
             return False
@@ -249,8 +436,11 @@ class PitBoxClient:
              if 'timestamp' not in event:
                  event['timestamp'] = time.time() * 1000
                  
-             model = RaceEvent(**event)
-             return self.emit('race_event', model.model_dump())
+             with perf.measure('validate'):
+                 message = self.validator.validate(RaceEvent, event)
+             if message is None:
+                 return False
+             return self.emit('race_event', message)
         except Exception as e:
             logger.error(f"❌ Protocol Violation (RaceEvent): {e}")
             return False
@@ -261,8 +451,11 @@ class PitBoxClient:
              if 'timestamp' not in incident:
                  incident['timestamp'] = time.time() * 1000
                  
-             model = Incident(**incident)
-             return self.emit('incident', model.model_dump())
+             with perf.measure('validate'):
+                 message = self.validator.validate(Incident, incident)
+             if message is None:
+                 return False
+             return self.emit('incident', message)
         except Exception as e:
             logger.error(f"❌ Protocol Violation (Incident): {e}")
             return False
@@ -280,11 +473,10 @@ class PitBoxClient:
         if self.connected and self.session_id:
             payload = {
                 'sessionId': self.session_id,
-                'image': frame_data # socketio will automatically binary-pack this
+                'image': frame_data # Sent as a binary attachment (Socket.IO) or raw (WebSocket)
             }
             # Note: We rely on the library to handle binary attachments efficiently
-            self.sio.emit('video_frame', payload)
-            return True
+            return self.emit('video_frame', payload)
         return False
 
     # =========================================================================
@@ -302,6 +494,25 @@ class PitBoxClient:
         
         self.baseline_seq += 1
         
+        if config.BINARY_STREAMS:
+            return self._emit_binary_stream('baseline', self.baseline_seq, car_data)
+        
+        payload = {
+            'speed': car_data.get('speed', 0),
+            'gear': car_data.get('gear', 0),
+            'rpm': car_data.get('rpm', 0),
+            'lap': car_data.get('lap', 0),
+            'lapDistPct': car_data.get('lapDistPct', 0),
+            'position': car_data.get('position', 0),
+            'fuelLevel': car_data.get('fuelLevel', 0),
+            'fuelPct': car_data.get('fuelPct', 0),
+            'sessionFlags': car_data.get('sessionFlags', 0),
+            'gapAhead': car_data.get('gapAhead'),
+            'gapBehind': car_data.get('gapBehind'),
+        }
+        if self.batcher.batches('baseline'):
+            return self._batch_sample('baseline', self.baseline_seq, payload)
+        
         packet = {
             'v': 2,
             'type': 'telemetry:baseline',
@@ -310,19 +521,7 @@ class PitBoxClient:
             'sessionId': self.session_id,
             'streamType': 'baseline',
             'sampleHz': 4,
-            'payload': {
-                'speed': car_data.get('speed', 0),
-                'gear': car_data.get('gear', 0),
-                'rpm': car_data.get('rpm', 0),
-                'lap': car_data.get('lap', 0),
-                'lapDistPct': car_data.get('lapDistPct', 0),
-                'position': car_data.get('position', 0),
-                'fuelLevel': car_data.get('fuelLevel', 0),
-                'fuelPct': car_data.get('fuelPct', 0),
-                'sessionFlags': car_data.get('sessionFlags', 0),
-                'gapAhead': car_data.get('gapAhead'),
-                'gapBehind': car_data.get('gapBehind'),
-            }
+            'payload': payload
         }
         
         return self.emit('telemetry:baseline', packet)
@@ -342,6 +541,23 @@ class PitBoxClient:
         
         self.controls_seq += 1
         
+        if config.CONTROLS_DELTA:
+            return self._emit_controls_delta(self.controls_seq, car_data)
+        if config.BINARY_STREAMS:
+            return self._emit_binary_stream('controls', self.controls_seq, car_data)
+        
+        payload = {
+            'throttle': car_data.get('throttle', 0),
+            'brake': car_data.get('brake', 0),
+            'clutch': car_data.get('clutch', 0),
+            'steering': car_data.get('steering', 0),
+            'rpm': car_data.get('rpm', 0),
+            'speed': car_data.get('speed', 0),
+            'gear': car_data.get('gear', 0),
+        }
+        if self.batcher.batches('controls'):
+            return self._batch_sample('controls', self.controls_seq, payload)
+        
         packet = {
             'v': 2,
             'type': 'telemetry:controls',
@@ -349,20 +565,84 @@ class PitBoxClient:
             'seq': self.controls_seq,
             'sessionId': self.session_id,
             'streamType': 'controls',
-            'sampleHz': 15,
-            'payload': {
-                'throttle': car_data.get('throttle', 0),
-                'brake': car_data.get('brake', 0),
-                'clutch': car_data.get('clutch', 0),
-                'steering': car_data.get('steering', 0),
-                'rpm': car_data.get('rpm', 0),
-                'speed': car_data.get('speed', 0),
-                'gear': car_data.get('gear', 0),
-            }
+            'sampleHz': config.CONTROLS_RATE_HZ,
+            'payload': payload
         }
         
         return self.emit('telemetry:controls', packet)
     
+    def _emit_binary_stream(self, stream: str, seq: int, car_data: Dict[str, Any]) -> bool:
+        """
+        Send a v2 stream packet with the binary codec (see binary_codec):
+        fixed layout per stream, header with version, stream id, schema hash,
+        seq and ms timestamp. The server learns layouts from 'telemetry:schema'.
+        """
+        try:
+            with perf.measure('pack'):
+                data = binary_codec.encode_packet(stream, seq, time.time() * 1000, car_data)
+        except binary_codec.CodecError as e:
+            logger.error(f"❌ Binary Packing Error ({stream}): {e}")
+            return False
+        if self.batcher.batches(stream):
+            return self._batch_sample(stream, seq, data)
+        return self.emit('telemetry:v2', {'sessionId': self.session_id, 'payload': data})
+    
+    def _emit_controls_delta(self, seq: int, car_data: Dict[str, Any]) -> bool:
+        """
+        Send a controls sample with the quantised delta codec (see
+        controls_delta): keyframes carry full values, deltas only the change
+        in quantisation steps. Steps are announced in 'telemetry:schema'.
+        """
+        with perf.measure('pack'):
+            data = self.controls_delta.encode(seq, time.time() * 1000, car_data)
+        if self.batcher.batches('controls'):
+            sent = self._batch_sample('controls', seq, data)
+        else:
+            sent = self.emit('telemetry:controls:delta', {'sessionId': self.session_id, 'payload': data})
+        self.controls_delta.commit(sent)
+        return sent
+    
+    def _batch_sample(self, stream: str, seq: int, sample: Any) -> bool:
+        """Hold a stream sample for its batch; sends any batches now due"""
+        self._emit_batches(self.batcher.add(stream, seq, sample))
+        return True
+    
+    def flush_batches(self) -> bool:
+        """
+        Send batches whose latency window has elapsed. Call this regularly
+        (every frame) while batching, so batches go out when samples stop.
+        """
+        return self._emit_batches(self.batcher.flush_due())
+    
+    def _emit_batches(self, batches: List[Batch]) -> bool:
+        """
+        One packet per batch: first seq, sample count, timestamp base and
+        per-sample ms offsets. JSON samples go as a list ('telemetry:batch');
+        binary samples are concatenated codec packets ('telemetry:v2:batch',
+        or 'telemetry:controls:delta:batch' for delta-encoded controls).
+        """
+        sent = True
+        for batch in batches:
+            packet = {
+                'v': 2,
+                'type': 'telemetry:batch',
+                'sessionId': self.session_id,
+                'streamType': batch.stream,
+                **batch.to_packet()
+            }
+            if config.CONTROLS_DELTA and batch.stream == 'controls':
+                packet['payload'] = b''.join(packet.pop('samples'))
+                if not self.emit('telemetry:controls:delta:batch', packet):
+                    # Samples were committed when batched: resync with a keyframe
+                    self.controls_delta.request_keyframe()
+                    sent = False
+            elif config.BINARY_STREAMS:
+                packet['payload'] = b''.join(packet.pop('samples'))
+                sent = self.emit('telemetry:v2:batch', packet) and sent
+            else:
+                sent = self.emit('telemetry:batch', packet) and sent
+        return sent
+    
     def send_event(self, event_type: str, payload: Dict[str, Any]) -> bool:
         """
         Send instant event (not tick-gated).
@@ -370,7 +650,7 @@ class PitBoxClient:
         Event types: incident, offtrack, overlap:enter, overlap:exit,
                      three_wide, pit:enter, pit:exit, flag:change, position:change
         """
-        if not self.connected or not self.session_id:
+        if not self.session_id or not (self.connected or self.spools('event')):
             return False
         
         self.event_seq += 1
@@ -391,6 +671,26 @@ class PitBoxClient:
         
         return self.emit('event', packet)
     
+    def send_strategy_update(self, session_id: str, cars: List[Dict[str, Any]]) -> bool:
+        """
+        Send the strategy stream (1 Hz): a keyframe with every car, or only the
+        cars and fields that changed since the previous packet.
+        
+        Packets carry 'seq' and 'keyframe'; on a sequence gap the server emits
+        'strategy:keyframe' and the next packet is a full keyframe. A packet
+        that only reached the spool doesn't count as sent, so the first live
+        packet after it is a keyframe too.
+        """
+        packet = {
+            'type': 'strategy_update',
+            'sessionId': session_id,
+            'timestamp': time.time() * 1000,
+            **self.strategy.encode(cars)
+        }
+        sent = self._emit('strategy_update', packet)
+        self.strategy.commit(bool(sent))
+        return sent is not None
+    
     def should_send_controls(self) -> bool:
         """Check if controls stream should be active (viewers present)."""
         return self.controls_requested
@@ -3,6 +3,7 @@ from .session_metadata import SessionMetadata, WeatherData
 from .telemetry import TelemetrySnapshot, CarTelemetrySnapshot
 from .incident import Incident
 from .race_event import RaceEvent
+from .validation import MessageValidator
 
 __all__ = [
     'RelayMessage',
@@ -11,5 +12,6 @@ __all__ = [
     'TelemetrySnapshot',
     'CarTelemetrySnapshot',
     'Incident',
-    'RaceEvent'
+    'RaceEvent',
+    'MessageValidator'
 ]
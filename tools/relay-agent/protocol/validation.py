@@ -0,0 +1,116 @@
+import logging
+import time
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Validation modes
+FULL = 'full'          # Every message
+SAMPLED = 'sampled'    # Every Nth message of each type
+FIRST = 'first'        # First message of each type only
+OFF = 'off'            # Never (messages are sent as built)
+
+MODES = (FULL, SAMPLED, FIRST, OFF)
+
+
+class MessageValidator:
+    """
+    Validates outgoing messages against their protocol model, as often as
+    the mode asks for.
+
+    Every message is sent as built, with the model's top-level defaults
+    filled in, whether it was checked or not: the wire shape doesn't depend
+    on the mode. Checking only decides whether it goes out (a message that
+    fails is dropped). Violations are logged at most once per log_interval
+    per message type, with a count of the ones suppressed.
+    """
+
+    def __init__(self, mode: str = FULL, sample_every: int = 100, log_interval: float = 10.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown validation mode: {mode}")
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+        self.log_interval = log_interval
+
+        self._adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+        self._defaults: Dict[Type[BaseModel], Dict[str, Any]] = {}
+        self._seen: Dict[str, int] = {}
+
+        # Per type: violations, and rate-limited logging state
+        self.violations: Dict[str, int] = {}
+        self.checked = 0
+        self.skipped = 0
+        self._last_log: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def _adapter(self, model: Type[BaseModel]) -> TypeAdapter:
+        adapter = self._adapters.get(model)
+        if adapter is None:
+            adapter = self._adapters[model] = TypeAdapter(model)
+        return adapter
+
+    def _model_defaults(self, model: Type[BaseModel]) -> Dict[str, Any]:
+        defaults = self._defaults.get(model)
+        if defaults is None:
+            defaults = self._defaults[model] = {
+                name: field.get_default(call_default_factory=True)
+                for name, field in model.model_fields.items()
+                if not field.is_required()
+            }
+        return defaults
+
+    def should_check(self, name: str) -> bool:
+        count = self._seen.get(name, 0)
+        self._seen[name] = count + 1
+        if self.mode == FULL:
+            return True
+        if self.mode == SAMPLED:
+            return count % self.sample_every == 0
+        if self.mode == FIRST:
+            return count == 0
+        return False
+
+    def validate(self, model: Type[BaseModel], data: Dict[str, Any], label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Message to send for data, or None if it violates the protocol.
+
+        Args:
+            model: Protocol model (e.g. TelemetrySnapshot)
+            data: Message as built by the data mapper
+            label: Name used in logs and stats (default: model name)
+        """
+        name = label or model.__name__
+        message = {**self._model_defaults(model), **data}
+        if not self.should_check(name):
+            self.skipped += 1
+            return message
+
+        self.checked += 1
+        try:
+            self._adapter(model).validate_python(data)
+        except ValidationError as e:
+            self._violation(name, e)
+            return None
+        return message
+
+    def _violation(self, name: str, error: ValidationError):
+        self.violations[name] = self.violations.get(name, 0) + 1
+        now = time.monotonic()
+        last = self._last_log.get(name)
+        if last is not None and now - last < self.log_interval:
+            self._suppressed[name] = self._suppressed.get(name, 0) + 1
+            return
+        self._last_log[name] = now
+        suppressed = self._suppressed.pop(name, 0)
+        more = f" (+{suppressed} more since last report)" if suppressed else ""
+        logger.error(f"❌ Protocol Violation ({name}){more}: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'checked': self.checked,
+            'skipped': self.skipped,
+            'violations': dict(self.violations),
+        }
@@ -0,0 +1,94 @@
+"""
+PitBox Relay Agent - Speed Estimator
+Per-car speed from successive CarIdxLapDistPct samples (iRacing only sends the player's)
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+import config
+from frame_snapshot import FrameSnapshot, MAX_CARS
+
+logger = logging.getLogger(__name__)
+
+
+class SpeedEstimator:
+    """
+    Estimates every car's speed (m/s) from lap-distance deltas.
+
+    Vectorised over all car slots each frame:
+    - Distance is lap-wrapped, so crossing the line isn't a -1 lap move
+    - Jumps beyond max_move (tow, pit-stall reset) are ignored, not turned into speed
+    - Cars leaving the world drop to 0
+    - Raw speeds are smoothed with a time-based EMA, so the result doesn't
+      depend on how often update() runs
+    """
+
+    # EMA time constant (seconds)
+    SMOOTHING_TIME = 0.3
+    # Frames closer together than this are skipped (too noisy to differentiate)
+    MIN_DT = 0.005
+
+    def __init__(self, max_move: float = config.POSITION_JUMP_THRESHOLD):
+        """
+        Args:
+            max_move: Movement per update (fraction of a lap) treated as a teleport
+        """
+        self.max_move = max_move
+        self.speed = np.zeros(MAX_CARS)  # Smoothed speed per car (m/s)
+        self._prev_time: Optional[float] = None
+        self._prev_pct = np.full(MAX_CARS, -1.0)
+
+    def reset(self):
+        """Forget all cars (new connection or session)"""
+        self.speed.fill(0.0)
+        self._prev_time = None
+        self._prev_pct.fill(-1.0)
+
+    def update(self, frame: FrameSnapshot, track_length_km: float) -> np.ndarray:
+        """
+        Update from a new frame.
+
+        Args:
+            frame: Current frame snapshot
+            track_length_km: Track length from SessionData
+
+        Returns:
+            Smoothed speed per car (m/s), shared array - copy to keep
+        """
+        now = frame.scalar('SessionTime')
+        pct = frame.car('CarIdxLapDistPct')
+        n = min(len(pct), MAX_CARS)
+        pct = pct[:n].astype(np.float64)
+
+        if self._prev_time is not None and now < self._prev_time:
+            # Session time went backwards (new session / replay seek)
+            self.reset()
+
+        if self._prev_time is not None and now - self._prev_time < self.MIN_DT:
+            return self.speed
+
+        prev_time = self._prev_time
+        prev_pct = self._prev_pct[:n].copy()
+        self._prev_time = now
+        self._prev_pct[:n] = pct
+
+        in_world = pct >= 0
+        self.speed[:n][~in_world] = 0.0
+        if prev_time is None or track_length_km <= 0:
+            return self.speed
+
+        dt = now - prev_time
+        moved = np.abs((pct - prev_pct + 0.5) % 1.0 - 0.5)  # Lap-wrapped
+        valid = in_world & (prev_pct >= 0) & (moved <= self.max_move)
+
+        raw = moved * (track_length_km * 1000.0) / dt
+        alpha = 1.0 - np.exp(-dt / self.SMOOTHING_TIME)
+        speed = self.speed[:n]
+        # Cars (re)appearing start from their raw speed rather than ramping up from 0
+        fresh = valid & (speed == 0.0)
+        speed[fresh] = raw[fresh]
+        smooth = valid & ~fresh
+        speed[smooth] += alpha * (raw[smooth] - speed[smooth])
+        return self.speed
@@ -0,0 +1,333 @@
+"""
+PitBox Relay Agent - Outbound Spool
+Append-only, disk-capped segment files holding messages sent while disconnected
+"""
+import base64
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# fsync policies
+FSYNC_ALWAYS = 'always'    # Every record (survives power loss, slowest)
+FSYNC_SEGMENT = 'segment'  # When a segment is closed
+FSYNC_NEVER = 'never'      # Leave it to the OS
+
+# Record: <body length u32, body crc32 u32> + body (JSON)
+RECORD_HEADER = struct.Struct('<II')
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return {'__b64__': base64.b64encode(value).decode()}
+    return str(value)
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and '__b64__' in obj:
+        return base64.b64decode(obj['__b64__'])
+    return obj
+
+
+def encode_record(event: str, data: Dict[str, Any], spooled_at: float) -> bytes:
+    body = json.dumps(
+        {'event': event, 'ts': spooled_at, 'data': data},
+        separators=(',', ':'), default=_json_default
+    ).encode()
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_record(body: bytes) -> Tuple[str, Dict[str, Any], float]:
+    record = json.loads(body, object_hook=_json_object_hook)
+    return record['event'], record['data'], record['ts']
+
+
+class OutboundSpool:
+    """
+    Messages that couldn't be sent, on disk, oldest first.
+
+    Records are appended to the newest segment file (spool-NNNNNNNN.seg);
+    a segment is closed once it reaches segment_bytes. When the spool
+    exceeds max_bytes the oldest segment is evicted (drop-oldest), so disk
+    use is bounded and the newest history survives a long outage.
+
+    drain() hands records to a send callback in order and deletes segments
+    once they're fully sent, the open one included. Segments left by a
+    previous run are picked up on start (a torn record at the end of a
+    segment is discarded), resuming from the read cursor saved by close(),
+    so delivery is at-least-once across restarts (exactly-once after a
+    clean shutdown).
+    """
+
+    SEGMENT_PREFIX = 'spool-'
+    SEGMENT_SUFFIX = '.seg'
+    CURSOR_FILE = 'spool.cursor'
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        segment_bytes: int,
+        fsync: str = FSYNC_SEGMENT
+    ):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_SEGMENT, FSYNC_NEVER):
+            raise ValueError(f"Unknown spool fsync policy: {fsync}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = max(1, min(segment_bytes, max_bytes // 2))
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+        # Segment id -> (size in bytes, record count)
+        self._segments: Dict[int, List[int]] = {}
+        self._writer = None
+        self._writer_id: Optional[int] = None
+        # Read cursor: byte offset of the next unsent record in the oldest segment
+        self._read_offset = 0
+
+        # Counters
+        self.appended = 0
+        self.drained = 0
+        self.evicted = 0
+        self.corrupt = 0
+
+        self._load_existing()
+
+    # =====================================================================
+    # Segments
+    # =====================================================================
+
+    def _path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f'{self.SEGMENT_PREFIX}{segment_id:08d}{self.SEGMENT_SUFFIX}')
+
+    def _load_existing(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not (name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX)):
+                continue
+            try:
+                segment_id = int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            size, count = self._scan(segment_id)
+            self._segments[segment_id] = [size, count]
+        self._load_cursor()
+        if self._segments:
+            logger.info(f"📦 Spool: {self.pending()} messages from a previous run in {self.directory}")
+
+    def _scan(self, segment_id: int) -> Tuple[int, int]:
+        """(valid size, record count); truncates a torn record at the end"""
+        path = self._path(segment_id)
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = count = 0
+        while True:
+            record = self._read_record(data, offset)
+            if record is None:
+                break
+            offset = record[1]
+            count += 1
+        if offset != len(data):
+            self.corrupt += 1
+            logger.warning(f"⚠️ Spool: discarding {len(data) - offset} bad bytes at the end of {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        return offset, count
+
+    def _load_cursor(self):
+        """Skip the records a previous run drained from its oldest segment"""
+        path = os.path.join(self.directory, self.CURSOR_FILE)
+        try:
+            with open(path) as f:
+                cursor = json.load(f)
+            os.remove(path)
+            segment_id, offset = int(cursor['segment']), int(cursor['offset'])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️ Spool: ignoring unreadable read cursor: {e}")
+            return
+        if segment_id != min(self._segments, default=None):
+            return
+        with open(self._path(segment_id), 'rb') as f:
+            data = f.read(offset)
+        pos = skipped = 0
+        while pos < offset:
+            record = self._read_record(data, pos)
+            if record is None:
+                return  # Not on a record boundary: replay the whole segment
+            pos = record[1]
+            skipped += 1
+        self._read_offset = offset
+        self._segments[segment_id][1] -= skipped
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, self.CURSOR_FILE)
+        try:
+            if self._read_offset and self._segments:
+                with open(path, 'w') as f:
+                    json.dump({'segment': min(self._segments), 'offset': self._read_offset}, f)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Spool: could not save the read cursor: {e}")
+
+    @staticmethod
+    def _read_record(data: bytes, offset: int) -> Optional[Tuple[bytes, int]]:
+        """(body, next offset), or None at the end / a torn or corrupt record"""
+        if offset + RECORD_HEADER.size > len(data):
+            return None
+        length, crc = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        body = data[start:start + length]
+        if len(body) != length or zlib.crc32(body) != crc:
+            return None
+        return body, start + length
+
+    def _close_writer(self):
+        if self._writer is None:
+            return
+        self._writer.flush()
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self._writer.fileno())
+        self._writer.close()
+        self._writer = None
+        self._writer_id = None
+
+    def _delete_segment(self, segment_id: int):
+        if segment_id == self._writer_id:
+            self._close_writer()
+        self._segments.pop(segment_id, None)
+        try:
+            os.remove(self._path(segment_id))
+        except OSError as e:
+            logger.warning(f"⚠️ Spool: could not remove segment {segment_id}: {e}")
+
+    def _evict(self):
+        """Drop the oldest segments until under max_bytes (keeps the newest)"""
+        while len(self._segments) > 1 and sum(s for s, _ in self._segments.values()) > self.max_bytes:
+            oldest = min(self._segments)
+            count = self._segments[oldest][1]
+            self._read_offset = 0  # The read cursor is always in the oldest segment
+            self.evicted += count
+            logger.warning(f"⚠️ Spool full: evicted {count} oldest messages")
+            self._delete_segment(oldest)
+
+    # =====================================================================
+    # Public API
+    # =====================================================================
+
+    def append(self, event: str, data: Dict[str, Any]) -> bool:
+        """Spool one message; False if it couldn't be written"""
+        record = encode_record(event, data, time.time() * 1000)
+        with self._lock:
+            try:
+                if self._writer is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._writer_id = max(self._segments, default=0) + 1
+                    self._writer = open(self._path(self._writer_id), 'ab')
+                    self._segments[self._writer_id] = [0, 0]
+                self._writer.write(record)
+                if self.fsync == FSYNC_ALWAYS:
+                    self._writer.flush()
+                    os.fsync(self._writer.fileno())
+                segment = self._segments[self._writer_id]
+                segment[0] += len(record)
+                segment[1] += 1
+                self.appended += 1
+                if segment[0] >= self.segment_bytes:
+                    self._close_writer()
+                self._evict()
+                return True
+            except OSError as e:
+                logger.error(f"❌ Spool write failed: {e}")
+                return False
+
+    def pending(self) -> int:
+        """Messages not yet drained"""
+        with self._lock:
+            return sum(count for _, count in self._segments.values())
+
+    def drain(self, send: Callable[[str, Dict[str, Any], float], bool], max_records: int) -> int:
+        """
+        Send up to max_records of the oldest messages, in order, via
+        send(event, data, spooled_at_ms). Stops at the first failed send
+        (the message stays spooled).
+
+        Returns:
+            Messages sent
+        """
+        sent = 0
+        while sent < max_records:
+            with self._lock:
+                if not self._segments:
+                    break
+                segment_id = min(self._segments)
+                if segment_id == self._writer_id:
+                    self._writer.flush()
+                offset = self._read_offset
+                with open(self._path(segment_id), 'rb') as f:
+                    f.seek(offset)
+                    data = f.read(self._segments[segment_id][0] - offset)
+
+            records = []
+            pos = 0
+            while len(records) < max_records - sent:
+                record = self._read_record(data, pos)
+                if record is None:
+                    break
+                records.append(record)
+                pos = record[1]
+
+            for body, end in records:
+                event, payload, spooled_at = decode_record(body)
+                if not send(event, payload, spooled_at):
+                    return sent
+                sent += 1
+                self.drained += 1
+                with self._lock:
+                    if min(self._segments, default=None) != segment_id:
+                        break  # Evicted while we were sending
+                    self._read_offset = offset + end
+                    self._segments[segment_id][1] -= 1
+
+            with self._lock:
+                if min(self._segments, default=None) != segment_id:
+                    self._read_offset = 0
+                    continue
+                if self._read_offset < self._segments[segment_id][0]:
+                    if records:
+                        continue
+                    if segment_id == self._writer_id:
+                        break
+                    # Unreadable record in a closed segment: skip the rest of it
+                    self.corrupt += 1
+                    logger.warning(f"⚠️ Spool: skipping corrupt segment {segment_id}")
+                # Fully sent (if it's the open segment, the next append starts a new one)
+                self._delete_segment(segment_id)
+                self._read_offset = 0
+        return sent
+
+    def close(self):
+        with self._lock:
+            self._close_writer()
+            self._save_cursor()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': self.pending(),
+            'segments': len(self._segments),
+            'bytes': sum(size for size, _ in self._segments.values()),
+            'appended': self.appended,
+            'drained': self.drained,
+            'evicted': self.evicted,
+            'corrupt': self.corrupt,
+        }
@@ -0,0 +1,138 @@
+"""
+PitBox Relay Agent - Strategy Delta Encoder
+Keyframe + delta encoding for the 1 Hz strategy_update stream
+"""
+import copy
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def diff_fields(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    Fields of new that differ from old, recursing into nested dicts.
+    Floats within tolerance of the old value count as unchanged.
+    """
+    changed = {}
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+            continue
+        prev = old[key]
+        if isinstance(value, dict) and isinstance(prev, dict):
+            sub = diff_fields(prev, value, tolerance)
+            if sub:
+                changed[key] = sub
+        elif isinstance(value, float) and isinstance(prev, (int, float)) and not isinstance(prev, bool):
+            if abs(value - prev) > tolerance:
+                changed[key] = value
+        elif value != prev:
+            changed[key] = value
+    return changed
+
+
+def merge_fields(base: Dict[str, Any], delta: Dict[str, Any]):
+    """Apply a diff_fields() delta to base in place (what the server does)"""
+    for key, value in delta.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge_fields(base[key], value)
+        else:
+            base[key] = value
+
+
+class StrategyDeltaEncoder:
+    """
+    Turns full per-car strategy dicts into keyframes and deltas.
+
+    - A keyframe (every STRATEGY_KEYFRAME_SECONDS, on request, or after a failed send)
+      carries every car in full
+    - In between, each packet carries only the cars and (nested) fields that
+      changed since the last packet, plus the car ids that left
+    - Every packet has a sequence number; a receiver that sees a gap asks for a
+      keyframe (strategy:keyframe) and ignores deltas until it arrives
+
+    The state is what was last *sent*, so commit() must only be called once the
+    packet has been handed to the transport.
+    """
+
+    # Float changes smaller than this aren't sent (temps, pressures, fuel)
+    FLOAT_TOLERANCE = 1e-3
+
+    def __init__(self, keyframe_seconds: float = config.STRATEGY_KEYFRAME_SECONDS):
+        self.keyframe_seconds = keyframe_seconds
+        self.seq = 0
+        self._sent: Dict[int, Dict[str, Any]] = {}  # carId -> last sent state
+        self._last_keyframe: Optional[float] = None
+        self._keyframe_requested = True
+        self._pending: Optional[Dict[str, Any]] = None  # Encoded, not yet committed
+
+    def request_keyframe(self):
+        """Send everything in the next packet (reconnect, server request, failed send)"""
+        self._keyframe_requested = True
+
+    def encode(self, cars: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Build the next packet body from full car dicts (each with 'carId').
+
+        Returns:
+            {'seq', 'keyframe', 'cars', 'removed'} - merge into the envelope
+        """
+        now = time.monotonic() if now is None else now
+        keyframe = (
+            self._keyframe_requested
+            or self._last_keyframe is None
+            or now - self._last_keyframe >= self.keyframe_seconds
+        )
+
+        current = {car['carId']: car for car in cars}
+        if keyframe:
+            out_cars = cars
+            removed = []
+        else:
+            out_cars = []
+            for car_id, car in current.items():
+                prev = self._sent.get(car_id)
+                changed = car if prev is None else diff_fields(prev, car, self.FLOAT_TOLERANCE)
+                if changed:
+                    out_cars.append({**changed, 'carId': car_id})
+            removed = [car_id for car_id in self._sent if car_id not in current]
+
+        self.seq += 1
+        self._pending = {
+            'keyframe': now if keyframe else None,
+            'cars': out_cars,
+            'removed': removed,
+        }
+        return {
+            'seq': self.seq,
+            'keyframe': keyframe,
+            'cars': out_cars,
+            'removed': removed,
+        }
+
+    def commit(self, sent: bool):
+        """Record the outcome of sending the last encoded packet"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        if not sent:
+            # The receiver missed this sequence number - resync with a keyframe
+            self._keyframe_requested = True
+            return
+
+        if pending['keyframe'] is not None:
+            self._sent = {}
+            self._last_keyframe = pending['keyframe']
+            self._keyframe_requested = False
+        for car in pending['cars']:
+            prev = self._sent.get(car['carId'])
+            if prev is None:
+                self._sent[car['carId']] = copy.deepcopy(car)
+            else:
+                merge_fields(prev, copy.deepcopy(car))
+        for car_id in pending['removed']:
+            self._sent.pop(car_id, None)
@@ -0,0 +1,121 @@
+"""
+PitBox Relay Agent - Stream Batcher
+Micro-batches high-rate stream samples into one packet per latency window
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_windows(spec: str) -> Dict[str, float]:
+    """Parse "stream=ms,stream=ms" (e.g. "controls=100,baseline=250") into seconds per stream"""
+    windows: Dict[str, float] = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        name, ms = item.split('=', 1)
+        try:
+            windows[name.strip()] = float(ms) / 1000
+        except ValueError:
+            logger.warning(f"Ignoring invalid batch window: {item!r}")
+    return windows
+
+
+@dataclass
+class Batch:
+    """Samples of one stream collected within a window"""
+    stream: str
+    first_seq: int
+    started: float                     # Monotonic time of the first sample
+    ts_base: float                     # Wall-clock ms of the first sample
+    offsets: List[int] = field(default_factory=list)   # ms since ts_base, per sample
+    samples: List[Any] = field(default_factory=list)
+
+    def to_packet(self) -> Dict[str, Any]:
+        """Batch body: timestamp base plus per-sample offsets"""
+        return {
+            'seq': self.first_seq,
+            'count': len(self.samples),
+            'tsBase': self.ts_base,
+            'offsets': self.offsets,
+            'samples': self.samples,
+        }
+
+
+class StreamBatcher:
+    """
+    Holds samples per stream and releases them as one batch once the oldest
+    sample has waited its stream's window (the latency bound).
+
+    add() returns batches that became due; flush_due() must also be called
+    regularly so the last batch goes out when samples stop arriving.
+    Streams without a window are not batched. Thread-safe: clear() runs on
+    the connection's disconnect handler while the sender thread adds samples.
+    """
+
+    def __init__(self, windows: Dict[str, float]):
+        """
+        Args:
+            windows: Max seconds a sample may wait, per stream
+        """
+        self.windows = windows
+        self._pending: Dict[str, Batch] = {}
+        self._lock = threading.Lock()
+
+    def batches(self, stream: str) -> bool:
+        """Is this stream batched?"""
+        return stream in self.windows
+
+    def add(self, stream: str, seq: int, sample: Any, now: Optional[float] = None) -> List[Batch]:
+        """
+        Queue one sample (seq = its stream sequence number).
+
+        Returns:
+            Batches now due (this stream's, if its window has elapsed)
+        """
+        now = time.monotonic() if now is None else now
+        ts = time.time() * 1000
+
+        with self._lock:
+            batch = self._pending.get(stream)
+            if batch is not None and seq != batch.first_seq + len(batch.samples):
+                # Sequence jumped (reset or a dropped sample) - keep batches contiguous
+                due = [self._pending.pop(stream)]
+                batch = None
+            else:
+                due = []
+            if batch is None:
+                batch = self._pending[stream] = Batch(stream, seq, now, ts)
+            batch.offsets.append(int(round(ts - batch.ts_base)))
+            batch.samples.append(sample)
+
+            return due + self._take_due(now)
+
+    def flush_due(self, now: Optional[float] = None) -> List[Batch]:
+        """Batches whose oldest sample has waited its window"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._take_due(now)
+
+    def _take_due(self, now: float) -> List[Batch]:
+        due = [
+            stream for stream, batch in self._pending.items()
+            if now - batch.started >= self.windows[stream]
+        ]
+        return [self._pending.pop(stream) for stream in due]
+
+    def flush_all(self) -> List[Batch]:
+        """Every pending batch (e.g. before disconnecting)"""
+        with self._lock:
+            batches = list(self._pending.values())
+            self._pending.clear()
+        return batches
+
+    def clear(self):
+        """Drop pending samples (connection lost)"""
+        with self._lock:
+            self._pending.clear()
@@ -0,0 +1,104 @@
+"""
+PitBox Relay Agent - Telemetry Ring Buffer
+Fixed-size history of high-rate (60 Hz) channels filled by the capture thread
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from frame_snapshot import SCALAR_INDEX
+
+
+# Channels captured on every sim tick by default (SCALAR_VARS names)
+CAPTURE_CHANNELS = (
+    'SessionTime', 'Lap', 'LapDistPct',
+    'Speed', 'RPM', 'Gear',
+    'Throttle', 'Brake', 'Clutch', 'SteeringWheelAngle',
+)
+
+
+class TelemetryRing:
+    """
+    Preallocated ring buffer of per-tick channel samples.
+
+    One writer (the capture thread) appends rows in place, so memory is fixed
+    and nothing is allocated per tick. Readers get copies of windowed or
+    decimated slices, taken under a short lock.
+    """
+
+    def __init__(self, channels: Iterable[str] = CAPTURE_CHANNELS, capacity: int = 60 * 120):
+        """
+        Args:
+            channels: SCALAR_VARS names to record
+            capacity: Number of ticks kept (e.g. 60 * seconds)
+        """
+        self.channels: Tuple[str, ...] = tuple(channels)
+        self.capacity = capacity
+        self.column: Dict[str, int] = {name: i for i, name in enumerate(self.channels)}
+
+        self._scalar_index = np.array([SCALAR_INDEX[name] for name in self.channels], dtype=np.intp)
+        self._data = np.zeros((capacity, len(self.channels)))
+        self._ticks = np.zeros(capacity, dtype=np.int64)
+        self._timestamps = np.zeros(capacity)
+
+        self.count = 0  # Total rows ever written (the next row's sequence number)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, tick: int, timestamp: float, scalars: np.ndarray):
+        """Record one tick from a FrameSnapshot.scalars vector"""
+        row = self.count % self.capacity
+        with self._lock:
+            np.take(scalars, self._scalar_index, out=self._data[row])
+            self._ticks[row] = tick
+            self._timestamps[row] = timestamp
+            self.count += 1
+
+    def clear(self):
+        with self._lock:
+            self.count = 0
+
+    # =========================================================================
+    # Readers (all return copies)
+    # =========================================================================
+
+    def latest(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Last n rows, oldest first.
+        Returns (ticks, timestamps, data) where data is (rows x channels).
+        """
+        with self._lock:
+            available = min(self.count, self.capacity)
+            n = available if n is None else max(0, min(n, available))
+            rows = self._rows(self.count - n, self.count)
+            return self._ticks[rows], self._timestamps[rows], self._data[rows]
+
+    def since(self, seq: int) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Rows written since sequence number `seq`, for incremental consumers.
+        Returns (next_seq, ticks, timestamps, data); rows already overwritten are lost.
+        """
+        with self._lock:
+            start = max(seq, self.count - self.capacity, 0)
+            rows = self._rows(start, self.count)
+            return self.count, self._ticks[rows], self._timestamps[rows], self._data[rows]
+
+    def window(self, seconds: float, rate_hz: float = 60.0) -> np.ndarray:
+        """(rows x channels) covering the last `seconds` of capture"""
+        return self.latest(int(round(seconds * rate_hz)))[2]
+
+    def decimated(self, step: int, n: Optional[int] = None) -> np.ndarray:
+        """Every `step`-th row of the last n rows, aligned so the newest row is kept"""
+        data = self.latest(n)[2]
+        return data[(len(data) - 1) % step::step] if len(data) else data
+
+    def channel(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """Last n samples of one channel"""
+        return self.latest(n)[2][:, self.column[name]]
+
+    def _rows(self, start: int, stop: int) -> np.ndarray:
+        """Buffer row indices for sequence numbers [start, stop)"""
+        return np.arange(start, stop) % self.capacity
@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import time
+from unittest import mock
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from async_client import AsyncPitBoxClient, AsyncTarget, QueuedPacket
+
+
+class FakeSio:
+    """Connected AsyncClient stand-in that records what is emitted"""
+
+    connected = True
+
+    def __init__(self):
+        self.emitted = []
+
+    async def emit(self, event, data):
+        self.emitted.append(event)
+
+
+class TestAsyncTargetDrops(unittest.TestCase):
+
+    def test_only_telemetry_goes_stale(self):
+        dropped = []
+        target = AsyncTarget('http://localhost:1', 0, on_drop=lambda t, p: dropped.append(p.event))
+        target.sio = FakeSio()
+        old = time.monotonic() - AsyncTarget.MAX_AGE - 1
+
+        async def run():
+            target.enqueue(QueuedPacket('telemetry:baseline', {}, 'telemetry:baseline', {}, True, old))
+            target.enqueue(QueuedPacket('incident', {}, 'incident', {}, False, old))
+            task = asyncio.create_task(target.run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(target.sio.emitted, ['incident'])
+        self.assertEqual(dropped, ['telemetry:baseline'])
+
+
+class TestAsyncClientDrops(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patches = {'SPOOL_ENABLED': True, 'SPOOL_DIR': self.tmp.name, 'RELAY_BACKENDS': ''}
+        with mock.patch.multiple(config, **patches):
+            self.client = AsyncPitBoxClient('http://localhost:1')
+        self.client.session_id = 's1'
+
+    def tearDown(self):
+        self.client.spool.close()
+        self.tmp.cleanup()
+
+    def test_events_spooled_while_reconnecting(self):
+        # Target not connected: the event goes to the spool instead of being lost
+        self.client._enqueue('incident', {'sessionId': 's1', 'carIdx': 3})
+        self.client._enqueue('telemetry:baseline', {'sessionId': 's1'})
+        self.assertEqual(self.client.spool.pending(), 1)
+        self.assertEqual(self.client.targets[0].dropped, 2)
+
+    def test_dropped_deltas_request_keyframes(self):
+        self.client.strategy.encode([])
+        self.client.strategy.commit(True)
+        self.assertFalse(self.client.strategy._keyframe_requested)
+        self.client._enqueue('strategy_update', {'seq': 1, 'keyframe': True})
+        self.assertTrue(self.client.strategy._keyframe_requested)
+
+        self.client.controls_delta.encode(1, 0, {})
+        self.client.controls_delta.commit(True)
+        self.assertFalse(self.client.controls_delta._keyframe_requested)
+        self.client._enqueue('telemetry:controls:delta', {'payload': b'\x01'})
+        self.assertTrue(self.client.controls_delta._keyframe_requested)
+
+
+if __name__ == '__main__':
+    unittest.main()
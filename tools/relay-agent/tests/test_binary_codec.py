@@ -0,0 +1,249 @@
+import unittest
+import sys
+import os
+import struct
+
+import numpy as np
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import binary_codec
+from binary_codec import (
+    BASELINE,
+    CODEC_VERSION,
+    CONTROLS,
+    GRID_CAR_DTYPE,
+    GRID_HEADER,
+    HEADER,
+    CodecError,
+    decode_packet,
+    decode_packets,
+    encode_packet,
+    pack_grid,
+    unpack_grid,
+)
+
+BASELINE_PAYLOAD = {
+    'speed': 61.25,
+    'gear': 4,
+    'rpm': 7250.5,
+    'lap': 12,
+    'lapDistPct': 0.375,
+    'position': 3,
+    'fuelLevel': 41.5,
+    'fuelPct': 0.5,
+    'sessionFlags': 0x10000004,
+    'gapAhead': 1.25,
+    'gapBehind': None,
+}
+
+CONTROLS_PAYLOAD = {
+    'throttle': 0.75,
+    'brake': 0.0,
+    'clutch': 1.0,
+    'steering': -0.125,
+    'rpm': 6500.0,
+    'speed': 55.5,
+    'gear': -1,
+}
+
+
+class TestBinaryCodecRoundTrip(unittest.TestCase):
+
+    def test_baseline_round_trip(self):
+        """Baseline payload survives encode/decode (values exact in float32)"""
+        data = encode_packet('baseline', 42, 1700000000123, BASELINE_PAYLOAD)
+        packet = decode_packet(data)
+
+        self.assertEqual(packet.version, CODEC_VERSION)
+        self.assertEqual(packet.stream, 'baseline')
+        self.assertEqual(packet.seq, 42)
+        self.assertEqual(packet.ts, 1700000000123)
+        self.assertEqual(packet.schema_hash, BASELINE.schema_hash)
+        self.assertEqual(packet.payload, BASELINE_PAYLOAD)
+
+    def test_controls_round_trip(self):
+        """Controls payload survives encode/decode, including reverse gear"""
+        data = encode_packet('controls', 7, 1700000000000, CONTROLS_PAYLOAD)
+        packet = decode_packet(data)
+
+        self.assertEqual(packet.stream, 'controls')
+        self.assertEqual(packet.seq, 7)
+        self.assertEqual(packet.payload, CONTROLS_PAYLOAD)
+
+    def test_float_precision(self):
+        """Floats go over the wire as float32"""
+        payload = dict(CONTROLS_PAYLOAD, steering=0.1)
+        packet = decode_packet(encode_packet('controls', 1, 0, payload))
+        self.assertAlmostEqual(packet.payload['steering'], 0.1, places=6)
+
+    def test_missing_fields(self):
+        """Missing fields decode as 0, missing optional fields as None"""
+        packet = decode_packet(encode_packet('baseline', 1, 0, {'speed': 10.0}))
+        self.assertEqual(packet.payload['speed'], 10.0)
+        self.assertEqual(packet.payload['gear'], 0)
+        self.assertIsNone(packet.payload['gapAhead'])
+        self.assertIsNone(packet.payload['gapBehind'])
+
+    def test_extra_fields_ignored(self):
+        """Fields outside the layout (e.g. the full car_data dict) are not sent"""
+        payload = dict(CONTROLS_PAYLOAD, fuelLevel=20.0, position=5)
+        packet = decode_packet(encode_packet('controls', 1, 0, payload))
+        self.assertNotIn('fuelLevel', packet.payload)
+
+    def test_concatenated_packets(self):
+        """Batched packets decode back in order"""
+        data = b''.join([
+            encode_packet('controls', 1, 100, CONTROLS_PAYLOAD),
+            encode_packet('baseline', 5, 150, BASELINE_PAYLOAD),
+            encode_packet('controls', 2, 166, CONTROLS_PAYLOAD),
+        ])
+        packets = decode_packets(data)
+        self.assertEqual([(p.stream, p.seq, p.ts) for p in packets],
+                         [('controls', 1, 100), ('baseline', 5, 150), ('controls', 2, 166)])
+        self.assertEqual(packets[1].payload, BASELINE_PAYLOAD)
+        with self.assertRaises(CodecError):
+            decode_packets(data[:-1])
+
+    def test_seq_wraps(self):
+        """Sequence numbers wrap at 32 bits"""
+        packet = decode_packet(encode_packet('controls', 2 ** 32 + 5, 0, CONTROLS_PAYLOAD))
+        self.assertEqual(packet.seq, 5)
+
+
+class TestBinaryCodecLayout(unittest.TestCase):
+
+    def test_packet_sizes(self):
+        """Packets are fixed-size: header + payload struct"""
+        self.assertEqual(len(encode_packet('baseline', 1, 0, BASELINE_PAYLOAD)), BASELINE.size)
+        self.assertEqual(len(encode_packet('controls', 1, 0, CONTROLS_PAYLOAD)), CONTROLS.size)
+        self.assertEqual(CONTROLS.size, HEADER.size + 25)
+
+    def test_header_layout(self):
+        """Header is <version u8, stream id u8, schema hash u32, seq u32, ts u64>"""
+        data = encode_packet('controls', 9, 123456, CONTROLS_PAYLOAD)
+        self.assertEqual(
+            struct.unpack_from('<BBIIQ', data),
+            (CODEC_VERSION, CONTROLS.stream_id, CONTROLS.schema_hash, 9, 123456)
+        )
+
+    def test_schema_hashes_distinct(self):
+        self.assertNotEqual(BASELINE.schema_hash, CONTROLS.schema_hash)
+
+    def test_schema_hash_tracks_layout(self):
+        """Any layout change (field order, type, name) changes the hash"""
+        fields = CONTROLS.fields
+        reordered = binary_codec.StreamLayout(CONTROLS.stream_id, 'controls', fields[1:] + fields[:1])
+        retyped = binary_codec.StreamLayout(CONTROLS.stream_id, 'controls', fields[:-1] + (('gear', 'B'),))
+        renamed = binary_codec.StreamLayout(CONTROLS.stream_id, 'controls', fields[:-1] + (('gearIdx', 'b'),))
+        same = binary_codec.StreamLayout(CONTROLS.stream_id, 'controls', fields)
+
+        self.assertEqual(same.schema_hash, CONTROLS.schema_hash)
+        for layout in (reordered, retyped, renamed):
+            self.assertNotEqual(layout.schema_hash, CONTROLS.schema_hash)
+
+    def test_schema_description(self):
+        """schema() describes every stream well enough to decode it"""
+        schema = binary_codec.schema()
+        self.assertEqual(schema['version'], CODEC_VERSION)
+        controls = schema['streams']['controls']
+        self.assertEqual(controls['id'], CONTROLS.stream_id)
+        self.assertEqual(controls['hash'], CONTROLS.schema_hash)
+        self.assertEqual(controls['size'], CONTROLS.size)
+
+        # Decode with nothing but the schema description
+        data = encode_packet('controls', 3, 0, CONTROLS_PAYLOAD)
+        header = struct.Struct(schema['header']['format'])
+        values = struct.unpack_from(controls['format'], data, header.size)
+        self.assertEqual(dict(zip(controls['fields'], values)), CONTROLS_PAYLOAD)
+
+
+class TestBinaryCodecErrors(unittest.TestCase):
+
+    def setUp(self):
+        self.data = encode_packet('controls', 1, 0, CONTROLS_PAYLOAD)
+
+    def test_unknown_stream(self):
+        with self.assertRaises(CodecError):
+            encode_packet('video', 1, 0, {})
+
+    def test_value_out_of_range(self):
+        with self.assertRaises(CodecError):
+            encode_packet('controls', 1, 0, dict(CONTROLS_PAYLOAD, gear=300))
+
+    def test_truncated(self):
+        with self.assertRaises(CodecError):
+            decode_packet(self.data[:HEADER.size - 1])
+        with self.assertRaises(CodecError):
+            decode_packet(self.data[:-1])
+
+    def test_wrong_version(self):
+        with self.assertRaises(CodecError):
+            decode_packet(bytes([CODEC_VERSION + 1]) + self.data[1:])
+
+    def test_unknown_stream_id(self):
+        with self.assertRaises(CodecError):
+            decode_packet(self.data[:1] + bytes([99]) + self.data[2:])
+
+    def test_schema_mismatch(self):
+        data = bytearray(self.data)
+        struct.pack_into('<I', data, 2, CONTROLS.schema_hash ^ 1)
+        with self.assertRaises(CodecError):
+            decode_packet(bytes(data))
+
+
+
+class TestGridCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = {
+            'car_ids': np.array([0, 3, 17, 63]),
+            'lap_dist_pct': np.array([0.125, 0.5, 0.75, 0.0], dtype=np.float32),
+            'speed': np.array([61.25, 0.0, 55.5, 12.0]),
+            'lap': np.array([12, 11, 12, 0], dtype=np.int32),
+            'position': np.array([1, 4, 2, 3], dtype=np.int32),
+        }
+
+    def test_matches_struct_layout(self):
+        """Same bytes as the per-car struct '<dB' + '<HffHBx' packing"""
+        g = self.grid
+        expected = struct.pack('<dB', 1700000000123.0, 4) + b''.join(
+            struct.pack('<HffHBx', *values)
+            for values in zip(g['car_ids'], g['lap_dist_pct'], g['speed'], g['lap'], g['position'])
+        )
+        self.assertEqual(GRID_CAR_DTYPE.itemsize, struct.calcsize('<HffHBx'))
+        self.assertEqual(pack_grid(1700000000123.0, **g), expected)
+
+    def test_round_trip(self):
+        ts, cars = unpack_grid(pack_grid(1234.0, **self.grid))
+        self.assertEqual(ts, 1234.0)
+        self.assertEqual(cars['carId'].tolist(), [0, 3, 17, 63])
+        self.assertEqual(cars['lapDistPct'].tolist(), [0.125, 0.5, 0.75, 0.0])
+        self.assertEqual(cars['speed'].tolist(), [61.25, 0.0, 55.5, 12.0])
+        self.assertEqual(cars['lap'].tolist(), [12, 11, 12, 0])
+        self.assertEqual(cars['position'].tolist(), [1, 4, 2, 3])
+        self.assertEqual(cars['flags'].tolist(), [0, 0, 0, 0])
+
+    def test_empty_grid(self):
+        data = pack_grid(0.0, [], [], [], [], [])
+        self.assertEqual(len(data), GRID_HEADER.size)
+        self.assertEqual(len(unpack_grid(data)[1]), 0)
+
+    def test_out_of_range_clipped(self):
+        """Laps before the first (-1) go out as 0 rather than wrapping"""
+        grid = dict(self.grid, lap=np.array([-1, 70000, 3, 4]), position=np.array([1, 300, 2, -1]))
+        _, cars = unpack_grid(pack_grid(0.0, **grid))
+        self.assertEqual(cars['lap'].tolist(), [0, 0xFFFF, 3, 4])
+        self.assertEqual(cars['position'].tolist(), [1, 0xFF, 2, 0])
+
+    def test_bad_length(self):
+        data = pack_grid(0.0, **self.grid)
+        with self.assertRaises(CodecError):
+            unpack_grid(data[:-1])
+        with self.assertRaises(CodecError):
+            unpack_grid(data[:GRID_HEADER.size - 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from binary_codec import CodecError
+from controls_delta import (
+    CHANNELS,
+    ControlsDeltaDecoder,
+    ControlsDeltaEncoder,
+    parse_steps,
+    read_varint,
+    unzigzag,
+    write_varint,
+    zigzag,
+)
+
+from pitbox_client import PitBoxClient
+
+STEPS = dict(CHANNELS)
+
+
+def sample(i):
+    """Slowly changing inputs, like a real trace"""
+    return {
+        'throttle': min(1.0, 0.5 + i * 0.01),
+        'brake': 0.0,
+        'clutch': 1.0,
+        'steering': -0.25 + i * 0.002,
+        'rpm': 6000 + i * 12.5,
+        'speed': 50.0 + i * 0.1,
+        'gear': 3 if i < 10 else 4,
+    }
+
+
+class TestVarints(unittest.TestCase):
+
+    def test_zigzag(self):
+        self.assertEqual([zigzag(n) for n in (0, -1, 1, -2, 2)], [0, 1, 2, 3, 4])
+        for n in (0, 1, -1, 63, -64, 1000, -1000, 2 ** 40, -(2 ** 40)):
+            self.assertEqual(unzigzag(zigzag(n)), n)
+
+    def test_varint_round_trip(self):
+        for n in (0, 1, 127, 128, 300, 2 ** 32, 2 ** 63):
+            out = bytearray()
+            write_varint(out, n)
+            self.assertEqual(read_varint(bytes(out), 0), (n, len(out)))
+        out = bytearray()
+        write_varint(out, 127)
+        self.assertEqual(len(out), 1)
+
+    def test_truncated_varint(self):
+        with self.assertRaises(CodecError):
+            read_varint(b'\x80', 0)
+
+
+class TestControlsDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = ControlsDeltaEncoder(STEPS, keyframe_every=5)
+        self.decoder = ControlsDeltaDecoder(STEPS)
+
+    def send(self, seq, ts, values, sent=True):
+        data = self.encoder.encode(seq, ts, values)
+        self.encoder.commit(sent)
+        return data
+
+    def assertQuantised(self, decoded, values):
+        for name, step in STEPS.items():
+            self.assertAlmostEqual(decoded[name], values[name], delta=step / 2 + 1e-9)
+
+    def test_round_trip(self):
+        """Keyframe then deltas reconstruct every sample within half a step"""
+        for i in range(12):
+            [decoded] = self.decoder.decode(self.send(i + 1, 1000 + i * 17, sample(i)))
+            self.assertEqual(decoded.seq, i + 1)
+            self.assertEqual(decoded.ts, 1000 + i * 17)
+            self.assertQuantised(decoded.values, sample(i))
+
+    def test_deltas_are_small(self):
+        keyframe = self.send(1, 1000, sample(0))
+        delta = self.send(2, 1017, sample(1))
+        self.assertEqual(keyframe[0], 1)
+        self.assertEqual(delta[0], 0)
+        self.assertLessEqual(len(delta), 12)
+        # Unchanged sample: flags, seq, dt, one byte per channel
+        self.assertEqual(len(self.send(3, 1034, sample(1))), 3 + len(CHANNELS))
+
+    def test_no_drift(self):
+        """Deltas are against quantised values, so rounding never accumulates"""
+        for i in range(200):
+            values = dict(sample(0), throttle=(i * 0.00037) % 1.0)
+            [decoded] = self.decoder.decode(self.send(i + 1, i, values))
+        self.assertAlmostEqual(decoded.values['throttle'], values['throttle'], delta=0.0005 + 1e-9)
+
+    def test_keyframe_every_n(self):
+        flags = [self.send(i + 1, i, sample(i))[0] for i in range(11)]
+        self.assertEqual(flags, [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+
+    def test_keyframe_after_gap(self):
+        self.send(1, 0, sample(0))
+        self.send(2, 1, sample(1))
+        self.assertEqual(self.send(4, 2, sample(2))[0], 1)   # Skipped seq
+        self.send(5, 3, sample(3), sent=False)               # Failed send
+        self.assertEqual(self.send(6, 4, sample(4))[0], 1)
+
+    def test_keyframe_on_request(self):
+        self.send(1, 0, sample(0))
+        self.encoder.request_keyframe()
+        self.assertEqual(self.send(2, 1, sample(1))[0], 1)
+
+    def test_decoder_rejects_delta_without_base(self):
+        self.send(1, 0, sample(0))
+        delta = self.send(2, 1, sample(1))
+        with self.assertRaises(CodecError):
+            ControlsDeltaDecoder(STEPS).decode(delta)
+
+    def test_decoder_detects_lost_delta(self):
+        self.decoder.decode(self.send(1, 0, sample(0)))
+        self.send(2, 1, sample(1))  # Lost
+        with self.assertRaises(CodecError):
+            self.decoder.decode(self.send(3, 2, sample(2)))
+
+    def test_concatenated(self):
+        """Batches are concatenated packets"""
+        data = b''.join(self.send(i + 1, i * 10, sample(i)) for i in range(8))
+        decoded = self.decoder.decode(data)
+        self.assertEqual([s.seq for s in decoded], list(range(1, 9)))
+        self.assertEqual([s.keyframe for s in decoded], [True] + [False] * 4 + [True] + [False] * 2)
+        self.assertQuantised(decoded[-1].values, sample(7))
+
+    def test_parse_steps(self):
+        steps = parse_steps('throttle=0.01, steering=0.0005,bogus=1,rpm=-1,speed=x')
+        self.assertEqual(steps['throttle'], 0.01)
+        self.assertEqual(steps['steering'], 0.0005)
+        self.assertEqual(steps['rpm'], STEPS['rpm'])
+        self.assertEqual(steps['speed'], STEPS['speed'])
+        self.assertNotIn('bogus', steps)
+
+
+class TestClientControlsBatching(unittest.TestCase):
+
+    def setUp(self):
+        patches = {'CONTROLS_DELTA': True, 'BATCH_WINDOWS_MS': 'controls=1000', 'SPOOL_ENABLED': False}
+        self.patch = mock.patch.multiple(config, **patches)
+        self.patch.start()
+        self.client = PitBoxClient('http://localhost:1')
+        self.client.session_id = 's1'
+        self.client.connected = True
+        self.client.sio.connected = True
+        self.client.controls_requested = True
+        self.sent = []
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_failed_batch_requests_keyframe(self):
+        self.client._send = lambda event, data: self.sent.append(event) or False
+        for i in range(3):
+            self.assertTrue(self.client.send_controls_stream(sample(i)))
+        # Batched samples are committed before the batch goes out
+        self.assertFalse(self.client.controls_delta._keyframe_requested)
+
+        self.assertFalse(self.client._emit_batches(self.client.batcher.flush_all()))
+        self.assertEqual(self.sent, ['telemetry:controls:delta:batch'])
+        self.assertTrue(self.client.controls_delta._keyframe_requested)
+
+    def test_sent_batch_keeps_deltas(self):
+        self.client._send = lambda event, data: self.sent.append(event) or True
+        for i in range(3):
+            self.client.send_controls_stream(sample(i))
+        self.assertTrue(self.client._emit_batches(self.client.batcher.flush_all()))
+        self.assertFalse(self.client.controls_delta._keyframe_requested)
+
+    def test_disconnect_mid_window_requests_keyframe(self):
+        self.client.send_controls_stream(sample(0))
+        self.assertFalse(self.client.controls_delta._keyframe_requested)
+        self.client.sio.handlers['/']['disconnect']()
+        self.assertEqual(self.client.batcher.flush_all(), [])
+        self.assertTrue(self.client.controls_delta._keyframe_requested)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from event_engine import EventEngine
+from frame_snapshot import MAX_CARS, SCALAR_INDEX, FrameSnapshot
+from incident_detector import TRACK_OFF_TRACK, TRACK_ON_TRACK
+
+# Exact in binary, so hold times land on frame boundaries (frames after the change):
+# overlap enter 1, exit 4; position hold 8; off-track 2, rejoin 8
+DT = 0.125
+
+# irsdk_CarLeftRight
+CLEAR, LEFT, RIGHT, BOTH, TWO_LEFT = 1, 2, 3, 4, 5
+
+
+def frame(now, left_right=CLEAR, positions=(1, 2, 3), off=(), player=0):
+    snapshot = FrameSnapshot.empty()
+    scalars = snapshot.scalars
+    scalars[SCALAR_INDEX['SessionTime']] = now
+    scalars[SCALAR_INDEX['CarLeftRight']] = left_right
+    scalars[SCALAR_INDEX['PlayerCarIdx']] = player
+    scalars[SCALAR_INDEX['Lap']] = 4
+    scalars[SCALAR_INDEX['LapDistPct']] = 0.25
+    snapshot.cars['CarIdxPosition'][:len(positions)] = positions
+    snapshot.cars['CarIdxClassPosition'][:len(positions)] = positions
+    snapshot.cars['CarIdxTrackSurface'][:len(positions)] = TRACK_ON_TRACK
+    snapshot.cars['CarIdxTrackSurface'][list(off)] = TRACK_OFF_TRACK
+    snapshot.cars['CarIdxLap'][:] = 4
+    snapshot.cars['CarIdxLapDistPct'][:len(positions)] = [0.3, 0.2, 0.1][:len(positions)]
+    return snapshot
+
+
+class TestEventEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = EventEngine()
+        self.now = 0.0
+        self.events = []
+
+    def run_frames(self, count=1, flag='green', active=None, **kwargs):
+        """Feed count identical frames; returns [(frame index, event type, event)]"""
+        found = []
+        for _ in range(count):
+            for event in self.engine.update(frame(self.now, **kwargs), flag, active):
+                found.append((len(self.events), event['type'], event))
+            self.events.append(self.now)
+            self.now += DT
+        return found
+
+    def types(self, found):
+        return [event_type for _, event_type, _ in found]
+
+    # Overlap ==============================================================
+
+    def test_overlap_enter_and_exit(self):
+        self.run_frames(2)
+        found = self.run_frames(3, left_right=LEFT)
+        # Reported once it has held for a frame
+        self.assertEqual([(i, t) for i, t, _ in found], [(3, 'overlap:enter')])
+        event = found[0][2]
+        self.assertEqual((event['side'], event['car_idx'], event['lap'], event['track_position']), ('left', 0, 4, 0.25))
+
+        found = self.run_frames(5)
+        self.assertEqual([(i, t) for i, t, _ in found], [(9, 'overlap:exit')])  # Clear for 0.5 s
+        self.assertEqual(found[0][2]['side'], 'left')
+
+    def test_overlap_flicker_is_ignored(self):
+        self.run_frames()
+        found = []
+        for _ in range(5):
+            found += self.run_frames(left_right=RIGHT)
+            found += self.run_frames()
+        self.assertEqual(found, [])
+
+    def test_brief_clear_keeps_overlap(self):
+        self.run_frames()
+        self.assertEqual(self.types(self.run_frames(2, left_right=LEFT)), ['overlap:enter'])
+        self.assertEqual(self.run_frames(3), [])
+        # Side follows the spotter without a new enter
+        self.assertEqual(self.run_frames(2, left_right=RIGHT), [])
+        found = self.run_frames(5)
+        self.assertEqual(self.types(found), ['overlap:exit'])
+        self.assertEqual(found[0][2]['side'], 'right')
+
+    def test_three_wide_once_per_overlap(self):
+        self.run_frames()
+        found = self.run_frames(2, left_right=LEFT) + self.run_frames(4, left_right=BOTH)
+        self.assertEqual(self.types(found), ['overlap:enter', 'three_wide'])
+        self.assertEqual(found[1][2]['side'], 'both')
+        # Dropping back to two-wide and three-wide again: not repeated
+        self.assertEqual(self.run_frames(2, left_right=LEFT) + self.run_frames(2, left_right=TWO_LEFT), [])
+
+        # A new overlap can be three-wide again
+        self.assertEqual(self.types(self.run_frames(5)), ['overlap:exit'])
+        found = self.run_frames(3, left_right=TWO_LEFT)
+        self.assertEqual(self.types(found), ['overlap:enter', 'three_wide'])
+
+    # Positions ============================================================
+
+    def test_position_change_after_hold(self):
+        self.run_frames(positions=(1, 2, 3))
+        found = self.run_frames(10, positions=(2, 1, 3))
+        # Held for 1 s (8 frames) before it's reported
+        self.assertEqual([(i, t) for i, t, _ in found], [(9, 'position:change'), (9, 'position:change')])
+        changes = {event['car_idx']: event for _, _, event in found}
+        self.assertEqual((changes[0]['previous_position'], changes[0]['position']), (1, 2))
+        self.assertEqual((changes[1]['previous_position'], changes[1]['position']), (2, 1))
+        self.assertEqual(changes[1]['class_position'], 1)
+
+    def test_position_swap_back_is_debounced(self):
+        self.run_frames(positions=(1, 2, 3))
+        found = self.run_frames(5, positions=(2, 1, 3)) + self.run_frames(10, positions=(1, 2, 3))
+        self.assertEqual(found, [])
+
+    def test_candidate_restarts_the_hold(self):
+        self.run_frames(positions=(1, 2, 3))
+        self.run_frames(5, positions=(1, 3, 2))
+        found = self.run_frames(9, positions=(2, 3, 1))
+        # Car 1 settled on P3 after its first change; cars 0 and 2 waited from their second
+        self.assertEqual([(i, event['car_idx']) for i, _, event in found], [(9, 1), (14, 0), (14, 2)])
+
+    def test_unclassified_and_inactive_cars_are_silent(self):
+        active = np.ones(MAX_CARS, dtype=bool)
+        active[2] = False
+        self.run_frames(positions=(1, 2, 0), active=active)
+        # Car 2 gains a classification; car 1 drops behind it but isn't reported (inactive)
+        found = self.run_frames(10, positions=(1, 3, 2), active=active)
+        self.assertEqual([event['car_idx'] for _, _, event in found], [1])
+
+        self.run_frames(10, positions=(1, 2, 3), active=active)
+        self.assertEqual(self.engine._position[2], 3)  # Still tracked while not reported
+
+    # Off-track ============================================================
+
+    def test_offtrack_after_hold(self):
+        self.run_frames()
+        found = self.run_frames(4, off=[1])
+        self.assertEqual([(i, t) for i, t, _ in found], [(3, 'offtrack')])
+        event = found[0][2]
+        self.assertEqual((event['car_idx'], event['lap']), (1, 4))
+        self.assertAlmostEqual(event['track_position'], 0.2, places=5)
+
+    def test_kerb_hop_is_ignored(self):
+        self.run_frames()
+        found = []
+        for _ in range(5):
+            found += self.run_frames(off=[2]) + self.run_frames()
+        self.assertEqual(found, [])
+
+    def test_rejoin_rearms(self):
+        self.run_frames()
+        self.assertEqual(self.types(self.run_frames(3, off=[0])), ['offtrack'])
+        # Back on briefly: the next excursion is the same off-track
+        self.run_frames(4)
+        self.assertEqual(self.run_frames(3, off=[0]), [])
+        # Back on for REJOIN_TIME: re-armed
+        self.run_frames(9)
+        self.assertEqual(self.types(self.run_frames(3, off=[0])), ['offtrack'])
+
+    def test_already_off_at_start(self):
+        self.assertEqual(self.run_frames(5, off=[1]), [])
+
+    # Flags and resets =====================================================
+
+    def test_flag_change(self):
+        self.assertEqual(self.run_frames(flag='green'), [])
+        found = self.run_frames(flag='yellow')
+        self.assertEqual(self.types(found), ['flag:change'])
+        self.assertEqual((found[0][2]['previous'], found[0][2]['flag'], found[0][2]['car_idx']), ('green', 'yellow', None))
+        self.assertEqual(self.run_frames(flag='yellow'), [])
+
+    def test_session_time_going_back_resets(self):
+        self.run_frames(positions=(1, 2, 3), flag='green')
+        self.run_frames(4, positions=(2, 1, 3), off=[2], flag='green')
+        self.now = 0.0
+        # New session: current state is the baseline, nothing is reported
+        self.assertEqual(self.run_frames(10, positions=(2, 1, 3), off=[2], flag='yellow'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
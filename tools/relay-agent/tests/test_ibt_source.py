@@ -0,0 +1,200 @@
+import unittest
+import sys
+import os
+import struct
+import tempfile
+from unittest import mock
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ibt_source import DISK_HEADER, DISK_HEADER_OFFSET, HEADER, VAR_BUF, VAR_BUF_OFFSET, VAR_HEADER, IbtFileSource
+from iracing_reader import IRacingReader
+
+TICK_RATE = 60
+
+# (name, irsdk var type, count, unit): one double, one per-car float array
+VARS = [
+    ('SessionTime', 5, 1, 's'),
+    ('CarIdxLapDistPct', 4, 64, '%'),
+]
+
+SESSION_YAML = """---
+WeekendInfo:
+ TrackDisplayName: Test Raceway
+ TrackConfigName: Full
+ TrackLength: 4.00 km
+ TrackAirTemp: 21.0 C
+ TrackSurfaceTemp: 33.0 C
+ SubSessionID: 12345
+
+SessionInfo:
+ Sessions:
+ - SessionNum: 0
+   SessionType: Race
+   SessionName: RACE
+
+DriverInfo:
+ DriverCarIdx: 0
+ Drivers:
+ - CarIdx: 0
+   UserName: Smith: Jr
+   CarNumber: "7"
+   CarClassID: 1
+ - CarIdx: 1
+   UserName: Jones
+   CarNumber: "8"
+   CarClassID: 2
+...
+"""
+
+
+def write_ibt(path, records, record_count=None):
+    """Minimal .ibt: header, disk sub-header, var headers, session YAML, records"""
+    var_headers = b''
+    offset = 0
+    for name, var_type, count, unit in VARS:
+        var_headers += VAR_HEADER.pack(var_type, offset, count, False, name.encode(), b'', unit.encode())
+        offset += count * (8 if var_type == 5 else 4)
+    buf_len = offset
+
+    var_header_offset = DISK_HEADER_OFFSET + DISK_HEADER.size
+    session_info = SESSION_YAML.encode()
+    session_info_offset = var_header_offset + len(var_headers)
+    records_offset = session_info_offset + len(session_info)
+
+    data = bytearray(records_offset)
+    HEADER.pack_into(data, 0, 2, 1, TICK_RATE, 1, len(session_info), session_info_offset,
+                     len(VARS), var_header_offset, 1, buf_len)
+    VAR_BUF.pack_into(data, VAR_BUF_OFFSET, 0, records_offset)
+    count = len(records) if record_count is None else record_count
+    DISK_HEADER.pack_into(data, DISK_HEADER_OFFSET, 0, 0.0, count / TICK_RATE, 1, count)
+    data[var_header_offset:session_info_offset] = var_headers
+    data[session_info_offset:records_offset] = session_info
+    for session_time, pct in records:
+        data += struct.pack('<d64f', session_time, *(pct + [-1.0] * (64 - len(pct))))
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def trace(n):
+    """n records at the tick rate, two cars moving around the lap"""
+    return [(k / TICK_RATE, [0.5 + k * 0.001, 0.4 + k * 0.001]) for k in range(n)]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestIbtFileSource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'session.ibt')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open(self, records, **kwargs):
+        write_ibt(self.path, records, kwargs.pop('record_count', None))
+        source = IbtFileSource(self.path, **kwargs)
+        self.addCleanup(source.shutdown)
+        self.assertTrue(source.startup())
+        return source
+
+    def test_headers(self):
+        source = self.open(trace(5), speed=None)
+        self.assertEqual(source.tick_rate, TICK_RATE)
+        self.assertEqual(source.record_count, 5)
+        self.assertEqual(source.var_headers_names, ['SessionTime', 'CarIdxLapDistPct'])
+        header = source._var_headers[1]
+        self.assertEqual((header.type, header.offset, header.count, header.unit), (4, 8, 64, '%'))
+
+    def test_session_yaml(self):
+        source = self.open(trace(5), speed=None)
+        self.assertEqual(source['WeekendInfo']['TrackDisplayName'], 'Test Raceway')
+        # Unquoted free-text fields with colons still parse
+        drivers = source['DriverInfo']['Drivers']
+        self.assertEqual([d['UserName'] for d in drivers], ['Smith: Jr', 'Jones'])
+        self.assertIsNone(source['NotAVariable'])
+
+    def test_records_as_fast_as_possible(self):
+        source = self.open(trace(5), speed=None)
+        times = []
+        while not source.finished:
+            source.freeze_var_buffer_latest()
+            times.append(source['SessionTime'])
+        self.assertEqual(times, [k / TICK_RATE for k in range(1, 5)] + [4 / TICK_RATE])
+        self.assertFalse(source.is_connected)
+        self.assertAlmostEqual(source['CarIdxLapDistPct'][1], 0.404, places=5)
+
+    def test_timed_playback(self):
+        clock = FakeClock()
+        with mock.patch('ibt_source.time', clock):
+            source = self.open(trace(200), speed=2.0)
+            # Each freeze waits for the next record at 2x the tick rate
+            source.freeze_var_buffer_latest()
+            self.assertEqual(source.position, 1)
+            self.assertAlmostEqual(clock.now - 100.0, 1 / (2 * TICK_RATE), places=4)
+
+            # Slow consumers skip records to stay on the clock
+            clock.now += 0.51
+            source.freeze_var_buffer_latest()
+            self.assertEqual(source.position, 62)  # 0.518 s at 120 records/s
+
+    def test_loop(self):
+        source = self.open(trace(3), speed=None, loop=True)
+        positions = []
+        for _ in range(4):
+            source.freeze_var_buffer_latest()
+            positions.append(source.position)
+        self.assertEqual(positions, [1, 2, 0, 1])
+        self.assertFalse(source.finished)
+
+    def test_truncated_recording(self):
+        # Disk header claims more records than the file holds
+        source = self.open(trace(4), speed=None, record_count=100)
+        self.assertEqual(source.record_count, 4)
+        self.assertEqual(source.get_all('SessionTime').tolist(), [k / TICK_RATE for k in range(4)])
+        self.assertEqual(source.get_all('CarIdxLapDistPct').shape, (4, 64))
+        self.assertIsNone(source.get_all('Speed'))
+
+    def test_missing_file(self):
+        self.assertFalse(IbtFileSource(os.path.join(self.tmp.name, 'missing.ibt')).startup())
+
+
+class TestIbtThroughReader(unittest.TestCase):
+
+    def test_reader_plays_back_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'session.ibt')
+            write_ibt(path, trace(10))
+            reader = IRacingReader(source=IbtFileSource(path, speed=None))
+            self.assertTrue(reader.connect())
+            try:
+                session = reader.get_session_data()
+                self.assertEqual(session.session_id, '12345')
+                self.assertEqual(session.track_name, 'Test Raceway')
+                self.assertEqual(session.track_length, 4.0)
+                self.assertTrue(session.is_multiclass)
+
+                reader.freeze_frame()
+                reader.freeze_frame()
+                frame = reader.frame
+                self.assertAlmostEqual(frame.scalar('SessionTime'), 2 / TICK_RATE)
+                self.assertAlmostEqual(float(frame.car('CarIdxLapDistPct')[0]), 0.502, places=5)
+                self.assertEqual(frame.scalar('Speed'), 0.0)  # Not in the file
+            finally:
+                reader.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_snapshot import MAX_CARS, SCALAR_INDEX, FrameSnapshot
+from incident_detector import (
+    FLAG_RED,
+    TRACK_NOT_IN_WORLD,
+    TRACK_OFF_TRACK,
+    TRACK_ON_TRACK,
+    IncidentDetector,
+)
+
+DT = 0.1
+TRACK_KM = 4.0
+CARS = 4
+
+ROSTER = {
+    i: SimpleNamespace(car_name=f'Car {i}', driver_name=f'Driver {i}')
+    for i in range(CARS)
+}
+
+
+def frame(now, pct, surface=None, pit=(), flags=0, lap=3):
+    """Snapshot for the first len(pct) cars (on track unless given); the rest not in the world"""
+    snapshot = FrameSnapshot.empty()
+    snapshot.scalars[SCALAR_INDEX['SessionTime']] = now
+    snapshot.scalars[SCALAR_INDEX['SessionFlags']] = flags
+    snapshot.cars['CarIdxLapDistPct'][:len(pct)] = pct
+    snapshot.cars['CarIdxTrackSurface'][:] = TRACK_NOT_IN_WORLD
+    snapshot.cars['CarIdxTrackSurface'][:len(pct)] = surface if surface is not None else TRACK_ON_TRACK
+    snapshot.cars['CarIdxOnPitRoad'][list(pit)] = True
+    snapshot.cars['CarIdxLap'][:len(pct)] = lap
+    return snapshot
+
+
+class TestIncidentDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = IncidentDetector(position_jump_threshold=0.05, incident_threshold=1)
+        self.incidents = np.zeros(MAX_CARS, dtype=np.int32)
+        self.now = 0.0
+        # Cars spread around the lap, all moving 1% of a lap per frame (400 m/s: "moving")
+        self.pct = np.array([0.10, 0.30, 0.50, 0.70])
+
+    def step(self, moved=0.01, **kwargs):
+        """Advance every car by moved (per car or scalar) and update"""
+        self.now += DT
+        self.pct = (self.pct + moved) % 1.0
+        return self.detector.update(frame(self.now, self.pct, **kwargs), ROSTER, self.incidents, TRACK_KM)
+
+    def test_first_frame_reports_nothing(self):
+        self.incidents[1] = 4
+        self.assertEqual(self.step(), [])
+
+    def test_incident_count_increase(self):
+        self.step()
+        self.incidents[2] += 4
+        [incident] = self.step()
+        self.assertEqual(incident['cars'], [2])
+        self.assertEqual(incident['reasons'], ['incident'])
+        self.assertEqual(incident['incident_delta'], 4)
+        self.assertEqual(incident['driver_names'], ['Driver 2'])
+        self.assertEqual(incident['lap'], 3)
+        # Reported once per increase
+        self.assertEqual(self.step(), [])
+
+    def test_incident_threshold(self):
+        detector = IncidentDetector(incident_threshold=2)
+        detector.update(frame(0.0, self.pct), ROSTER, self.incidents, TRACK_KM)
+        self.incidents[0] = 1
+        self.assertEqual(detector.update(frame(DT, self.pct + 0.01), ROSTER, self.incidents, TRACK_KM), [])
+
+    def test_offtrack(self):
+        self.step()
+        surface = np.full(CARS, TRACK_ON_TRACK)
+        surface[1] = TRACK_OFF_TRACK
+        [incident] = self.step(surface=surface)
+        self.assertEqual(incident['cars'], [1])
+        self.assertEqual(incident['reasons'], ['offtrack'])
+        self.assertEqual(incident['incident_delta'], 1)
+        # Staying off track isn't a new incident
+        self.assertEqual(self.step(surface=surface), [])
+
+    def test_position_jump(self):
+        self.step()
+        [incident] = self.step(moved=np.array([0.01, 0.01, 0.2, 0.01]))
+        self.assertEqual(incident['cars'], [2])
+        self.assertEqual(incident['reasons'], ['position_jump'])
+        self.assertEqual(incident['incident_delta'], 4)
+
+    def test_pit_road_is_ignored(self):
+        self.step(pit=[3])
+        surface = np.full(CARS, TRACK_ON_TRACK)
+        surface[3] = TRACK_OFF_TRACK
+        moved = np.array([0.01, 0.01, 0.01, 0.3])  # Pit-stall reset
+        self.assertEqual(self.step(moved=moved, surface=surface, pit=[3]), [])
+
+    def test_stopped_latches_until_moving(self):
+        # Cars on the grid start latched: stopping from the start isn't an incident
+        self.step(moved=0.0)
+        self.assertEqual(self.step(moved=0.0), [])
+
+        # Once moving, stopping on track is reported once
+        self.step()
+        moved = np.array([0.01, 0.0, 0.01, 0.01])
+        [incident] = self.step(moved=moved)
+        self.assertEqual(incident['cars'], [1])
+        self.assertEqual(incident['reasons'], ['stopped'])
+        self.assertEqual(incident['incident_delta'], 2)
+        self.assertEqual(self.step(moved=moved), [])
+
+        # Crawling away slower than MOVING_SPEED keeps the latch
+        self.step(moved=np.array([0.01, 0.0001, 0.01, 0.01]))
+        self.assertEqual(self.step(moved=moved), [])
+
+        # Back up to speed: the next stop counts again
+        self.step()
+        self.assertEqual([i['cars'] for i in self.step(moved=moved)], [[1]])
+
+    def test_red_flag_suppresses_stopped(self):
+        self.step()
+        self.assertEqual(self.step(moved=0.0, flags=FLAG_RED), [])
+        # Latched while the red flag was out: no burst of incidents afterwards
+        self.assertEqual(self.step(moved=0.0), [])
+
+    def test_nearby_cars_are_grouped(self):
+        self.pct = np.array([0.500, 0.503, 0.70, 0.10])
+        self.step()
+        surface = np.array([TRACK_OFF_TRACK, TRACK_OFF_TRACK, TRACK_OFF_TRACK, TRACK_ON_TRACK])
+        incidents = self.step(surface=surface)
+        self.assertEqual([i['cars'] for i in incidents], [[0, 1], [2]])
+        # Multi-car incidents are at least contact
+        self.assertEqual(incidents[0]['incident_delta'], 2)
+        self.assertEqual(incidents[0]['car_names'], ['Car 0', 'Car 1'])
+        self.assertAlmostEqual(incidents[0]['track_position'], 0.52, places=5)
+        self.assertEqual(incidents[1]['incident_delta'], 1)
+
+    def test_group_reasons_and_weight(self):
+        self.pct = np.array([0.500, 0.502, 0.70, 0.10])
+        self.step()
+        surface = np.array([TRACK_OFF_TRACK, TRACK_ON_TRACK, TRACK_ON_TRACK, TRACK_ON_TRACK])
+        self.incidents[1] += 4
+        [incident] = self.step(surface=surface)
+        self.assertEqual(incident['cars'], [0, 1])
+        self.assertEqual(incident['reasons'], ['incident', 'offtrack'])
+        self.assertEqual(incident['incident_delta'], 4)
+
+    def test_cars_not_in_roster_are_skipped(self):
+        self.step()
+        self.incidents[5] = 4
+        self.assertEqual(self.step(), [])
+
+    def test_session_time_going_back_reports_nothing(self):
+        self.step()
+        self.now = 0.0
+        self.incidents[0] += 4
+        self.assertEqual(self.step(moved=0.3), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline import DROP_NEWEST, DROP_OLDEST, StageQueue
+
+
+def drain(queue):
+    items = []
+    while len(queue):
+        items.append(queue.get(timeout=0))
+    return items
+
+
+class TestStageQueue(unittest.TestCase):
+
+    def test_conflation_keeps_position(self):
+        queue = StageQueue(4)
+        queue.put('baseline-1', key='baseline')
+        queue.put('incident')
+        queue.put('baseline-2', key='baseline')
+        self.assertEqual(drain(queue), ['baseline-2', 'incident'])
+        self.assertEqual(queue.conflated, 1)
+
+    def test_overflow_evicts_telemetry_before_events(self):
+        queue = StageQueue(3, DROP_OLDEST)
+        queue.put('incident-1')
+        queue.put('baseline', key='baseline')
+        queue.put('event-1')
+        # Full: the oldest keyed job goes, not the older incident
+        self.assertTrue(queue.put('event-2'))
+        self.assertEqual(drain(queue), ['incident-1', 'event-1', 'event-2'])
+        self.assertEqual((queue.dropped, queue.dropped_events), (1, 0))
+
+    def test_overflow_with_only_events(self):
+        queue = StageQueue(2, DROP_OLDEST)
+        queue.put('event-1')
+        queue.put('event-2')
+        # Telemetry is given up rather than an event
+        self.assertFalse(queue.put('controls', key='controls'))
+        self.assertTrue(queue.put('event-3'))
+        self.assertEqual(drain(queue), ['event-2', 'event-3'])
+        self.assertEqual((queue.dropped, queue.dropped_events), (2, 1))
+
+    def test_drop_newest_makes_room_for_events(self):
+        queue = StageQueue(2, DROP_NEWEST)
+        queue.put('baseline', key='baseline')
+        queue.put('event-1')
+        self.assertFalse(queue.put('controls', key='controls'))
+        self.assertTrue(queue.put('event-2'))
+        self.assertFalse(queue.put('event-3'))
+        self.assertEqual(drain(queue), ['event-1', 'event-2'])
+        self.assertEqual((queue.dropped, queue.dropped_events), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_snapshot import MAX_CARS, SCALAR_INDEX, FrameSnapshot
+from incident_detector import TRACK_NOT_IN_WORLD, TRACK_ON_TRACK
+from pit_detector import PitDetector
+
+DT = 0.5
+
+
+def frame(now, on_pit, in_world=None, lap=5):
+    """Snapshot for the first len(on_pit) cars; the rest not in the world"""
+    snapshot = FrameSnapshot.empty()
+    snapshot.scalars[SCALAR_INDEX['SessionTime']] = now
+    snapshot.cars['CarIdxOnPitRoad'][:len(on_pit)] = on_pit
+    surface = np.full(MAX_CARS, TRACK_NOT_IN_WORLD, dtype=np.int32)
+    surface[:len(on_pit)] = TRACK_ON_TRACK
+    if in_world is not None:
+        surface[:len(on_pit)][~np.asarray(in_world)] = TRACK_NOT_IN_WORLD
+    snapshot.cars['CarIdxTrackSurface'] = surface
+    snapshot.cars['CarIdxLap'][:] = lap
+    return snapshot
+
+
+class TestPitDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = PitDetector()
+        self.now = 10.0
+
+    def run_frames(self, sequence):
+        """
+        Feed (on_pit, speed[, in_world]) per frame for cars 0 and 1, DT apart.
+        Returns the events of every frame.
+        """
+        events = []
+        for step in sequence:
+            on_pit, speed = step[0], step[1]
+            in_world = step[2] if len(step) > 2 else None
+            speeds = np.zeros(MAX_CARS)
+            speeds[:len(speed)] = speed
+            events.append(self.detector.update(frame(self.now, on_pit, in_world), speeds))
+            self.now += DT
+        return events
+
+    def test_pit_stop(self):
+        moving, stopped = [40.0, 40.0], [0.0, 40.0]
+        events = self.run_frames(
+            [([False, False], moving)] * 2            # Racing
+            + [([True, False], [20.0, 40.0])] * 2     # Pit lane
+            + [([True, False], stopped)] * 5          # In the box
+            + [([True, False], [20.0, 40.0])] * 2     # Pit lane
+            + [([False, False], moving)]              # Back on track
+        )
+        flat = [e for frame_events in events for e in frame_events]
+        self.assertEqual([e['type'] for e in flat], ['pit:enter', 'pit:exit'])
+        enter, exit_ = flat
+        self.assertEqual(events[2], [enter])
+        self.assertEqual((enter['car_idx'], enter['lap'], enter['stops']), (0, 5, 0))
+        self.assertEqual(enter['session_time'], 11.0)
+
+        self.assertEqual(events[11], [exit_])
+        self.assertEqual(exit_['pit_lane_time'], 9 * DT)
+        # Stationary from the first stopped frame to the next one that moved
+        self.assertEqual(exit_['stationary_time'], 5 * DT)
+        self.assertTrue(exit_['stopped'])
+        self.assertEqual(exit_['stops'], 1)
+        self.assertEqual(self.detector.stops[0], 1)
+
+    def test_drive_through_is_not_a_stop(self):
+        events = self.run_frames(
+            [([False], [40.0])]
+            + [([True], [20.0])] * 4
+            + [([True], [0.0])]  # Half a second stationary
+            + [([True], [20.0])]
+            + [([False], [40.0])]
+        )
+        exit_ = events[-1][0]
+        self.assertEqual(exit_['type'], 'pit:exit')
+        self.assertEqual(exit_['stationary_time'], DT)
+        self.assertFalse(exit_['stopped'])
+        self.assertEqual(exit_['stops'], 0)
+
+    def test_stops_accumulate(self):
+        visit = [([True], [0.0])] * 4 + [([False], [40.0])]
+        events = self.run_frames([([False], [40.0])] + visit + visit)
+        exits = [e for frame_events in events for e in frame_events if e['type'] == 'pit:exit']
+        self.assertEqual([e['stops'] for e in exits], [1, 2])
+        enters = [e for frame_events in events for e in frame_events if e['type'] == 'pit:enter']
+        self.assertEqual([e['stops'] for e in enters], [0, 1])
+
+    def test_started_in_pits_reports_nothing(self):
+        events = self.run_frames(
+            [([True], [0.0])] * 3       # Already in the pits when we connect
+            + [([False], [40.0])]       # No exit: the entry was never seen
+            + [([True], [0.0])]         # Next visit is reported
+        )
+        self.assertEqual(events[3], [])
+        self.assertEqual([e['type'] for e in events[4]], ['pit:enter'])
+
+    def test_out_of_the_garage_is_not_an_entry(self):
+        events = self.run_frames([
+            ([False], [0.0], [False]),  # In the garage
+            ([True], [0.0], [True]),    # Appears on pit road
+            ([False], [30.0], [True]),
+        ])
+        self.assertEqual(events, [[], [], []])
+
+    def test_tow_on_pit_road_is_dropped(self):
+        events = self.run_frames([
+            ([False], [40.0]),
+            ([True], [20.0]),
+            ([False], [0.0], [False]),  # Left the world
+        ])
+        self.assertEqual([e['type'] for e in events[1]], ['pit:enter'])
+        self.assertEqual(events[2], [])
+
+    def test_cars_are_independent(self):
+        events = self.run_frames([
+            ([False, False], [40.0, 40.0]),
+            ([True, False], [20.0, 40.0]),
+            ([True, True], [0.0, 20.0]),
+            ([False, True], [40.0, 0.0]),
+        ])
+        types = [[(e['type'], e['car_idx']) for e in frame_events] for frame_events in events]
+        self.assertEqual(types, [[], [('pit:enter', 0)], [('pit:enter', 1)], [('pit:exit', 0)]])
+
+    def test_session_time_going_back_resets(self):
+        self.run_frames([([False], [40.0]), ([True], [0.0]), ([True], [0.0]), ([True], [0.0])])
+        self.now = 0.0
+        events = self.run_frames([([True], [0.0]), ([False], [40.0])])
+        self.assertEqual(events, [[], []])
+        self.assertEqual(self.detector.stops[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
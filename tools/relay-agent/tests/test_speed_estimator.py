@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import math
+
+import numpy as np
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_snapshot import MAX_CARS, SCALAR_INDEX, FrameSnapshot
+from speed_estimator import SpeedEstimator
+
+TRACK_KM = 5.0
+DT = 0.1
+
+
+def frame(now, pct):
+    """Snapshot with the given per-car lap distance; other cars not in the world"""
+    snapshot = FrameSnapshot.empty()
+    snapshot.scalars[SCALAR_INDEX['SessionTime']] = now
+    lap_dist = np.full(MAX_CARS, -1.0, dtype=np.float32)
+    lap_dist[:len(pct)] = pct
+    snapshot.cars['CarIdxLapDistPct'] = lap_dist
+    return snapshot
+
+
+class TestSpeedEstimator(unittest.TestCase):
+
+    def setUp(self):
+        self.estimator = SpeedEstimator(max_move=0.05)
+
+    def update(self, now, pct):
+        return self.estimator.update(frame(now, pct), TRACK_KM)
+
+    def test_first_sample_starts_from_raw_speed(self):
+        self.assertEqual(self.update(0.0, [0.25])[0], 0.0)
+        # 0.001 lap of a 5 km track in 0.1 s
+        self.assertAlmostEqual(self.update(DT, [0.251])[0], 50.0, places=1)
+
+    def test_ema_smoothing(self):
+        self.update(0.0, [0.25])
+        self.update(DT, [0.251])
+        speed = self.update(2 * DT, [0.253])[0]  # Doubles to 100 m/s
+        alpha = 1.0 - math.exp(-DT / SpeedEstimator.SMOOTHING_TIME)
+        self.assertAlmostEqual(speed, 50.0 + alpha * 50.0, places=1)
+
+        # Converges on a steady speed
+        pct = 0.253
+        for i in range(3, 40):
+            pct += 0.002
+            speed = self.update(i * DT, [pct])[0]
+        self.assertAlmostEqual(speed, 100.0, places=0)
+
+    def test_wrap_across_the_line(self):
+        self.update(0.0, [0.998])
+        self.update(DT, [0.999])
+        speed = self.update(2 * DT, [0.0])[0]
+        self.assertAlmostEqual(speed, 50.0, places=0)
+
+    def test_pit_road_jump_is_not_speed(self):
+        self.update(0.0, [0.25, 0.5])
+        self.update(DT, [0.251, 0.501])
+        # Car 1 reset to its pit stall: speed held, not a 7500 m/s spike
+        speeds = self.update(2 * DT, [0.252, 0.35])
+        self.assertAlmostEqual(speeds[1], 50.0, places=1)
+        # Then moves normally from the new position
+        self.assertAlmostEqual(self.update(3 * DT, [0.253, 0.351])[1], 50.0, places=1)
+
+    def test_car_leaving_the_world_drops_to_zero(self):
+        self.update(0.0, [0.25])
+        self.update(DT, [0.251])
+        self.assertEqual(self.update(2 * DT, [-1.0])[0], 0.0)
+
+    def test_frames_too_close_together_are_skipped(self):
+        self.update(0.0, [0.25])
+        self.update(DT, [0.251])
+        speed = self.update(DT + 0.001, [0.3])[0]
+        self.assertAlmostEqual(speed, 50.0, places=1)
+
+    def test_session_time_going_back_resets(self):
+        self.update(0.0, [0.25])
+        self.update(DT, [0.251])
+        self.assertEqual(self.update(0.05, [0.1])[0], 0.0)
+        self.assertAlmostEqual(self.update(0.05 + DT, [0.101])[0], 50.0, places=1)
+
+    def test_no_track_length(self):
+        self.estimator.update(frame(0.0, [0.25]), 0.0)
+        self.assertEqual(self.estimator.update(frame(DT, [0.251]), 0.0)[0], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
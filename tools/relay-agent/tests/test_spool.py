@@ -0,0 +1,143 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+from unittest import mock
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from pitbox_client import PitBoxClient
+from spool import FSYNC_NEVER, OutboundSpool
+
+
+def segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(OutboundSpool.SEGMENT_SUFFIX))
+
+
+class TestOutboundSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def drain_all(self, spool):
+        sent = []
+        spool.drain(lambda event, data, spooled_at: sent.append((event, data)) or True, 1000)
+        return sent
+
+    def test_segments_rotate_and_replay_in_order(self):
+        spool = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=200, fsync=FSYNC_NEVER)
+        for i in range(20):
+            self.assertTrue(spool.append('event', {'seq': i, 'payload': b'\x00\x01'}))
+        self.assertGreater(len(segment_files(self.dir)), 1)
+        self.assertEqual(spool.pending(), 20)
+
+        sent = self.drain_all(spool)
+        self.assertEqual([data['seq'] for _, data in sent], list(range(20)))
+        self.assertEqual(sent[0][1]['payload'], b'\x00\x01')
+        self.assertEqual(spool.pending(), 0)
+        self.assertLessEqual(len(segment_files(self.dir)), 1)  # Only the open writer segment
+        spool.close()
+
+    def test_disk_cap_evicts_oldest(self):
+        spool = OutboundSpool(self.dir, max_bytes=1000, segment_bytes=200, fsync=FSYNC_NEVER)
+        for i in range(100):
+            spool.append('incident', {'seq': i})
+        stats = spool.stats()
+        self.assertLessEqual(stats['bytes'], 1000 + 200)
+        self.assertGreater(stats['evicted'], 0)
+        self.assertEqual(stats['pending'] + stats['evicted'], 100)
+
+        seqs = [data['seq'] for _, data in self.drain_all(spool)]
+        self.assertEqual(seqs, list(range(100 - len(seqs), 100)))  # Newest survive, in order
+        spool.close()
+
+    def test_pending_survives_restart(self):
+        spool = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=1 << 16, fsync=FSYNC_NEVER)
+        spool.append('event', {'seq': 1})
+        spool.close()
+        # A torn record at the end of the segment is discarded on load
+        with open(os.path.join(self.dir, segment_files(self.dir)[0]), 'ab') as f:
+            f.write(b'\x10\x00')
+        reopened = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=1 << 16, fsync=FSYNC_NEVER)
+        self.assertEqual([data for _, data in self.drain_all(reopened)], [{'seq': 1}])
+        reopened.close()
+
+    def test_drained_records_not_replayed_after_restart(self):
+        spool = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=1 << 16, fsync=FSYNC_NEVER)
+        for i in range(3):
+            spool.append('event', {'seq': i})
+        self.assertEqual(len(self.drain_all(spool)), 3)
+        spool.close()
+        self.assertEqual(segment_files(self.dir), [])  # Fully drained open segment is removed
+        reopened = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=1 << 16, fsync=FSYNC_NEVER)
+        self.assertEqual(reopened.pending(), 0)
+
+        # Appending after a full drain starts a new segment
+        reopened.append('event', {'seq': 3})
+        self.assertEqual([data for _, data in self.drain_all(reopened)], [{'seq': 3}])
+        reopened.close()
+
+    def test_partial_drain_resumes_after_restart(self):
+        spool = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=1 << 16, fsync=FSYNC_NEVER)
+        for i in range(5):
+            spool.append('event', {'seq': i})
+        spool.drain(lambda event, data, spooled_at: True, 2)
+        spool.close()
+        reopened = OutboundSpool(self.dir, max_bytes=1 << 20, segment_bytes=1 << 16, fsync=FSYNC_NEVER)
+        self.assertEqual(reopened.pending(), 3)
+        self.assertEqual([data['seq'] for _, data in self.drain_all(reopened)], [2, 3, 4])
+        reopened.close()
+
+
+class TestClientSpooling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(config, SPOOL_ENABLED=True, SPOOL_DIR=self.tmp.name)
+        self.patch.start()
+        self.client = PitBoxClient('http://localhost:1')
+        self.client.session_id = 's1'
+        self.sent = []
+        self.client._send = lambda event, data: self.sent.append((event, data)) or True
+
+    def tearDown(self):
+        self.client.spool.close()
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def test_replay_is_tagged(self):
+        self.assertTrue(self.client.send_event('pit:enter', {'carIdx': 4}))
+        self.assertEqual(self.sent, [])
+
+        self.client.connected = True
+        self.client.sio.connected = True
+        self.client._last_drain = time.monotonic() - 10
+        self.assertEqual(self.client.drain_spool(), 1)
+        event, data = self.sent[0]
+        self.assertEqual(event, 'event')
+        self.assertEqual(data['payload']['eventType'], 'pit:enter')
+        self.assertTrue(data['replayed'])
+        self.assertIn('spooledAt', data)
+
+    def test_strategy_not_spooled_by_default(self):
+        self.assertFalse(self.client.spools('strategy_update'))
+
+    def test_spooled_strategy_forces_keyframe(self):
+        self.client.spool_events.add('strategy_update')
+        self.client.strategy.encode([])
+        self.client.strategy.commit(True)
+        self.assertTrue(self.client.send_strategy_update('s1', [{'carId': 1, 'fuel': 10.0}]))
+        self.assertEqual(self.client.spool.pending(), 1)
+        # Only spooled: the next live packet must be a keyframe
+        self.assertTrue(self.client.strategy._keyframe_requested)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import sys
+import os
+import copy
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from strategy_delta import StrategyDeltaEncoder, diff_fields, merge_fields
+
+
+def car(car_id, fuel=30.0, wear=0.9, in_pit=False, stops=0):
+    return {
+        'carId': car_id,
+        'fuel': {'level': fuel, 'pct': fuel / 60.0},
+        'tires': {'fl': wear, 'fr': wear},
+        'pit': {'inLane': in_pit, 'stops': stops},
+    }
+
+
+class TestDiffFields(unittest.TestCase):
+
+    def test_nested_changes_only(self):
+        old = car(1)
+        new = car(1, fuel=29.0, stops=1)
+        self.assertEqual(diff_fields(old, new, 1e-3), {
+            'fuel': {'level': 29.0, 'pct': 29.0 / 60.0},
+            'pit': {'stops': 1},
+        })
+
+    def test_float_tolerance(self):
+        self.assertEqual(diff_fields({'t': 90.0}, {'t': 90.0005}, 1e-3), {})
+        self.assertEqual(diff_fields({'t': 90.0}, {'t': 90.01}, 1e-3), {'t': 90.01})
+        # Bools and ints compare exactly
+        self.assertEqual(diff_fields({'b': True}, {'b': False}, 1e-3), {'b': False})
+        self.assertEqual(diff_fields({'n': 1}, {'n': 2}, 1e-3), {'n': 2})
+
+    def test_new_and_retyped_fields(self):
+        self.assertEqual(diff_fields({'a': 1}, {'a': 1, 'b': {'c': 2}}, 1e-3), {'b': {'c': 2}})
+        self.assertEqual(diff_fields({'a': {'x': 1}}, {'a': None}, 1e-3), {'a': None})
+
+    def test_merge_applies_delta(self):
+        state = car(1)
+        merge_fields(state, diff_fields(car(1), car(1, wear=0.8, in_pit=True), 1e-3))
+        self.assertEqual(state, car(1, wear=0.8, in_pit=True))
+
+
+class TestStrategyDeltaEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = StrategyDeltaEncoder(keyframe_seconds=10.0)
+        self.now = 100.0
+
+    def send(self, cars, sent=True, dt=1.0):
+        self.now += dt
+        packet = self.encoder.encode(copy.deepcopy(cars), self.now)
+        self.encoder.commit(sent)
+        return packet
+
+    def test_first_packet_is_keyframe(self):
+        packet = self.send([car(1), car(2)])
+        self.assertEqual(packet['seq'], 1)
+        self.assertTrue(packet['keyframe'])
+        self.assertEqual(packet['cars'], [car(1), car(2)])
+        self.assertEqual(packet['removed'], [])
+
+    def test_delta_carries_changed_fields_only(self):
+        self.send([car(1), car(2)])
+        packet = self.send([car(1), car(2, fuel=29.0)])
+        self.assertFalse(packet['keyframe'])
+        self.assertEqual(packet['seq'], 2)
+        # Car 1 unchanged: left out
+        self.assertEqual(packet['cars'], [{'carId': 2, 'fuel': {'level': 29.0, 'pct': 29.0 / 60.0}}])
+
+        # Nothing changed at all: an empty delta (still numbered)
+        packet = self.send([car(1), car(2, fuel=29.0)])
+        self.assertEqual((packet['seq'], packet['cars'], packet['removed']), (3, [], []))
+
+    def test_cars_joining_and_leaving(self):
+        self.send([car(1), car(2)])
+        packet = self.send([car(1), car(3)])
+        self.assertEqual(packet['cars'], [car(3)])
+        self.assertEqual(packet['removed'], [2])
+        # Removal is sent once
+        self.assertEqual(self.send([car(1), car(3)])['removed'], [])
+
+    def test_deltas_rebuild_the_state(self):
+        frames = [
+            [car(1), car(2)],
+            [car(1, fuel=29.5), car(2, wear=0.85)],
+            [car(1, fuel=29.0, in_pit=True), car(2, wear=0.85)],
+            [car(1, fuel=60.0, in_pit=True, stops=1)],
+        ]
+        received = {}
+        for cars in frames:
+            packet = self.send(cars)
+            if packet['keyframe']:
+                received = {}
+            for delta in packet['cars']:
+                merge_fields(received.setdefault(delta['carId'], {}), copy.deepcopy(delta))
+            for car_id in packet['removed']:
+                received.pop(car_id)
+            self.assertEqual(received, {c['carId']: c for c in cars})
+
+    def test_keyframe_every_n_seconds(self):
+        self.send([car(1)])
+        keyframes = [self.send([car(1, fuel=30.0 - i)])['keyframe'] for i in range(1, 21)]
+        # 1 s apart, a keyframe every 10 s
+        self.assertEqual([i + 1 for i, k in enumerate(keyframes) if k], [10, 20])
+
+    def test_keyframe_after_failed_send(self):
+        self.send([car(1)])
+        self.assertFalse(self.send([car(1, fuel=29.0)])['keyframe'])
+        lost = self.send([car(1, fuel=28.0)], sent=False)
+        self.assertFalse(lost['keyframe'])
+        # The receiver missed seq 3: the next packet resyncs everything
+        packet = self.send([car(1, fuel=28.0)])
+        self.assertEqual(packet['seq'], 4)
+        self.assertTrue(packet['keyframe'])
+        self.assertEqual(packet['cars'], [car(1, fuel=28.0)])
+        self.assertFalse(self.send([car(1, fuel=28.0)])['keyframe'])
+
+    def test_failed_keyframe_is_retried(self):
+        self.assertTrue(self.send([car(1)], sent=False)['keyframe'])
+        self.assertTrue(self.send([car(1)])['keyframe'])
+
+    def test_request_keyframe(self):
+        self.send([car(1)])
+        self.assertFalse(self.send([car(1)])['keyframe'])
+        self.encoder.request_keyframe()
+        packet = self.send([car(1)])
+        self.assertTrue(packet['keyframe'])
+        self.assertEqual(packet['cars'], [car(1)])
+        # Honoured once, and the keyframe clock restarts from it
+        for _ in range(9):
+            self.assertFalse(self.send([car(1)])['keyframe'])
+        self.assertTrue(self.send([car(1)])['keyframe'])
+
+    def test_commit_without_encode_is_ignored(self):
+        self.send([car(1)])
+        self.encoder.commit(False)
+        self.assertFalse(self.encoder._keyframe_requested)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import sys
+import os
+import threading
+from unittest import mock
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stream_batcher import StreamBatcher, parse_windows
+
+
+class FakeClock:
+    """Monotonic and wall clock moving together"""
+
+    def __init__(self):
+        self.now = 50.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+
+class TestParseWindows(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_windows('controls=100, baseline = 250'), {'controls': 0.1, 'baseline': 0.25})
+        self.assertEqual(parse_windows(''), {})
+
+    def test_invalid_items_are_skipped(self):
+        with self.assertLogs('stream_batcher', 'WARNING'):
+            windows = parse_windows('controls=fast,baseline=250,junk')
+        self.assertEqual(windows, {'baseline': 0.25})
+
+
+class TestStreamBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patch = mock.patch('stream_batcher.time', self.clock)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.batcher = StreamBatcher({'controls': 0.1, 'baseline': 0.25})
+
+    def add(self, stream, seq, dt=0.0):
+        self.clock.now += dt
+        return self.batcher.add(stream, seq, f'{stream}{seq}')
+
+    def test_only_streams_with_a_window_are_batched(self):
+        self.assertTrue(self.batcher.batches('controls'))
+        self.assertFalse(self.batcher.batches('telemetry:v2'))
+
+    def test_window_expiry(self):
+        self.assertEqual(self.add('controls', 1), [])
+        self.assertEqual(self.add('controls', 2, 0.033), [])
+        self.assertEqual(self.add('controls', 3, 0.033), [])
+        # The oldest sample has now waited the 100 ms window
+        [batch] = self.add('controls', 4, 0.035)
+        packet = batch.to_packet()
+        self.assertEqual(packet['seq'], 1)
+        self.assertEqual(packet['count'], 4)
+        self.assertEqual(packet['samples'], ['controls1', 'controls2', 'controls3', 'controls4'])
+        self.assertEqual(packet['offsets'], [0, 33, 66, 101])
+        self.assertAlmostEqual(packet['tsBase'], (1_700_000_000.0 + 50.0) * 1000)
+
+        # The next sample opens a new batch
+        self.assertEqual(self.add('controls', 5, 0.033), [])
+        self.assertEqual(self.batcher.flush_all()[0].first_seq, 5)
+
+    def test_flush_due(self):
+        self.add('controls', 1)
+        self.add('baseline', 1)
+        self.clock.now += 0.05
+        self.assertEqual(self.batcher.flush_due(), [])
+        self.clock.now += 0.06
+        self.assertEqual([b.stream for b in self.batcher.flush_due()], ['controls'])
+        self.clock.now += 0.15
+        self.assertEqual([b.stream for b in self.batcher.flush_due()], ['baseline'])
+        self.assertEqual(self.batcher.flush_due(), [])
+
+    def test_adding_releases_other_due_streams(self):
+        self.add('baseline', 1)
+        due = self.add('controls', 1, 0.3)
+        self.assertEqual([b.stream for b in due], ['baseline'])
+
+    def test_flush_all(self):
+        self.add('controls', 1)
+        self.add('controls', 2)
+        self.add('baseline', 7)
+        batches = {b.stream: b for b in self.batcher.flush_all()}
+        self.assertEqual(len(batches['controls'].samples), 2)
+        self.assertEqual(batches['baseline'].first_seq, 7)
+        self.assertEqual(self.batcher.flush_all(), [])
+
+    def test_seq_gap_splits_the_batch(self):
+        self.add('controls', 1)
+        self.add('controls', 2)
+        # Seq 3 was dropped: the held batch goes out, 4 starts a new one
+        [batch] = self.add('controls', 4)
+        self.assertEqual((batch.first_seq, batch.samples), (1, ['controls1', 'controls2']))
+        [batch] = self.batcher.flush_all()
+        self.assertEqual((batch.first_seq, batch.samples), (4, ['controls4']))
+
+        # Also on a reset back to an earlier seq
+        self.add('controls', 10)
+        self.assertEqual(self.add('controls', 1)[0].first_seq, 10)
+
+    def test_clear(self):
+        self.add('controls', 1)
+        self.batcher.clear()
+        self.assertEqual(self.batcher.flush_all(), [])
+        self.assertEqual(self.add('controls', 2), [])
+        self.assertEqual(self.batcher.flush_all()[0].first_seq, 2)
+
+
+class TestStreamBatcherThreads(unittest.TestCase):
+
+    def test_clear_while_adding(self):
+        batcher = StreamBatcher({'controls': 0.001})
+        errors = []
+        samples = []
+
+        def add():
+            try:
+                for seq in range(20000):
+                    for batch in batcher.add('controls', seq, seq):
+                        samples.extend(batch.samples)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=add)
+        thread.start()
+        while thread.is_alive():
+            batcher.clear()
+        thread.join()
+        self.assertEqual(errors, [])
+        # No sample is released twice, however clears interleave
+        self.assertEqual(len(samples), len(set(samples)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_snapshot import MAX_CARS, SCALAR_INDEX, FrameSnapshot
+from timing_engine import TimingEngine
+
+DT = 0.1      # Seconds per frame
+STEP = 0.01   # Lap fraction per frame: a 10 s lap
+
+
+def frame(now, pct, laps, last_lap=10.0):
+    """Snapshot with the given per-car lap distance and lap; other cars not in the world"""
+    snapshot = FrameSnapshot.empty()
+    snapshot.scalars[SCALAR_INDEX['SessionTime']] = now
+    lap_dist = np.full(MAX_CARS, -1.0, dtype=np.float32)
+    lap_dist[:len(pct)] = pct
+    snapshot.cars['CarIdxLapDistPct'] = lap_dist
+    snapshot.cars['CarIdxLap'][:len(laps)] = laps
+    snapshot.cars['CarIdxLastLapTime'][:] = last_lap
+    return snapshot
+
+
+def race_distance(frame_index, start):
+    """(lap, lap distance) of a car at constant speed"""
+    distance = start + frame_index * STEP
+    return int(distance), distance % 1.0
+
+
+class TestTimingEngine(unittest.TestCase):
+
+    def drive(self, engine, frames, starts, first=0):
+        """Run cars at constant speed from their start distances"""
+        for i in range(first, first + frames):
+            positions = [race_distance(i, start) for start in starts]
+            engine.update(frame(i * DT, [p for _, p in positions], [lap for lap, _ in positions]))
+
+    def test_gap_between_cars_on_the_same_lap(self):
+        engine = TimingEngine(bins=100)
+        # Car 1 trails car 0 by 5% of a 10 s lap, off the bin boundaries
+        self.drive(engine, 20, [0.503, 0.453])
+        self.assertEqual(engine.car_ahead[1], 0)
+        self.assertEqual(engine.car_behind[0], 1)
+        ahead, behind = engine.gaps(0)
+        self.assertIsNone(ahead)
+        self.assertAlmostEqual(behind, 0.5, places=3)
+        ahead, behind = engine.gaps(1)
+        self.assertAlmostEqual(ahead, 0.5, places=3)
+        self.assertIsNone(behind)
+
+    def test_crossing_times_are_interpolated(self):
+        engine = TimingEngine(bins=100)
+        engine.update(frame(1.0, [0.105], [0]))
+        engine.update(frame(1.1, [0.125], [0]))
+        # Bins 11 and 12 crossed a quarter and three quarters of the way through the frame
+        self.assertAlmostEqual(engine.crossings[0, 11], 1.025, places=4)
+        self.assertAlmostEqual(engine.crossings[0, 12], 1.075, places=4)
+        self.assertEqual(engine.last_bin[0], 12)
+
+    def test_gap_across_the_line(self):
+        engine = TimingEngine(bins=100)
+        self.drive(engine, 60, [0.703, 0.653])
+        # Both cars have crossed the start/finish line onto lap 1
+        self.assertEqual(engine.last_bin[1], int((0.653 + 59 * STEP) % 1.0 * 100))
+        self.assertEqual(engine.crossing_laps[0, 0], 1)
+        self.assertEqual(engine.crossing_laps[1, 0], 1)
+        self.assertEqual(engine.crossing_laps[1, 99], 0)
+        self.assertAlmostEqual(engine.gaps(1)[0], 0.5, places=3)
+
+    def test_lapped_car_adds_whole_laps(self):
+        engine = TimingEngine(bins=100)
+        # Car 0 is a lap and 5% ahead of car 1
+        self.drive(engine, 20, [1.503, 0.453])
+        self.assertEqual(engine.car_ahead[1], 0)
+        self.assertAlmostEqual(engine.gaps(1)[0], 10.5, places=3)
+
+        # Unknown lap time: no lapped gap
+        engine.update(frame(20 * DT, [0.703, 0.653], [1, 0], last_lap=0.0))
+        self.assertIsNone(engine.gaps(1)[0])
+
+    def test_pit_teleport_resets_timing(self):
+        engine = TimingEngine(bins=100, max_move=0.05)
+        self.drive(engine, 20, [0.503, 0.453])
+        self.assertIsNotNone(engine.gaps(1)[0])
+
+        # Car 1 is reset to its pit stall, half a lap back
+        engine.update(frame(20 * DT, [0.703, 0.105], [0, 0]))
+        self.assertEqual(engine.last_bin[1], -1)
+        self.assertTrue(np.isnan(engine.crossings[1]).all())
+        self.assertEqual(engine.car_ahead[1], 0)
+        self.assertEqual(engine.gaps(1), (None, None))
+
+        # Timing resumes from the new position
+        engine.update(frame(21 * DT, [0.713, 0.115], [0, 0]))
+        self.assertEqual(engine.last_bin[1], 11)
+        self.assertAlmostEqual(engine.crossings[1, 11], 20.5 * DT, places=4)
+        self.assertIsNone(engine.gap(1, 0))  # Car 0 hasn't been timed at that bin yet
+
+    def test_cars_out_of_the_world_are_not_ranked(self):
+        engine = TimingEngine(bins=100)
+        engine.update(frame(1.0, [0.5, -1.0, 0.4], [0, 0, 0]))
+        self.assertEqual(engine.car_ahead[2], 0)
+        self.assertEqual(engine.car_ahead[1], -1)
+        self.assertEqual(engine.car_behind[1], -1)
+
+        # The active mask excludes cars too (e.g. the pace car)
+        active = np.ones(MAX_CARS, dtype=bool)
+        active[0] = False
+        engine.update(frame(1.1, [0.51, -1.0, 0.41], [0, 0, 0]), active)
+        self.assertEqual(engine.car_ahead[2], -1)
+
+    def test_session_time_going_back_resets(self):
+        engine = TimingEngine(bins=100)
+        self.drive(engine, 20, [0.503, 0.453])
+        engine.update(frame(0.0, [0.2, 0.15], [0, 0]))
+        self.assertTrue((engine.last_bin == -1).all())
+        self.assertEqual(engine.gaps(1), (None, None))
+
+    def test_out_of_range_car(self):
+        self.assertEqual(TimingEngine().gaps(MAX_CARS), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+import sys
+import os
+import socket
+import threading
+
+from websocket import ABNF
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from binary_codec import CodecError
+from transport import (
+    ENVELOPE,
+    TYPE_BINARY,
+    TYPE_HELLO,
+    TYPE_JSON,
+    WebSocketTransport,
+    decode_messages,
+    encode_hello,
+    encode_message,
+    websocket_url,
+)
+from ws_server import StandInServer
+
+
+def decode(frame, session_id=None):
+    return list(decode_messages(frame, session_id=session_id))
+
+
+class TestEnvelope(unittest.TestCase):
+
+    def test_json_roundtrip(self):
+        data = {'sessionId': 's1', 'seq': 3, 'cars': [{'carId': 1}]}
+        frame = encode_message('strategy_update', data)
+        self.assertEqual(decode(frame), [(TYPE_JSON, 'strategy_update', data)])
+
+    def test_binary_payload_is_raw(self):
+        payload = bytes(range(20))
+        frame = encode_message('telemetry:v2', {'sessionId': 's1', 'payload': payload}, session_id='s1')
+        # Envelope + empty meta + payload: sessionId is implied by the connection
+        self.assertEqual(len(frame), ENVELOPE.size + 2 + len(payload))
+        self.assertEqual(decode(frame, 's1'), [(TYPE_BINARY, 'telemetry:v2', {'payload': payload, 'sessionId': 's1'})])
+
+    def test_binary_with_meta_and_named_field(self):
+        batch = {'seq': 5, 'count': 2, 'payload': b'\x01\x02'}
+        frame = encode_message('telemetry:controls:delta:batch', batch)
+        self.assertEqual(decode(frame)[0][2], batch)
+
+        video = {'sessionId': 's1', 'image': b'\xff\xd8' * 100}
+        self.assertEqual(decode(encode_message('video_frame', video))[0][2], video)
+
+    def test_unknown_event_named_inline(self):
+        frame = encode_message('custom:event', {'a': 1})
+        self.assertEqual(decode(frame), [(TYPE_JSON, 'custom:event', {'a': 1})])
+
+    def test_concatenated_messages(self):
+        frame = encode_hello() + encode_message('ack', {'x': 1}) + encode_message('event', {'y': 2})
+        kinds = [(kind, event) for kind, event, _ in decode(frame)]
+        self.assertEqual(kinds, [(TYPE_HELLO, ''), (TYPE_JSON, 'ack'), (TYPE_JSON, 'event')])
+
+    def test_errors(self):
+        with self.assertRaises(CodecError):
+            encode_message('video_frame', {'image': b'a', 'audio': b'b'})
+        frame = encode_message('event', {'y': 2})
+        with self.assertRaises(CodecError):
+            decode(frame[:-1])
+        with self.assertRaises(CodecError):
+            decode(ENVELOPE.pack(TYPE_JSON, 999, 2) + b'{}')
+        # Binary bodies too short for their meta length, or a truncated event name
+        with self.assertRaises(CodecError):
+            decode(ENVELOPE.pack(TYPE_BINARY, 1, 1) + b'x')
+        with self.assertRaises(CodecError):
+            decode(ENVELOPE.pack(TYPE_BINARY, 1, 3) + b'\x10\x00{')
+        with self.assertRaises(CodecError):
+            decode(ENVELOPE.pack(TYPE_JSON, 0, 2) + b'\x09a')
+
+    def test_bad_frame_keeps_reader_alive(self):
+        server = StandInServer()
+        server.start()
+        transport = WebSocketTransport(reconnection=False)
+        viewers = threading.Event()
+        transport.on('relay:viewers', lambda data: viewers.set())
+        try:
+            transport.connect(server.url, wait_timeout=2)
+            self.assertTrue(server.wait_connections(1))
+            connection = server.connections[0]
+            connection._send_frame(ABNF.OPCODE_BINARY, ENVELOPE.pack(TYPE_BINARY, 1, 1) + b'x')
+            connection.emit('relay:viewers', {'viewerCount': 1})
+            self.assertTrue(viewers.wait(2))
+            self.assertTrue(transport.connected)
+        finally:
+            transport.disconnect()
+            server.stop()
+
+    def test_websocket_url(self):
+        self.assertEqual(websocket_url('http://localhost:3000', '/relay/ws'), 'ws://localhost:3000/relay/ws')
+        self.assertEqual(websocket_url('https://example.com/', '/relay/ws'), 'wss://example.com/relay/ws')
+        self.assertEqual(websocket_url('wss://gw.example.com/relay', '/relay/ws'), 'wss://gw.example.com/relay')
+
+
+class TestWebSocketTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.server.start()
+        self.transport = WebSocketTransport(reconnection_delay=0.05)
+
+    def tearDown(self):
+        self.transport.disconnect()
+        self.server.stop()
+
+    def test_roundtrip_with_standin_server(self):
+        viewers = threading.Event()
+        received = {}
+
+        @self.transport.on('relay:viewers')
+        def on_viewers(data):
+            received.update(data)
+            viewers.set()
+
+        self.server.on('relay:register', lambda connection, data: connection.emit(
+            'relay:viewers', {'viewerCount': 2, 'requestControls': True}
+        ))
+        self.transport.connect(self.server.url, wait_timeout=2)
+        self.transport.emit('relay:register', {'sessionId': 's1'})
+        self.transport.emit('telemetry:controls:delta', {'sessionId': 's1', 'payload': b'\x01\x00\x02'})
+
+        sent = self.server.wait_for('telemetry:controls:delta')
+        self.assertEqual(sent, [{'payload': b'\x01\x00\x02', 'sessionId': 's1'}])
+        self.assertTrue(viewers.wait(2))
+        self.assertEqual(received, {'viewerCount': 2, 'requestControls': True})
+
+    def test_reconnects_after_server_drops(self):
+        connects = []
+        reconnected = threading.Event()
+
+        @self.transport.event
+        def connect():
+            connects.append(True)
+            if len(connects) == 2:
+                reconnected.set()
+
+        self.transport.connect(self.server.url, wait_timeout=2)
+        self.assertTrue(self.server.wait_connections(1))
+
+        # Drop the connection server-side: the transport reconnects by itself
+        self.server.connections[0].request.shutdown(socket.SHUT_RDWR)
+        self.assertTrue(reconnected.wait(2))
+        self.assertTrue(self.transport.connected)
+
+    def test_emit_when_disconnected_raises(self):
+        with self.assertRaises(ConnectionError):
+            self.transport.emit('event', {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add relay-agent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from protocol import Incident, SessionMetadata
+from protocol.validation import FIRST, FULL, MODES, OFF, SAMPLED, MessageValidator
+
+
+def incident(**overrides):
+    data = {
+        'sessionId': 's1',
+        'timestamp': 1000.0,
+        'cars': [3, 7],
+        'lap': 4,
+        'corner': 2,
+        'trackPosition': 0.25,
+        'severity': 'med',
+        'disciplineContext': 'contact',
+        'extra': {'kept': True},  # Not in the model
+    }
+    data.update(overrides)
+    return data
+
+
+INVALID = incident(severity='huge')
+
+
+class TestMessageValidator(unittest.TestCase):
+
+    def test_full_checks_every_message(self):
+        validator = MessageValidator(FULL)
+        for _ in range(3):
+            self.assertIsNotNone(validator.validate(Incident, incident()))
+        self.assertIsNone(validator.validate(Incident, INVALID))
+        self.assertEqual(validator.stats(), {'mode': FULL, 'checked': 4, 'skipped': 0, 'violations': {'Incident': 1}})
+
+    def test_sampled_checks_every_nth_per_type(self):
+        validator = MessageValidator(SAMPLED, sample_every=3)
+        results = [validator.validate(Incident, INVALID) for _ in range(7)]
+        # Messages 0, 3 and 6 are checked and dropped; the rest go out unchecked
+        self.assertEqual([result is None for result in results], [True, False, False, True, False, False, True])
+        self.assertEqual(validator.checked, 3)
+        self.assertEqual(validator.skipped, 4)
+
+        # Counted per label, not overall
+        self.assertIsNone(validator.validate(Incident, INVALID, 'Other'))
+
+    def test_first_checks_first_of_each_type(self):
+        validator = MessageValidator(FIRST)
+        self.assertIsNone(validator.validate(Incident, INVALID))
+        self.assertIsNotNone(validator.validate(Incident, INVALID))
+        self.assertIsNone(validator.validate(Incident, INVALID, 'Other'))
+        self.assertEqual(validator.stats()['violations'], {'Incident': 1, 'Other': 1})
+
+    def test_off_never_checks(self):
+        validator = MessageValidator(OFF)
+        self.assertIsNotNone(validator.validate(Incident, INVALID))
+        self.assertEqual((validator.checked, validator.skipped), (0, 1))
+
+    def test_same_wire_shape_in_every_mode(self):
+        data = incident()
+        expected = {**data, 'type': 'incident', 'schemaVersion': 'v1', 'carNames': None,
+                    'driverNames': None, 'cornerName': None, 'rawData': None}
+        for mode in MODES:
+            validator = MessageValidator(mode, sample_every=2)
+            for _ in range(3):  # Checked and unchecked messages alike
+                self.assertEqual(validator.validate(Incident, data), expected, mode)
+        self.assertNotIn('schemaVersion', data)  # Built message left untouched
+
+    def test_nested_messages_sent_as_built(self):
+        metadata = {
+            'sessionId': 's1',
+            'timestamp': 1000.0,
+            'trackId': 'spa',
+            'trackName': 'Spa',
+            'category': 'road',
+            'multiClass': False,
+            'cautionsEnabled': True,
+            'driverSwap': False,
+            'maxDrivers': 20,
+            'weather': {'ambientTemp': 20.0, 'trackTemp': 30.0, 'precipitation': 0.0,
+                        'trackState': 'dry', 'humidity': 0.4},  # Unknown nested field kept
+        }
+        validator = MessageValidator(FULL)
+        message = validator.validate(SessionMetadata, metadata)
+        self.assertIsNotNone(message, validator.stats())
+        self.assertEqual(message['weather'], metadata['weather'])
+
+    def test_adapter_cached_per_model(self):
+        validator = MessageValidator(FULL)
+        validator.validate(Incident, incident())
+        adapter = validator._adapters[Incident]
+        validator.validate(Incident, incident(), 'Label')
+        self.assertIs(validator._adapters[Incident], adapter)
+        self.assertEqual(list(validator._adapters), [Incident])
+
+    def test_violation_logging_is_rate_limited(self):
+        validator = MessageValidator(FULL, log_interval=10.0)
+        with mock.patch('protocol.validation.time.monotonic') as monotonic, \
+                self.assertLogs('protocol.validation', 'ERROR') as logs:
+            for now in (100.0, 101.0, 102.0, 111.0):
+                monotonic.return_value = now
+                validator.validate(Incident, INVALID)
+        self.assertEqual(len(logs.output), 2)
+        self.assertNotIn('more since last report', logs.output[0])
+        self.assertIn('(+2 more since last report)', logs.output[1])
+        self.assertEqual(validator.violations, {'Incident': 4})
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            MessageValidator('sometimes')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+PitBox Relay Agent - Tick Scheduler
+Monotonic-clock rate gates and sim-frame de-duplication for the main loop
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateGate:
+    """
+    Fixed-rate deadline on the monotonic clock.
+
+    Deadlines advance from the previous deadline rather than from when the
+    task actually ran, so the rate doesn't drift with loop jitter. If the loop
+    falls behind, up to `max_catchup` missed deadlines are made up on
+    following calls; beyond that the gate re-syncs instead of bursting.
+    """
+
+    def __init__(self, rate_hz: float, max_catchup: int = 0):
+        self.max_catchup = max_catchup
+        self.next_due = 0.0
+        self.missed = 0  # Deadlines dropped by re-syncing
+        self.set_rate(rate_hz)
+
+    def set_rate(self, rate_hz: float):
+        self.rate_hz = rate_hz
+        self.interval = 1.0 / rate_hz
+
+    def ready(self, now: Optional[float] = None) -> bool:
+        """True if the gate is due; consumes the deadline"""
+        now = time.monotonic() if now is None else now
+        if now < self.next_due:
+            return False
+
+        if not self.next_due:
+            # First run: start the schedule from now
+            self.next_due = now + self.interval
+            return True
+
+        self.next_due += self.interval
+        if self.next_due <= now:
+            # Keep at most max_catchup overdue deadlines, dropping whole intervals
+            # so the schedule stays on its original phase
+            behind = int((now - self.next_due) / self.interval) + 1
+            skip = behind - self.max_catchup
+            if skip > 0:
+                self.missed += skip
+                self.next_due += skip * self.interval
+        return True
+
+    def time_until(self, now: Optional[float] = None) -> float:
+        """Seconds until the gate is next due (0 if overdue)"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.next_due - now)
+
+
+def time_until_next(gates: Iterable[RateGate], now: Optional[float] = None) -> float:
+    """Seconds until the earliest of several gates is due"""
+    now = time.monotonic() if now is None else now
+    return min((gate.time_until(now) for gate in gates), default=0.0)
+
+
+class FrameSync:
+    """
+    Tracks SessionTick so each sim frame is processed exactly once.
+
+    iRacing publishes a new frame every sim tick (60 Hz). Waking faster than
+    that, or while the sim is paused, returns the same frame again; those
+    duplicates are counted and skipped.
+    """
+
+    def __init__(self):
+        self.last_tick: Optional[int] = None
+        self.frames = 0        # New frames processed
+        self.duplicates = 0    # Same frame seen again (skipped)
+        self.skipped_ticks = 0 # Sim ticks that elapsed between processed frames
+
+    def is_new(self, tick: int) -> bool:
+        """True if this tick hasn't been processed yet"""
+        if tick == self.last_tick:
+            self.duplicates += 1
+            return False
+
+        # Ticks go backwards on session change / replay seek - just resync
+        if self.last_tick is not None and tick > self.last_tick + 1:
+            self.skipped_ticks += tick - self.last_tick - 1
+
+        self.last_tick = tick
+        self.frames += 1
+        return True
+
+    def reset(self):
+        """Forget the last tick (e.g. after reconnecting to the sim)"""
+        self.last_tick = None
+
+
+@dataclass
+class Stream:
+    """One periodic task registered with a StreamScheduler"""
+    name: str
+    callback: Callable[[float], Any]
+    gate: RateGate
+    priority: int = 0                                # Lower runs first within a tick
+    enabled: Optional[Callable[[], bool]] = None     # Skipped (and not counted) while False
+    runs: int = 0
+    achieved_hz: float = 0.0
+    _window_start: float = field(default=0.0, repr=False)
+    _window_runs: int = field(default=0, repr=False)
+
+    @property
+    def rate_hz(self) -> float:
+        return self.gate.rate_hz
+
+    def is_enabled(self) -> bool:
+        return self.enabled is None or bool(self.enabled())
+
+
+class StreamScheduler:
+    """
+    Declarative multi-rate scheduler for the relay's outbound streams.
+
+    Each stream registers a target rate and priority; run_due() runs every
+    stream whose monotonic deadline has passed, in priority order. Rates are
+    drift-compensated by RateGate, and the achieved rate of each stream is
+    measured over RATE_WINDOW seconds for reporting.
+    """
+
+    RATE_WINDOW = 2.0
+
+    def __init__(self):
+        self.streams: Dict[str, Stream] = {}
+        self._ordered: List[Stream] = []
+
+    def add(
+        self,
+        name: str,
+        rate_hz: float,
+        callback: Callable[[float], Any],
+        priority: int = 0,
+        enabled: Optional[Callable[[], bool]] = None,
+        max_catchup: int = 1
+    ) -> Stream:
+        """
+        Register a stream.
+
+        Args:
+            name: Stream name (used in stats)
+            rate_hz: Target rate
+            callback: Called with the monotonic time when the stream is due
+            priority: Lower runs first when several streams are due together
+            enabled: Optional predicate; the stream is paused while it returns False
+            max_catchup: Missed deadlines made up after a stall before re-syncing
+        """
+        stream = Stream(name, callback, RateGate(rate_hz, max_catchup), priority, enabled)
+        self.streams[name] = stream
+        self._ordered = sorted(self.streams.values(), key=lambda s: s.priority)
+        return stream
+
+    def set_rate(self, name: str, rate_hz: float):
+        self.streams[name].gate.set_rate(rate_hz)
+
+    def run_due(self, now: Optional[float] = None) -> List[str]:
+        """Run every due stream in priority order; returns the names that ran"""
+        now = time.monotonic() if now is None else now
+        ran = []
+        for stream in self._ordered:
+            if not stream.is_enabled():
+                # Don't bank deadlines while paused
+                stream.gate.next_due = max(stream.gate.next_due, now)
+                continue
+            if not stream.gate.ready(now):
+                continue
+
+            try:
+                stream.callback(now)
+            except Exception as e:
+                logger.error(f"Stream '{stream.name}' failed: {e}")
+            stream.runs += 1
+            self._count(stream, now)
+            ran.append(stream.name)
+        return ran
+
+    def time_until_next(self, now: Optional[float] = None) -> float:
+        """Seconds until the earliest enabled stream is due"""
+        return time_until_next((s.gate for s in self._ordered if s.is_enabled()), now)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Target vs achieved rate per stream"""
+        return {
+            s.name: {
+                'target_hz': s.rate_hz,
+                'achieved_hz': round(s.achieved_hz, 2),
+                'runs': s.runs,
+                'missed': s.gate.missed,
+            }
+            for s in self._ordered
+        }
+
+    def _count(self, stream: Stream, now: float):
+        if not stream._window_start:
+            stream._window_start = now
+        stream._window_runs += 1
+        elapsed = now - stream._window_start
+        if elapsed >= self.RATE_WINDOW:
+            stream.achieved_hz = (stream._window_runs - 1) / elapsed
+            stream._window_start = now
+            stream._window_runs = 1
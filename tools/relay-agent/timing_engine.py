@@ -0,0 +1,166 @@
+"""
+PitBox Relay Agent - Timing Engine
+Live gap-ahead/gap-behind from per-car lap-distance bin crossing times
+"""
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+import config
+from frame_snapshot import FrameSnapshot, MAX_CARS
+
+logger = logging.getLogger(__name__)
+
+
+class TimingEngine:
+    """
+    Records the session time at which every car crosses each of N fixed
+    lap-distance bins, in a preallocated (cars x bins) array.
+
+    The gap between two cars is then a constant-time lookup: compare when each
+    crossed the last bin the car behind reached. Each update is vectorised over
+    all cars, with crossing times interpolated between ticks, so there is no
+    per-tick searching.
+    """
+
+    def __init__(self, bins: int = 100, max_move: float = config.POSITION_JUMP_THRESHOLD):
+        """
+        Args:
+            bins: Timing points per lap
+            max_move: Forward movement per update (fraction of a lap) beyond which
+                      a car is treated as teleported (tow, pit-stall reset)
+        """
+        self.bins = bins
+        self.max_move = max_move
+
+        self.crossings = np.full((MAX_CARS, bins), np.nan)            # Session time at each bin
+        self.crossing_laps = np.zeros((MAX_CARS, bins), dtype=np.int32)  # Lap at each crossing
+        self.last_bin = np.full(MAX_CARS, -1, dtype=np.int32)          # Bin most recently crossed
+
+        # Neighbours on the road by race distance (-1 = none)
+        self.car_ahead = np.full(MAX_CARS, -1, dtype=np.int32)
+        self.car_behind = np.full(MAX_CARS, -1, dtype=np.int32)
+
+        self._prev_time: Optional[float] = None
+        self._prev_pct = np.full(MAX_CARS, -1.0)
+        self._lap_times = np.zeros(MAX_CARS, dtype=np.float32)
+
+    def reset(self):
+        """Drop all timing (new connection or session)"""
+        self.crossings.fill(np.nan)
+        self.crossing_laps.fill(0)
+        self.last_bin.fill(-1)
+        self.car_ahead.fill(-1)
+        self.car_behind.fill(-1)
+        self._prev_time = None
+        self._prev_pct.fill(-1.0)
+
+    def update(self, frame: FrameSnapshot, active: Optional[np.ndarray] = None):
+        """
+        Record the bins every car crossed since the previous frame.
+
+        Args:
+            frame: Current frame snapshot
+            active: Optional per-car mask of cars to rank (e.g. excludes the pace car)
+        """
+        now = frame.scalar('SessionTime')
+        pct = frame.car('CarIdxLapDistPct').astype(np.float64)
+        laps = frame.car('CarIdxLap')
+        n = min(len(pct), MAX_CARS)
+        pct, laps = pct[:n], laps[:n]
+
+        if self._prev_time is not None and now < self._prev_time:
+            # Session time went backwards (new session / replay seek)
+            self.reset()
+
+        prev_time = self._prev_time
+        prev_pct = self._prev_pct[:n].copy()
+        self._prev_time = now
+        self._prev_pct[:n] = pct
+        self._lap_times[:n] = frame.car('CarIdxLastLapTime')[:n]
+
+        # Cars not in the world report a negative lap distance
+        in_world = pct >= 0
+        self._update_order(pct, laps, in_world if active is None else in_world & active[:n])
+
+        if prev_time is None or now <= prev_time:
+            return
+        dt = now - prev_time
+
+        valid = in_world & (prev_pct >= 0)
+        moved = (pct - prev_pct + 0.5) % 1.0 - 0.5  # Lap-wrapped, in [-0.5, 0.5)
+
+        # Teleported cars (towed, reset to the pits) start timing afresh
+        teleported = valid & (np.abs(moved) > self.max_move)
+        if teleported.any():
+            self.crossings[:n][teleported] = np.nan
+            self.last_bin[:n][teleported] = -1
+
+        forward = valid & (moved > 0) & ~teleported
+        prev_bin = np.floor(prev_pct * self.bins).astype(np.int64)
+        end_bin = np.floor((prev_pct + moved) * self.bins).astype(np.int64)
+        counts = np.where(forward, end_bin - prev_bin, 0)
+        crossed = np.flatnonzero(counts > 0)
+        if not len(crossed):
+            return
+
+        # One row per (car, bin crossed) - usually one bin per car per tick
+        counts = counts[crossed]
+        cars = np.repeat(crossed, counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        k = prev_bin[cars] + 1 + (np.arange(len(cars)) - starts)  # Unwrapped bin index
+
+        # Interpolate the crossing time between the two frames
+        frac = (k / self.bins - prev_pct[cars]) / moved[cars]
+        bins = k % self.bins
+        self.crossings[cars, bins] = prev_time + frac * dt
+
+        # CarIdxLap has already ticked over if the car crossed the line this frame
+        wrapped = (prev_pct[cars] + moved[cars]) >= 1.0
+        self.crossing_laps[cars, bins] = laps[cars] - wrapped + (k >= self.bins)
+        self.last_bin[crossed] = end_bin[crossed] % self.bins
+
+    def _update_order(self, pct: np.ndarray, laps: np.ndarray, in_world: np.ndarray):
+        """Neighbours by race distance (laps + lap fraction), leader first"""
+        self.car_ahead.fill(-1)
+        self.car_behind.fill(-1)
+        cars = np.flatnonzero(in_world)
+        if len(cars) < 2:
+            return
+        order = cars[np.argsort(-(laps[cars] + pct[cars]), kind='stable')]
+        self.car_ahead[order[1:]] = order[:-1]
+        self.car_behind[order[:-1]] = order[1:]
+
+    def gap(self, car_behind: int, car_ahead: int) -> Optional[float]:
+        """
+        Seconds between two cars at the last bin the car behind crossed.
+        Lapped gaps add whole laps at the car ahead's last lap time.
+        """
+        b = self.last_bin[car_behind]
+        if b < 0:
+            return None
+        t_behind = self.crossings[car_behind, b]
+        t_ahead = self.crossings[car_ahead, b]
+        if np.isnan(t_behind) or np.isnan(t_ahead):
+            return None
+
+        gap = t_behind - t_ahead
+        lap_delta = int(self.crossing_laps[car_ahead, b]) - int(self.crossing_laps[car_behind, b])
+        if lap_delta:
+            lap_time = self._lap_times[car_ahead]
+            if lap_time <= 0:
+                return None
+            gap += lap_delta * float(lap_time)
+        return float(gap) if gap >= 0 else None
+
+    def gaps(self, car_idx: int) -> Tuple[Optional[float], Optional[float]]:
+        """(gap to the car ahead, gap to the car behind) in seconds"""
+        if not 0 <= car_idx < MAX_CARS:
+            return None, None
+        ahead = self.car_ahead[car_idx]
+        behind = self.car_behind[car_idx]
+        return (
+            self.gap(car_idx, ahead) if ahead >= 0 else None,
+            self.gap(behind, car_idx) if behind >= 0 else None,
+        )
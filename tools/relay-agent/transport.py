@@ -0,0 +1,437 @@
+"""
+PitBox Relay Agent - Transports
+Pluggable wire transports: Socket.IO (default) or a raw WebSocket with a binary envelope
+"""
+import json
+import logging
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import socketio
+import websocket
+
+import config
+from binary_codec import CodecError
+
+logger = logging.getLogger(__name__)
+
+
+# Transports (RELAY_TRANSPORT)
+SOCKETIO = 'socketio'
+WEBSOCKET = 'websocket'
+
+
+class Transport(ABC):
+    """
+    What PitBoxClient and BackendTarget need from a connection: the
+    socketio.Client interface (registered below), so Socket.IO stays the
+    default and other transports drop in without touching the clients.
+
+    Handlers are registered with on()/event() before connecting; 'connect',
+    'disconnect' and 'connect_error' are connection events, anything else is
+    a server message.
+    """
+
+    connected: bool = False
+
+    @abstractmethod
+    def on(self, event: str, handler: Optional[Callable] = None):
+        """Register a handler (usable as a decorator)"""
+
+    def event(self, handler: Callable):
+        """Register a handler named after the event (decorator)"""
+        return self.on(handler.__name__, handler)
+
+    @abstractmethod
+    def connect(self, url: str, transports=None, wait: bool = True, wait_timeout: float = 10):
+        """Connect; raises on failure"""
+
+    @abstractmethod
+    def disconnect(self):
+        """Close the connection (no reconnect)"""
+
+    @abstractmethod
+    def emit(self, event: str, data: Any = None):
+        """Send one message; raises if it can't be sent"""
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+Transport.register(socketio.Client)
+
+
+def create_transport(kind: str = SOCKETIO, **options) -> Transport:
+    """
+    Connection for RELAY_TRANSPORT. options are the reconnection settings
+    (reconnection, reconnection_attempts, reconnection_delay, reconnection_delay_max).
+    """
+    if kind == SOCKETIO:
+        return socketio.Client(logger=False, engineio_logger=False, **options)
+    if kind == WEBSOCKET:
+        return WebSocketTransport(**options)
+    raise ValueError(f"Unknown transport: {kind}")
+
+
+# =========================================================================
+# Binary envelope
+# =========================================================================
+#
+# Every WebSocket binary frame holds one or more messages:
+#   <type u8, stream id u16, payload length u32> + payload
+#
+# Stream ids index EVENTS (sent in the HELLO, so the server never guesses);
+# stream 0 is an event not in the table, with its name inline:
+#   <name length u8> + name, then the payload as below.
+#
+# The connection is bound to a session by 'relay:register' or
+# 'session_metadata' (SESSION_EVENTS), after which 'sessionId' is left out of
+# every message and the server puts it back.
+
+ENVELOPE = struct.Struct('<BHI')
+META_LENGTH = struct.Struct('<H')
+
+TYPE_JSON = 0x01     # Payload: JSON object
+TYPE_BINARY = 0x02   # Payload: <meta length u16> + JSON meta (may be empty) + raw bytes
+TYPE_HELLO = 0x03    # Payload: JSON {'v', 'events'}; first message on a connection
+
+STREAM_NAMED = 0
+ENVELOPE_VERSION = 1
+
+# Messages that bind the connection to their 'sessionId'
+SESSION_EVENTS = ('relay:register', 'session_metadata')
+
+# Default bytes field of TYPE_BINARY messages; others are named in meta 'binaryField'
+BINARY_FIELD = 'payload'
+
+# Event table: ids are positions + 1. Append only (ids are on the wire).
+EVENTS: Tuple[str, ...] = (
+    # Relay -> server
+    'relay:register',
+    'relay:capabilities',
+    'session_metadata',
+    'telemetry:schema',
+    'telemetry',
+    'telemetry_binary',
+    'telemetry:baseline',
+    'telemetry:controls',
+    'telemetry:controls:delta',
+    'telemetry:v2',
+    'telemetry:batch',
+    'telemetry:v2:batch',
+    'telemetry:controls:delta:batch',
+    'event',
+    'incident',
+    'race_event',
+    'driver_update',
+    'strategy_update',
+    'video_frame',
+    'compressed',
+    # Server -> relay
+    'relay:viewers',
+    'relay:ack',
+    'strategy:keyframe',
+    'controls:keyframe',
+    'recommendation',
+    'profile_loaded',
+    'ack',
+    'steward_command',
+)
+
+
+def _json(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def event_ids(events: Sequence[str] = EVENTS) -> Dict[str, int]:
+    return {event: i + 1 for i, event in enumerate(events)}
+
+
+_EVENT_IDS = event_ids()
+
+
+def encode_hello(events: Sequence[str] = EVENTS) -> bytes:
+    body = _json({'v': ENVELOPE_VERSION, 'events': list(events)})
+    return ENVELOPE.pack(TYPE_HELLO, STREAM_NAMED, len(body)) + body
+
+
+def encode_message(
+    event: str,
+    data: Any,
+    session_id: Optional[str] = None,
+    ids: Optional[Dict[str, int]] = None
+) -> bytes:
+    """
+    One enveloped message. A dict with a bytes value goes as TYPE_BINARY (the
+    bytes raw, the rest as meta); anything else as TYPE_JSON.
+
+    Raises:
+        CodecError: More than one bytes field
+    """
+    ids = ids if ids is not None else _EVENT_IDS
+    if isinstance(data, dict) and session_id is not None and data.get('sessionId') == session_id:
+        data = {k: v for k, v in data.items() if k != 'sessionId'}
+
+    raw = None
+    if isinstance(data, dict):
+        fields = [k for k, v in data.items() if isinstance(v, (bytes, bytearray, memoryview))]
+        if len(fields) > 1:
+            raise CodecError(f"{event}: more than one binary field ({', '.join(fields)})")
+        if fields:
+            field = fields[0]
+            raw = bytes(data[field])
+            data = {k: v for k, v in data.items() if k != field}
+            if field != BINARY_FIELD:
+                data['binaryField'] = field
+
+    stream = ids.get(event, STREAM_NAMED)
+    prefix = b''
+    if stream == STREAM_NAMED:
+        name = event.encode()
+        prefix = bytes([len(name)]) + name
+
+    if raw is None:
+        body = prefix + _json(data)
+        return ENVELOPE.pack(TYPE_JSON, stream, len(body)) + body
+    meta = _json(data) if data else b''
+    body = prefix + META_LENGTH.pack(len(meta)) + meta + raw
+    return ENVELOPE.pack(TYPE_BINARY, stream, len(body)) + body
+
+
+def decode_messages(
+    frame: bytes,
+    events: Sequence[str] = EVENTS,
+    session_id: Optional[str] = None
+) -> Iterator[Tuple[int, str, Any]]:
+    """
+    (type, event, data) for each message in a frame. HELLO messages come out
+    as (TYPE_HELLO, '', hello dict). With session_id, dict messages get
+    'sessionId' back.
+
+    Raises:
+        CodecError: Truncated frame or body, unknown type or stream id
+        ValueError: Body isn't valid JSON / UTF-8
+    """
+    view = memoryview(frame)
+    offset = 0
+    while offset < len(view):
+        if offset + ENVELOPE.size > len(view):
+            raise CodecError("Truncated envelope")
+        kind, stream, length = ENVELOPE.unpack_from(view, offset)
+        offset += ENVELOPE.size
+        body = view[offset:offset + length]
+        if len(body) != length:
+            raise CodecError(f"Truncated message (stream {stream})")
+        offset += length
+
+        if kind == TYPE_HELLO:
+            yield kind, '', json.loads(bytes(body))
+            continue
+
+        if stream == STREAM_NAMED:
+            if not body:
+                raise CodecError("Missing event name")
+            name_end = 1 + body[0]
+            if name_end > len(body):
+                raise CodecError("Truncated event name")
+            event = bytes(body[1:name_end]).decode()
+            body = body[name_end:]
+        elif stream <= len(events):
+            event = events[stream - 1]
+        else:
+            raise CodecError(f"Unknown stream id {stream}")
+
+        if kind == TYPE_JSON:
+            data = json.loads(bytes(body))
+        elif kind == TYPE_BINARY:
+            if len(body) < META_LENGTH.size:
+                raise CodecError(f"Truncated binary message (stream {stream})")
+            (meta_length,) = META_LENGTH.unpack_from(body, 0)
+            meta_end = META_LENGTH.size + meta_length
+            if meta_end > len(body):
+                raise CodecError(f"Truncated binary meta (stream {stream})")
+            data = json.loads(bytes(body[META_LENGTH.size:meta_end])) if meta_length else {}
+            if not isinstance(data, dict):
+                raise CodecError(f"Binary meta is not an object (stream {stream})")
+            data[data.pop('binaryField', BINARY_FIELD)] = bytes(body[meta_end:])
+        else:
+            raise CodecError(f"Unknown message type {kind}")
+
+        if session_id is not None and isinstance(data, dict):
+            data.setdefault('sessionId', session_id)
+        yield kind, event, data
+
+
+def websocket_url(url: str, path: str) -> str:
+    """ws(s):// URL for the raw transport: http(s) becomes ws(s), path added if missing"""
+    parts = urlsplit(url)
+    scheme = {'http': 'ws', 'https': 'wss'}.get(parts.scheme, parts.scheme)
+    return urlunsplit((scheme, parts.netloc, parts.path.rstrip('/') or path, parts.query, ''))
+
+
+# =========================================================================
+# Raw WebSocket transport
+# =========================================================================
+
+class WebSocketTransport(Transport):
+    """
+    Socket.IO-compatible client over a plain WebSocket (websocket-client):
+    no engine.io framing or attachment packets, each message is one binary
+    frame with a 7 byte envelope. Binary payloads (telemetry_binary,
+    telemetry:v2, controls deltas, video frames) go raw in the same frame.
+
+    A reader thread dispatches server messages and reconnects with
+    exponential backoff, like socketio.Client. emit() may be called from
+    any thread.
+    """
+
+    def __init__(
+        self,
+        reconnection: bool = True,
+        reconnection_attempts: int = 0,  # 0 = forever
+        reconnection_delay: float = 1,
+        reconnection_delay_max: float = 30,
+        path: str = None
+    ):
+        self.reconnection = reconnection
+        self.reconnection_attempts = reconnection_attempts
+        self.reconnection_delay = reconnection_delay
+        self.reconnection_delay_max = reconnection_delay_max
+        self.path = path or config.RELAY_WS_PATH
+
+        self.handlers: Dict[str, Callable] = {}
+        self.connected = False
+        self.url: Optional[str] = None
+        self.session_id: Optional[str] = None  # Bound by SESSION_EVENTS
+
+        self._ws: Optional[websocket.WebSocket] = None
+        self._send_lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._closing = False
+        self._timeout = 10.0
+
+        # Counters
+        self.sent = 0
+        self.sent_bytes = 0
+        self.received = 0
+
+    def on(self, event: str, handler: Optional[Callable] = None):
+        def register(handler: Callable):
+            self.handlers[event] = handler
+            return handler
+        return register(handler) if handler else register
+
+    def _trigger(self, event: str, *args):
+        handler = self.handlers.get(event)
+        if handler is None:
+            return
+        try:
+            handler(*args)
+        except Exception as e:
+            logger.error(f"❌ Handler for {event} failed: {e}")
+
+    # =====================================================================
+    # Connection
+    # =====================================================================
+
+    def connect(self, url: str, transports=None, wait: bool = True, wait_timeout: float = 10):
+        if self.connected:
+            return
+        self.url = websocket_url(url, self.path)
+        self._timeout = wait_timeout
+        self._closing = False
+        try:
+            self._open()
+        except Exception as e:
+            self._trigger('connect_error', str(e))
+            raise ConnectionError(f"Failed to connect to {self.url}: {e}") from e
+        self._reader = threading.Thread(target=self._read_loop, name='ws-transport', daemon=True)
+        self._reader.start()
+
+    def _open(self):
+        ws = websocket.create_connection(self.url, timeout=self._timeout, enable_multithread=True)
+        ws.settimeout(None)
+        ws.send_binary(encode_hello())
+        self._ws = ws
+        self.session_id = None
+        self.connected = True
+        self._trigger('connect')
+
+    def disconnect(self):
+        self._closing = True
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                ws.close(timeout=1)
+            except Exception:
+                pass
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=2)
+
+    def _read_loop(self):
+        while True:
+            self._receive()
+            self.connected = False
+            self._trigger('disconnect')
+            if self._closing or not self.reconnection or not self._reconnect():
+                return
+
+    def _receive(self):
+        ws = self._ws
+        while not self._closing:
+            try:
+                opcode, frame = ws.recv_data()
+            except Exception:
+                return
+            if opcode == websocket.ABNF.OPCODE_CLOSE:
+                return
+            if opcode != websocket.ABNF.OPCODE_BINARY:
+                continue
+            try:
+                for kind, event, data in decode_messages(frame):
+                    if kind != TYPE_HELLO:
+                        self.received += 1
+                        self._trigger(event, data)
+            except (CodecError, ValueError, struct.error) as e:
+                logger.warning(f"⚠️ Bad message from server: {e}")
+
+    def _reconnect(self) -> bool:
+        attempt = 0
+        delay = self.reconnection_delay
+        while not self._closing:
+            attempt += 1
+            if self.reconnection_attempts and attempt > self.reconnection_attempts:
+                logger.error(f"❌ Giving up on {self.url} after {attempt - 1} reconnection attempts")
+                return False
+            time.sleep(delay)
+            if self._closing:
+                return False
+            try:
+                self._open()
+                return True
+            except Exception as e:
+                self._trigger('connect_error', str(e))
+                delay = min(delay * 2, self.reconnection_delay_max)
+        return False
+
+    # =====================================================================
+    # Sending
+    # =====================================================================
+
+    def emit(self, event: str, data: Any = None):
+        ws = self._ws
+        if not self.connected or ws is None:
+            raise ConnectionError("Not connected")
+        if event in SESSION_EVENTS and isinstance(data, dict):
+            self.session_id = data.get('sessionId')
+            message = encode_message(event, data)
+        else:
+            message = encode_message(event, data, self.session_id)
+        with self._send_lock:
+            ws.send_binary(message)
+        self.sent += 1
+        self.sent_bytes += len(message)
@@ -0,0 +1,308 @@
+"""
+PitBox Relay Agent - WebSocket Stand-in Server
+Minimal local server for the raw WebSocket transport (tests, load tests, protocol debugging)
+
+Speaks the transport.py envelope over RFC 6455 with the standard library
+only. Not a PitBox Server: it records what relays send and can push
+messages back to them.
+
+Usage:
+    python ws_server.py --port 3000 -v
+    RELAY_TRANSPORT=websocket python main.py --url http://localhost:3000 --ibt session.ibt
+"""
+import argparse
+import base64
+import hashlib
+import logging
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from websocket import ABNF
+
+import transport
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+
+
+class StandInConnection(socketserver.BaseRequestHandler):
+    """One relay connection: handshake, then enveloped binary frames"""
+
+    server: 'StandInServer'
+
+    def setup(self):
+        self.events = transport.EVENTS
+        self.ids = transport.event_ids(self.events)
+        self.session_id: Optional[str] = None
+        self._send_lock = threading.Lock()
+        self._buffer = b''
+
+    def handle(self):
+        if not self._handshake():
+            return
+        self.server._add(self)
+        try:
+            while True:
+                frame = self._read_frame()
+                if frame is None:
+                    return
+                opcode, data = frame
+                if opcode == ABNF.OPCODE_CLOSE:
+                    self._send_frame(ABNF.OPCODE_CLOSE, data[:2])
+                    return
+                if opcode == ABNF.OPCODE_PING:
+                    self._send_frame(ABNF.OPCODE_PONG, data)
+                elif opcode == ABNF.OPCODE_BINARY:
+                    self._on_frame(data)
+        finally:
+            self.server._remove(self)
+
+    # =====================================================================
+    # RFC 6455
+    # =====================================================================
+
+    def _read(self, n: int) -> Optional[bytes]:
+        while len(self._buffer) < n:
+            try:
+                chunk = self.request.recv(65536)
+            except OSError:
+                return None
+            if not chunk:
+                return None
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def _handshake(self) -> bool:
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return False
+            request += chunk
+        head, self._buffer = request.split(b'\r\n\r\n', 1)
+        headers = {}
+        for line in head.decode('latin-1').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get('sec-websocket-key')
+        if not key:
+            self.request.sendall(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            return False
+        self.request.sendall((
+            'HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n'
+        ).encode())
+        return True
+
+    def _read_frame(self) -> Optional[Tuple[int, bytes]]:
+        """(opcode, payload) of the next message (fragments joined), None on EOF"""
+        opcode = None
+        payload = b''
+        while True:
+            header = self._read(2)
+            if header is None:
+                return None
+            fin, frame_opcode = header[0] & 0x80, header[0] & 0x0F
+            masked, length = header[1] & 0x80, header[1] & 0x7F
+            if length == 126:
+                extended = self._read(2)
+                length = struct.unpack('!H', extended)[0] if extended else None
+            elif length == 127:
+                extended = self._read(8)
+                length = struct.unpack('!Q', extended)[0] if extended else None
+            mask = self._read(4) if masked else b''
+            data = self._read(length) if length is not None and mask is not None else None
+            if data is None:
+                return None
+            if masked:
+                data = ABNF.mask(mask, data)
+            if frame_opcode >= 0x8:
+                return frame_opcode, data  # Control frames are never fragmented
+            if frame_opcode != ABNF.OPCODE_CONT:
+                opcode = frame_opcode
+            payload += data
+            if fin:
+                return opcode, payload
+
+    def _send_frame(self, opcode: int, data: bytes):
+        frame = ABNF(fin=1, opcode=opcode, mask_value=0, data=data).format()
+        with self._send_lock:
+            try:
+                self.request.sendall(frame)
+            except OSError:
+                pass
+
+    # =====================================================================
+    # Envelope
+    # =====================================================================
+
+    def _on_frame(self, frame: bytes):
+        self.server.frames += 1
+        self.server.bytes_received += len(frame)
+        try:
+            messages = list(transport.decode_messages(frame, self.events, self.session_id))
+        except (transport.CodecError, ValueError, struct.error) as e:
+            logger.warning(f"⚠️ Bad frame from relay: {e}")
+            return
+        for kind, event, data in messages:
+            if kind == transport.TYPE_HELLO:
+                self.events = tuple(data.get('events', transport.EVENTS))
+                self.ids = transport.event_ids(self.events)
+                continue
+            if event in transport.SESSION_EVENTS:
+                self.session_id = data.get('sessionId')
+            self.server._receive(self, event, data)
+
+    def emit(self, event: str, data: Any = None):
+        self._send_frame(ABNF.OPCODE_BINARY, transport.encode_message(event, data, ids=self.ids))
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    """
+    Local stand-in for the PitBox Server on the raw WebSocket transport.
+
+    Everything relays send is kept in received (event, data), with
+    'sessionId' restored (record=False keeps only per-event counts).
+    Handlers registered with on() run for each message (reply with
+    connection.emit()); emit() pushes a message to every connected relay.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, record: bool = True):
+        super().__init__((host, port), StandInConnection)
+        self.record = record
+        self.received: List[Tuple[str, Any]] = []
+        self.counts: Dict[str, int] = {}
+        self.handlers: Dict[str, Callable[[StandInConnection, Any], None]] = {}
+        self.connections: List[StandInConnection] = []
+        self.frames = 0
+        self.bytes_received = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def on(self, event: str, handler: Callable[[StandInConnection, Any], None]):
+        self.handlers[event] = handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='ws-standin', daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Stand-in server listening on {self.url}")
+
+    def stop(self):
+        self.shutdown()
+        with self._condition:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.server_close()
+
+    def emit(self, event: str, data: Any = None):
+        with self._condition:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.emit(event, data)
+
+    def wait_for(self, event: str, count: int = 1, timeout: float = 5.0) -> List[Any]:
+        """Data of the first count messages of this event (fewer on timeout)"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                found = [data for name, data in self.received if name == event]
+                remaining = deadline - time.monotonic()
+                if len(found) >= count or remaining <= 0:
+                    return found[:count]
+                self._condition.wait(remaining)
+
+    def wait_connections(self, count: int = 1, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while len(self.connections) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def _add(self, connection: StandInConnection):
+        with self._condition:
+            self.connections.append(connection)
+            self._condition.notify_all()
+
+    def _remove(self, connection: StandInConnection):
+        with self._condition:
+            if connection in self.connections:
+                self.connections.remove(connection)
+            self._condition.notify_all()
+
+    def _receive(self, connection: StandInConnection, event: str, data: Any):
+        with self._condition:
+            self.counts[event] = self.counts.get(event, 0) + 1
+            if self.record:
+                self.received.append((event, data))
+            self._condition.notify_all()
+        logger.debug(f"📥 {event}")
+        handler = self.handlers.get(event)
+        if handler:
+            try:
+                handler(connection, data)
+            except Exception as e:
+                logger.error(f"❌ Stand-in handler for {event} failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in server for the raw WebSocket relay transport')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--viewers', type=int, default=1, help='Viewer count announced to relays (0 = no controls)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every message')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        datefmt='%H:%M:%S'
+    )
+
+    server = StandInServer(args.host, args.port, record=False)
+    # Like the PitBox Server: announce viewers once a relay registers
+    def announce_viewers(connection: StandInConnection, data: Any):
+        connection.emit('relay:viewers', {'viewerCount': args.viewers, 'requestControls': args.viewers > 0})
+
+    for event in transport.SESSION_EVENTS:
+        server.on(event, announce_viewers)
+    server.start()
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f"📊 {sum(server.counts.values())} messages, {server.frames} frames, "
+                        f"{server.bytes_received / 1024:.1f} KB from {len(server.connections)} relays")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -81,6 +81,10 @@ class IRacingReader:
         self._last_session_info = None
         self._last_incident_counts: Dict[int, int] = {}
         self._car_info_cache: Dict[int, Dict] = {}
+        
+        # SessionData cache, keyed on (SessionInfoUpdate, SessionNum)
+        self._session_data_key = None
+        self._session_data: Optional[SessionData] = None
     
     def connect(self) -> bool:
         """
@@ -94,6 +98,7 @@ class IRacingReader:
             if self.ir.startup():
                 self.connected = True
                 logger.info("✅ Connected to iRacing")
+                self._session_data_key = None
                 self._update_car_info_cache()
                 return True
             else:
@@ -129,16 +134,29 @@ class IRacingReader:
             pass
     
     def get_session_data(self) -> Optional[SessionData]:
-        """Get current session metadata"""
+        """
+        Get current session metadata
+        Session YAML is only re-walked when iRacing bumps SessionInfoUpdate
+        """
         if not self.is_connected():
             return None
         
+        key = (self.ir.session_info_update, self.ir['SessionNum'])
+        if key != self._session_data_key or self._session_data is None:
+            if self._session_data_key is not None and key[0] != self._session_data_key[0]:
+                # Roster may have changed (mid-session joins)
+                self._update_car_info_cache()
+            self._session_data = self._parse_session_data(key[1])
+            self._session_data_key = key
+        return self._session_data
+    
+    def _parse_session_data(self, session_num: int) -> Optional[SessionData]:
+        """Build SessionData from the session info YAML"""
         try:
             weekend_info = self.ir['WeekendInfo']
             session_info = self.ir['SessionInfo']
             
             # Get current session
-            session_num = self.ir['SessionNum']
             sessions = session_info.get('Sessions', [])
             current_session = sessions[session_num] if session_num < len(sessions) else {}
             